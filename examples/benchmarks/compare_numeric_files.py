@@ -0,0 +1,84 @@
+"""
+Measure the time to compare two files with numeric tolerances.
+
+Two files resembling solver output (variable names, values and a few
+text columns) are written to a temporary directory; the values in the
+second file are perturbed within the tolerance.  The files are compared
+with compare_file_with_numeric_values(), which compares blocks of
+lines, and with the line by line comparison that it replaced.  Both
+must report that the files are equal.
+"""
+
+import argparse
+import os
+import random
+import shutil
+import tempfile
+import time
+
+import pyutilib.misc.comparison as comparison
+
+
+def write_files(dirname, nlines, perturbation):
+    rng = random.Random(1)
+    file1 = os.path.join(dirname, 'baseline.txt')
+    file2 = os.path.join(dirname, 'output.txt')
+    with open(file1, 'w') as OUTPUT1, open(file2, 'w') as OUTPUT2:
+        for i in range(nlines):
+            value = rng.uniform(-1e3, 1e3)
+            dual = rng.expovariate(1.0)
+            status = 'basic' if i % 3 else 'at bound'
+            fmt = "x[%d,%d]  value= %.12g  dual= %.6e  %s\n"
+            OUTPUT1.write(fmt % (i // 100, i % 100, value, dual, status))
+            OUTPUT2.write(fmt % (i // 100, i % 100,
+                                 value * (1 + perturbation), dual, status))
+    return file1, file2
+
+
+def run_once(fn, file1, file2, tolerance):
+    start = time.time()
+    ans = fn(file1, file2, tolerance)
+    return ans, time.time() - start
+
+
+def compare_lines(file1, file2, tolerance):
+    return comparison._compare_numeric_lines(
+        file1, file2, ["\n", "\r"], None, comparison.strict_float_p,
+        tolerance, tolerance)
+
+
+def compare_blocks(file1, file2, tolerance):
+    return comparison.compare_file_with_numeric_values(
+        file1, file2, ignore=["\n", "\r"], tolerance=tolerance)[1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--lines', type=int, default=200000,
+                        help='Number of lines in each file')
+    parser.add_argument('--tolerance', type=float, default=1e-6,
+                        help='Absolute and relative tolerance')
+    parser.add_argument('--perturbation', type=float, default=1e-9,
+                        help='Relative change of the values in the second '
+                        'file (0 writes identical files)')
+    args = parser.parse_args()
+
+    dirname = tempfile.mkdtemp()
+    try:
+        file1, file2 = write_files(dirname, args.lines, args.perturbation)
+        size = os.path.getsize(file1) / 2.0**20
+        print("numpy: %s" % comparison.numpy_available)
+        print("%-12s %10s %10s %10s" % ('method', 'MB', 'seconds', 'MB/s'))
+        for name, fn in (('line', compare_lines), ('block', compare_blocks)):
+            lineno, elapsed = run_once(fn, file1, file2, args.tolerance)
+            if lineno is not None:
+                raise RuntimeError("%s comparison found a difference at "
+                                   "line %d" % (name, lineno))
+            print("%-12s %10.1f %10.3f %10.2f" %
+                  (name, size, elapsed, size / elapsed))
+    finally:
+        shutil.rmtree(dirname)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""
+Measure the cost of ExtensionPoint lookups in pyutilib.component.core.
+
+For 1, 100 and 10,000 plugins that implement an interface, the
+extension point is called, iterated and measured with len().  The
+lookups are timed with the cached services, and with the cache
+invalidated (by incrementing PluginGlobals.generation) before every
+lookup, which rebuilds the sorted list of services.
+"""
+
+import argparse
+import time
+
+from pyutilib.component.core import (Interface, Plugin, ExtensionPoint,
+                                     PluginGlobals, implements)
+
+
+class IBenchmark(Interface):
+    pass
+
+
+class BenchmarkPlugin(Plugin):
+    implements(IBenchmark, service=True)
+
+
+def lookup_rate(ep, operation, invalidate, duration):
+    n = 0
+    start = time.time()
+    elapsed = 0
+    while elapsed < duration:
+        for i in range(10):
+            if invalidate:
+                PluginGlobals.generation += 1
+            operation(ep)
+        n += 10
+        elapsed = time.time() - start
+    return elapsed / n
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--plugins', type=int, nargs='+',
+                        default=[1, 100, 10000],
+                        help="numbers of plugins that implement the interface")
+    parser.add_argument('--duration', type=float, default=0.5,
+                        help="number of seconds that each operation is timed")
+    args = parser.parse_args()
+
+    operations = [
+        ('ep()', lambda ep: ep()),
+        ('iter(ep)', lambda ep: [p for p in ep]),
+        ('len(ep)', lambda ep: len(ep)),
+    ]
+    ep = ExtensionPoint(IBenchmark)
+    print("%8s %-10s %14s %14s %8s" %
+          ("plugins", "operation", "cached (us)", "rebuilt (us)", "speedup"))
+    for nplugins in args.plugins:
+        plugins = [BenchmarkPlugin() for i in range(nplugins)]
+        if len(ep) != nplugins:
+            raise RuntimeError("Expected %d services, found %d" %
+                               (nplugins, len(ep)))
+        for name, operation in operations:
+            cached = lookup_rate(ep, operation, False, args.duration)
+            rebuilt = lookup_rate(ep, operation, True, args.duration)
+            print("%8d %-10s %14.2f %14.2f %8.1f" %
+                  (nplugins, name, cached * 1e6, rebuilt * 1e6,
+                   rebuilt / cached))
+        for plugin in plugins:
+            plugin.deactivate()
+        del plugins
+
+
+if __name__ == '__main__':
+    main()
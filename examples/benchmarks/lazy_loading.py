@@ -0,0 +1,112 @@
+"""
+Measure the time to load plugin modules with the ImportLoader, with and
+without a plugin manifest.
+
+A directory of plugin modules is generated, each of which declares an
+interface and plugins that implement it.  A fresh Python process then
+loads the directory with PluginEnvironment.load_services(): eagerly,
+with a manifest that does not exist yet (which imports every module and
+writes the manifest), and with the manifest (which defers the imports).
+The last process also constructs a plugin by its class name with
+PluginFactory(), which imports a single module.
+"""
+
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+module_template = '''
+from pyutilib.component.core import Interface, Plugin, SingletonPlugin, implements
+
+
+class IBenchmark%(i)d(Interface):
+    pass
+
+
+class Benchmark%(i)dService(SingletonPlugin):
+    implements(IBenchmark%(i)d, service=True)
+
+
+class Benchmark%(i)dPlugin(Plugin):
+    implements(IBenchmark%(i)d)
+'''
+
+function_template = '''
+
+def function%(j)d(x):
+    return [x + %(j)d for i in range(%(j)d)]
+'''
+
+
+def write_plugins(dirname, nmodules, nfunctions):
+    for i in range(nmodules):
+        with open(os.path.join(dirname, 'benchmark_plugin%d.py' % i),
+                  'w') as OUTPUT:
+            OUTPUT.write(module_template % {'i': i})
+            for j in range(nfunctions):
+                OUTPUT.write(function_template % {'j': j})
+
+
+def child(dirname, manifest, request):
+    start = time.time()
+    from pyutilib.component.core import PluginGlobals, PluginFactory
+    import pyutilib.component.loader
+    PluginGlobals.get_env().load_services(path=dirname, manifest=manifest)
+    if request:
+        plugin = PluginFactory('Benchmark0Plugin')
+        if type(plugin).__name__ != 'Benchmark0Plugin':
+            raise RuntimeError("Unexpected plugin %r" % plugin)
+    loaded = len([name for name in sys.modules
+                  if name.startswith('benchmark_plugin')])
+    print("%f %d" % (time.time() - start, loaded))
+
+
+def run(dirname, manifest, request):
+    cmd = [sys.executable, __file__, '--child', dirname]
+    if manifest is not None:
+        cmd += ['--manifest', manifest]
+    if request:
+        cmd.append('--request')
+    output = subprocess.check_output(cmd).decode().split()
+    return float(output[0]), int(output[1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--modules', type=int, default=200,
+                        help="number of plugin modules")
+    parser.add_argument('--functions', type=int, default=50,
+                        help="number of functions in each module")
+    parser.add_argument('--child', default=None, help=argparse.SUPPRESS)
+    parser.add_argument('--manifest', default=None, help=argparse.SUPPRESS)
+    parser.add_argument('--request', action='store_true',
+                        help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child is not None:
+        child(args.child, args.manifest, args.request)
+        return
+
+    tmpdir = tempfile.mkdtemp()
+    try:
+        plugins = os.path.join(tmpdir, 'plugins')
+        os.mkdir(plugins)
+        write_plugins(plugins, args.modules, args.functions)
+        manifest = os.path.join(tmpdir, 'manifest.json')
+        print("%-30s %10s %10s" % ("load", "time (s)", "imported"))
+        for name, manifest_, request in (
+                ("eager", None, False),
+                ("lazy (build manifest)", manifest, False),
+                ("lazy (manifest)", manifest, False),
+                ("lazy (manifest), 1 request", manifest, True)):
+            elapsed, loaded = run(plugins, manifest_, request)
+            print("%-30s %10.3f %10d" % (name, elapsed, loaded))
+    finally:
+        shutil.rmtree(tmpdir)
+
+
+if __name__ == '__main__':
+    main()
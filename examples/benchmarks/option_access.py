@@ -0,0 +1,69 @@
+"""
+Measure the throughput of option reads and writes through the
+VirtualOption descriptors that are created by declare_option().
+
+A plugin declares one option in its class definition and one in its
+constructor.  The options are read and written in a loop, and the rates
+are compared with a plain instance attribute.
+"""
+
+import argparse
+import time
+
+from pyutilib.component.core import Plugin, PluginGlobals
+from pyutilib.component.config.options import declare_option, IntOption
+
+
+class Settings(Plugin):
+
+    declare_option("class_option", section="benchmark", default=1,
+                   cls=IntOption)
+
+    def __init__(self):
+        declare_option("instance_option", section="benchmark", default=2,
+                       cls=IntOption)
+        self.attribute = 3
+
+
+def rate(fn, n):
+    start = time.time()
+    fn(n)
+    return n / (time.time() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--accesses', type=int, default=200000,
+                        help="number of reads or writes that are timed")
+    args = parser.parse_args()
+
+    obj = Settings()
+
+    def read_class_option(n):
+        for i in range(n):
+            obj.class_option
+
+    def read_instance_option(n):
+        for i in range(n):
+            obj.instance_option
+
+    def write_class_option(n):
+        for i in range(n):
+            obj.class_option = i
+
+    def read_attribute(n):
+        for i in range(n):
+            obj.attribute
+
+    print("%-28s %16s" % ("operation", "accesses/s"))
+    for name, fn in (("read class option", read_class_option),
+                     ("read instance option", read_instance_option),
+                     ("write class option", write_class_option),
+                     ("read plain attribute", read_attribute)):
+        print("%-28s %16.0f" % (name, rate(fn, args.accesses)))
+    if obj.class_option != args.accesses - 1:
+        raise RuntimeError("Unexpected option value %r" % obj.class_option)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""
+Measure the cost of creating and deleting short-lived plugins in
+pyutilib.component.core.
+
+Many interfaces are registered, each with one long-lived plugin.  Then
+plugins that implement two interfaces are created and deleted one at a
+time, which deactivates them.  Finally, many plugins are created in a
+separate environment and removed with a single
+PluginEnvironment.cleanup() call, and the same number of plugins are
+deactivated one at a time for comparison.
+"""
+
+import argparse
+import time
+
+from pyutilib.component.core import (Interface, Plugin, PluginGlobals,
+                                     ExtensionPoint, implements)
+
+
+class IJob(Interface):
+    pass
+
+
+class IJobOption(Interface):
+    pass
+
+
+class JobPlugin(Plugin):
+    implements(IJob, service=True)
+    implements(IJobOption, service=True)
+
+
+def register_interfaces(n, offset):
+    """Register n interfaces, each with one plugin."""
+    plugins = []
+    for i in range(offset, offset + n):
+        interface = type(Interface)('IChurn%d' % i, (Interface,), {})
+
+        class ChurnPlugin(Plugin):
+            implements(interface, service=True)
+
+        plugins.append(ChurnPlugin())
+    return plugins
+
+
+def churn(nplugins):
+    start = time.time()
+    for i in range(nplugins):
+        plugin = JobPlugin()
+        del plugin
+    return (time.time() - start) / nplugins
+
+
+def bulk(nplugins, env_name):
+    env = PluginGlobals.add_env(env_name)
+    plugins = [JobPlugin() for i in range(nplugins)]
+    start = time.time()
+    env.cleanup()
+    cleanup_time = time.time() - start
+    PluginGlobals.pop_env()
+    PluginGlobals.remove_env(env_name)
+    del plugins
+    #
+    plugins = [JobPlugin() for i in range(nplugins)]
+    start = time.time()
+    for plugin in plugins:
+        plugin.deactivate()
+    deactivate_time = time.time() - start
+    del plugins
+    return cleanup_time, deactivate_time
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--interfaces', type=int, nargs='+',
+                        default=[10, 100, 1000],
+                        help="numbers of registered interfaces")
+    parser.add_argument('--plugins', type=int, default=10000,
+                        help="number of plugins that are created and removed")
+    args = parser.parse_args()
+
+    print("%10s %14s %14s %18s" %
+          ("interfaces", "churn (us)", "cleanup (ms)", "deactivate (ms)"))
+    ep = ExtensionPoint(IJob)
+    holders = []
+    for n in sorted(args.interfaces):
+        holders.extend(register_interfaces(n - len(holders), len(holders)))
+        per_plugin = churn(args.plugins)
+        cleanup_time, deactivate_time = bulk(args.plugins, "churn%d" % n)
+        if len(ep) != 0:
+            raise RuntimeError("%d plugins were not removed" % len(ep))
+        print("%10d %14.2f %14.2f %18.2f" %
+              (len(PluginGlobals.interface_services), per_plugin * 1e6,
+               cleanup_time * 1e3, deactivate_time * 1e3))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,284 @@
+"""
+Load test pyutilib.pyro on the loopback interface.
+
+The script starts a Pyro4 name server, a dispatcher (dispatch_srvr)
+and N worker processes on this machine, all bound to 127.0.0.1.  For
+each combination of the swept parameters, a client keeps a window of
+tasks in flight and measures:
+
+  tasks/s    the number of completed tasks per second
+  p50, p99   the round trip latency of a task (from add_task(s) on the
+             client until its result is received), in milliseconds
+  disp cpu   the CPU time used by the dispatcher process, as a
+             percentage of the wall time (Linux only)
+
+Swept parameters:
+  --max-connections  values of PYUTILIB_PYRO_MAXCONNECTIONS for the
+                     dispatcher (0 means the Pyro default)
+  --sock-nodelay     values of the Pyro4 SOCK_NODELAY option (0 or 1)
+                     for all processes; with 0 (the Pyro4 default),
+                     small requests can be delayed by TCP delayed
+                     acknowledgements
+  --workers          the number of worker processes
+  --worker-classes   'task' (TaskWorker) and/or 'multi' (MultiTaskWorker)
+  --batches          the number of tasks per add_tasks/get_tasks call
+                     (1 means add_task and non-bulk task collection)
+  --sizes            the size of the task data (bytes)
+
+Each worker returns the length of the task data.  The tasks use a
+named queue type, since serpent (the default Pyro4 serializer) does not
+allow None as a dict key in the bulk requests.
+"""
+
+import argparse
+import contextlib
+import os
+import socket
+import subprocess
+import sys
+import time
+
+from pyutilib.pyro import (Client, Task, TaskWorker, MultiTaskWorker,
+                           using_pyro4)
+
+
+TYPE = 'loadtest'
+
+
+def echo(worker, data):
+    # A task without data shuts the worker down
+    if data is None:
+        worker._worker_shutdown = True
+        return None
+    return len(data)
+
+
+class EchoWorker(TaskWorker):
+
+    def process(self, data):
+        return echo(self, data)
+
+
+class MultiEchoWorker(MultiTaskWorker):
+
+    def process(self, data):
+        return echo(self, data)
+
+
+def worker_main(args):
+    kwds = {'host': '127.0.0.1', 'port': args.ns_port}
+    if args.worker == 'multi':
+        worker = MultiEchoWorker(type_default=TYPE, timeout_default=None,
+                                 **kwds)
+    else:
+        worker = EchoWorker(type=TYPE, **kwds)
+    if args.batch > 1:
+        worker._bulk_task_collection = True
+        worker._bulk_task_limit = args.batch
+    worker.run()
+
+
+def free_port():
+    s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    s.bind(('127.0.0.1', 0))
+    port = s.getsockname()[1]
+    s.close()
+    return port
+
+
+def cpu_time(pid):
+    # The user + system CPU time (seconds) of a process, from /proc
+    try:
+        with open('/proc/%d/stat' % pid) as f:
+            fields = f.read().rsplit(')', 1)[1].split()
+    except (IOError, OSError):
+        return None
+    return (int(fields[11]) + int(fields[12])) / \
+        float(os.sysconf('SC_CLK_TCK'))
+
+
+def wait_for(condition, timeout, what):
+    endtime = time.time() + timeout
+    while not condition():
+        if time.time() > endtime:
+            raise RuntimeError("Timed out waiting for the " + what)
+        time.sleep(0.01)
+
+
+class Cluster(object):
+    # The name server, the dispatcher and the workers
+
+    def __init__(self, max_connections, nodelay):
+        import Pyro4
+        self.processes = []
+        self.workers = []
+        self.ns_port = free_port()
+        self.devnull = open(os.devnull, 'w')
+        self.env = dict(os.environ)
+        self.env['PYRO_SOCK_NODELAY'] = str(nodelay)
+        Pyro4.config.SOCK_NODELAY = bool(nodelay)
+        self.ns = self.start([sys.executable, '-m', 'Pyro4.naming',
+                              '-n', '127.0.0.1', '-p', str(self.ns_port)])
+
+        def ns_ready():
+            try:
+                Pyro4.locateNS(host='127.0.0.1', port=self.ns_port)
+                return True
+            except Pyro4.errors.NamingError:
+                return False
+
+        wait_for(ns_ready, 30, "name server")
+        env = dict(self.env)
+        env.pop('PYUTILIB_PYRO_MAXCONNECTIONS', None)
+        if max_connections:
+            env['PYUTILIB_PYRO_MAXCONNECTIONS'] = str(max_connections)
+        self.dispatcher = self.start(
+            [sys.executable, '-m', 'pyutilib.pyro.dispatch_srvr',
+             '--daemon-host', '127.0.0.1',
+             '-n', '127.0.0.1', '-p', str(self.ns_port)], env=env)
+        ns = Pyro4.locateNS(host='127.0.0.1', port=self.ns_port)
+        wait_for(lambda: ns.list(prefix=":PyUtilibServer.dispatcher."),
+                 30, "dispatcher")
+        ns._pyroRelease()
+
+    def start(self, cmd, env=None):
+        process = subprocess.Popen(cmd, stdout=self.devnull,
+                                   stderr=subprocess.STDOUT,
+                                   env=self.env if env is None else env)
+        self.processes.append(process)
+        return process
+
+    def start_workers(self, num, worker_class, batch):
+        for i in range(num):
+            self.workers.append(self.start(
+                [sys.executable, os.path.abspath(__file__),
+                 '--worker', worker_class,
+                 '--ns-port', str(self.ns_port),
+                 '--batch', str(batch)]))
+
+    def stop_workers(self, client):
+        # Shut the workers down one at a time, so that each shutdown
+        # task is collected by a different worker.  (A worker that was
+        # killed would leave a pending request for tasks with the
+        # dispatcher.)
+        while self.workers:
+            client.add_task(Task(data=None, generateResponse=False))
+            wait_for(lambda: any(w.poll() is not None for w in self.workers),
+                     30, "worker to shut down")
+            for worker in [w for w in self.workers if w.poll() is not None]:
+                self.workers.remove(worker)
+                self.processes.remove(worker)
+
+    def shutdown(self):
+        for process in reversed(self.processes):
+            process.terminate()
+            process.wait()
+        self.devnull.close()
+
+
+def run(client, num_tasks, batch, size, window, dispatcher_pid):
+    client.clear_queue()
+    data = 'x' * size
+    sent = {}
+    latencies = []
+    next_id = 0
+    stime = time.time()
+    cpu_start = cpu_time(dispatcher_pid)
+    while len(latencies) < num_tasks:
+        while next_id < num_tasks and len(sent) < window:
+            num = min(batch, num_tasks - next_id, window - len(sent))
+            tasks = [Task(id=next_id + i, data=data) for i in range(num)]
+            now = time.time()
+            for task in tasks:
+                sent[task['id']] = now
+            if batch > 1:
+                client.add_tasks({TYPE: tasks})
+            else:
+                client.add_task(tasks[0])
+            next_id += num
+        results = client.dispatcher.get_results(
+            [(TYPE, True, 1.0)]).get(TYPE, [])
+        now = time.time()
+        for result in results:
+            assert result['result'] == size
+            latencies.append(now - sent.pop(result['id']))
+    elapsed = time.time() - stime
+    cpu_end = cpu_time(dispatcher_pid)
+    latencies.sort()
+    cpu = None
+    if cpu_start is not None and cpu_end is not None:
+        cpu = 100.0 * (cpu_end - cpu_start) / elapsed
+    return (num_tasks / elapsed,
+            1000 * latencies[len(latencies) // 2],
+            1000 * latencies[min(len(latencies) - 1,
+                                 int(0.99 * len(latencies)))],
+            cpu)
+
+
+def sweep(args, cluster, client, prefix):
+    for num_workers in args.workers:
+        for worker_class in args.worker_classes:
+            for batch in args.batches:
+                cluster.start_workers(num_workers, worker_class, batch)
+                window = args.window or 2 * num_workers * batch
+                for size in args.sizes:
+                    rate, p50, p99, cpu = run(client, args.tasks, batch,
+                                              size, window,
+                                              cluster.dispatcher.pid)
+                    print("%s %7d %6s %6d %8d %10.1f %8.2f %8.2f %9s"
+                          % (prefix, num_workers, worker_class, batch, size,
+                             rate, p50, p99,
+                             'n/a' if cpu is None else '%.0f%%' % cpu))
+                    sys.stdout.flush()
+                cluster.stop_workers(client)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument('--tasks', type=int, default=500,
+                        help='Tasks per configuration')
+    parser.add_argument('--max-connections', type=int, nargs='+',
+                        default=[0])
+    parser.add_argument('--sock-nodelay', type=int, nargs='+',
+                        default=[0, 1], choices=[0, 1])
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 4])
+    parser.add_argument('--worker-classes', nargs='+', default=['task'],
+                        choices=['task', 'multi'])
+    parser.add_argument('--batches', type=int, nargs='+', default=[1, 16])
+    parser.add_argument('--sizes', type=int, nargs='+',
+                        default=[10, 10000])
+    parser.add_argument('--window', type=int, default=None,
+                        help='Tasks in flight (default: 2 * workers * batch)')
+    # Options used to start the worker processes
+    parser.add_argument('--worker', help=argparse.SUPPRESS)
+    parser.add_argument('--ns-port', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--batch', type=int, default=1,
+                        help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        return worker_main(args)
+    if not using_pyro4:
+        sys.exit("This benchmark requires Pyro4")
+
+    print("%8s %7s %7s %6s %6s %8s %10s %8s %8s %9s"
+          % ('maxconn', 'nodelay', 'workers', 'class', 'batch', 'size',
+             'tasks/s', 'p50 ms', 'p99 ms', 'disp cpu'))
+    for max_connections in args.max_connections:
+        for nodelay in args.sock_nodelay:
+            cluster = Cluster(max_connections, nodelay)
+            try:
+                with open(os.devnull, 'w') as devnull:
+                    # Hide the connection messages
+                    with contextlib.redirect_stdout(devnull):
+                        client = Client(host='127.0.0.1',
+                                        port=cluster.ns_port, type=TYPE)
+                sweep(args, cluster, client, '%8s %7d' %
+                      (max_connections or 'default', nodelay))
+                client.close()
+            finally:
+                cluster.shutdown()
+
+if __name__ == '__main__':
+    main()
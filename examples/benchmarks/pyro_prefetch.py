@@ -0,0 +1,98 @@
+"""
+Measure pyutilib.pyro TaskWorker utilization with and without prefetch.
+
+A Dispatcher is created in-process (no name server or Pyro daemon is
+needed).  Every call that a worker makes to fetch tasks or to post
+results is delayed by --latency seconds, to stand in for the network
+round trip to a remote dispatcher.  The worker "processes" each task
+by sleeping for --duration seconds.  Utilization is the fraction of
+the worker's wall time spent inside process().
+
+With prefetch_depth=0 (the default) the worker is idle for two round
+trips at every batch boundary.  With prefetch_depth > 0 the next batch
+is fetched, and the results are posted, by background threads while
+process() runs.
+"""
+
+import argparse
+import time
+
+from pyutilib.pyro import Dispatcher, Task, TaskWorker
+
+
+class LatencyDispatcher(Dispatcher):
+
+    def __init__(self, latency, **kwds):
+        self.latency = latency
+        Dispatcher.__init__(self, **kwds)
+
+    def get_task(self, *args, **kwds):
+        time.sleep(self.latency)
+        return Dispatcher.get_task(self, *args, **kwds)
+
+    def get_tasks(self, *args, **kwds):
+        time.sleep(self.latency)
+        return Dispatcher.get_tasks(self, *args, **kwds)
+
+    def add_results(self, results):
+        time.sleep(self.latency)
+        Dispatcher.add_results(self, results)
+
+
+class SleepWorker(TaskWorker):
+
+    def __init__(self, *args, **kwds):
+        self.busy = 0.0
+        TaskWorker.__init__(self, *args, **kwds)
+
+    def process(self, data):
+        if data is None:
+            self._worker_shutdown = True
+            return None
+        stime = time.time()
+        time.sleep(data)
+        self.busy += time.time() - stime
+        return data
+
+
+def run(args, prefetch_depth):
+    disp = LatencyDispatcher(args.latency)
+    disp.add_tasks({None: [Task(id=i, data=args.duration)
+                           for i in range(args.tasks)]})
+    disp.add_task(Task(id=args.tasks, data=None))
+    worker = SleepWorker(dispatcher=disp,
+                         name='worker',
+                         prefetch_depth=prefetch_depth)
+    if args.batch > 1:
+        worker._bulk_task_collection = True
+        worker._bulk_task_limit = args.batch
+    stime = time.time()
+    worker.run()
+    elapsed = time.time() - stime
+    assert disp.num_results() == args.tasks
+    return elapsed, worker.busy / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument('--tasks', type=int, default=500)
+    parser.add_argument('--duration', type=float, default=0.001,
+                        help='Task duration (seconds)')
+    parser.add_argument('--latency', type=float, default=0.001,
+                        help='Simulated dispatcher round trip (seconds)')
+    parser.add_argument('--batch', type=int, default=1,
+                        help='Tasks per fetch (bulk task collection if > 1)')
+    parser.add_argument('--depths', type=int, nargs='+', default=[0, 1, 2])
+    args = parser.parse_args()
+
+    print("%d tasks of %.4f s, latency %.4f s, %d task(s) per fetch"
+          % (args.tasks, args.duration, args.latency, args.batch))
+    print("%-14s %10s %12s" % ('prefetch_depth', 'wall (s)', 'utilization'))
+    for depth in args.depths:
+        elapsed, utilization = run(args, depth)
+        print("%-14d %10.3f %11.1f%%" % (depth, elapsed, 100 * utilization))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+"""
+Compare the makespan of pyutilib.pyro Dispatcher scheduling options.
+
+A Dispatcher is created in-process (no name server or Pyro daemon is
+needed) and a set of tasks with skewed durations is queued.  Worker
+threads then repeatedly request tasks in bulk (as TaskWorker does with
+bulk task collection enabled) and "process" each task by sleeping for
+its duration.  The makespan is the time until the last result is
+posted.
+
+Configurations:
+  fifo             the historical behavior: each bulk fetch drains the queue
+  fifo+max_tasks   each bulk fetch returns at most --max-tasks tasks
+  fifo+fair        each bulk fetch returns an even share of the queue
+  priority+fair    longest tasks first (priority = -duration)
+  priority+max     longest tasks first, at most --max-tasks per fetch
+  sef+fair         shortest expected duration first
+"""
+
+import argparse
+import random
+import threading
+import time
+
+from pyutilib.pyro import Dispatcher, Task
+
+CONFIGS = [
+    ('fifo', {}, None),
+    ('fifo+max_tasks', {}, 'max_tasks'),
+    ('fifo+fair', {'fair_bulk_fetch': True}, None),
+    ('priority+fair', {'policy': 'priority', 'fair_bulk_fetch': True}, None),
+    ('priority+max', {'policy': 'priority'}, 'max_tasks'),
+    ('sef+fair', {'policy': 'shortest_expected_first',
+                  'fair_bulk_fetch': True}, None),
+]
+
+
+def make_durations(num_tasks, scale, seed):
+    # Pareto distributed durations: most tasks are short, a few are long
+    rng = random.Random(seed)
+    return [min(scale * rng.paretovariate(1.5), 50 * scale)
+            for i in range(num_tasks)]
+
+
+def worker(disp, name, max_tasks, start):
+    start.wait()
+    while True:
+        tasks = disp.get_tasks(((None, True, 0.01),), max_tasks=max_tasks)
+        if not tasks:
+            if not disp.num_tasks():
+                break
+            continue
+        results = []
+        for task in tasks[None]:
+            time.sleep(task['data'])
+            task['processedBy'] = name
+            results.append(task)
+        disp.add_results({None: results})
+
+
+def run(durations, num_workers, kwds, max_tasks):
+    disp = Dispatcher(**kwds)
+    names = ['worker_%d' % i for i in range(num_workers)]
+    for name in names:
+        disp.register_worker(name)
+    disp.add_tasks({None: [Task(id=i,
+                                data=d,
+                                priority=-d,
+                                expected_duration=d)
+                           for i, d in enumerate(durations)]})
+    start = threading.Event()
+    threads = [threading.Thread(target=worker,
+                                args=(disp, name, max_tasks, start))
+               for name in names]
+    for th in threads:
+        th.start()
+    stime = time.time()
+    start.set()
+    for th in threads:
+        th.join()
+    makespan = time.time() - stime
+    assert disp.num_results() == len(durations)
+    return makespan
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument('--tasks', type=int, default=400)
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--scale', type=float, default=0.002,
+                        help='Minimum task duration (seconds)')
+    parser.add_argument('--max-tasks', type=int, default=4)
+    parser.add_argument('--seed', type=int, default=1234)
+    args = parser.parse_args()
+
+    durations = make_durations(args.tasks, args.scale, args.seed)
+    total = sum(durations)
+    print("%d tasks, %d workers, total work %.3f s, ideal makespan %.3f s"
+          % (args.tasks, args.workers, total,
+             max(total / args.workers, max(durations))))
+    print("%-16s %10s" % ('config', 'makespan'))
+    for name, kwds, limit in CONFIGS:
+        max_tasks = args.max_tasks if limit else None
+        print("%-16s %10.3f" % (name, run(durations, args.workers, kwds,
+                                          max_tasks)))
+
+
+if __name__ == '__main__':
+    main()
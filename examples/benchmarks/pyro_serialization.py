@@ -0,0 +1,145 @@
+"""
+Measure the task round trip rate of the pyutilib.pyro task serializers.
+
+Each round trip mimics the path of one task through Pyro4 without the
+network: the Client encodes the task, the task dict is serialized and
+deserialized with the Pyro4 wire serializer (--wire, serpent by
+default) on its way to the worker, the worker decodes the data, calls
+process() (which returns a small summary of the data) and encodes the
+result, and the result is serialized back to the Client, which decodes
+it.
+
+Payloads:
+  small   a dict with a few numbers and strings
+  list    a list of --size floats
+  blob    a bytes-like object of 8 * --size bytes that pickles its
+          buffer out-of-band with protocol 5 (like a NumPy array)
+
+Serializers:
+  none          the task dict is only serialized by Pyro (the default)
+  pickle        pickle.HIGHEST_PROTOCOL
+  pickle5       protocol 5 with out-of-band buffers
+  pickle+zlib   pickle, compressed with zlib
+The blob payload cannot be sent with serpent unless it is encoded by
+a task serializer.
+Each serializer is run with the task data returned with the result
+(return_data=True, the default) and stripped from it ('-strip').
+"""
+
+import argparse
+import pickle
+import random
+import time
+
+from Pyro4.errors import SecurityError
+from Pyro4.util import get_serializer as get_wire_serializer
+
+from pyutilib.pyro import Client, Task, TaskWorker
+from pyutilib.pyro.serialization import out_of_band_available
+
+SERIALIZERS = ['none', 'pickle', 'pickle5', 'pickle+zlib']
+
+
+class Blob(bytearray):
+
+    def __reduce_ex__(self, protocol):
+        if protocol >= 5:
+            return type(self)._reconstruct, (pickle.PickleBuffer(self),)
+        return type(self), (bytes(self),)
+
+    @classmethod
+    def _reconstruct(cls, obj):
+        with memoryview(obj) as m:
+            return cls(m)
+
+
+class Endpoint(object):
+    # Stands in for the Pyro dispatcher and the worker: every task is
+    # processed as soon as it is added
+
+    def __init__(self, wire):
+        self.wire = wire
+        self.worker = SummaryWorker.__new__(SummaryWorker)
+        self.worker._serializer = None
+        self.result = None
+
+    def transmit(self, obj):
+        data, compressed = self.wire.serializeData(obj)
+        return self.wire.deserializeData(data, compressed)
+
+    def add_task(self, task, type=None):
+        task = self.transmit(task)
+        self.worker._process_task(task)
+        self.result = self.transmit(task)
+
+    def get_result(self, type=None, block=True, timeout=5):
+        return self.result
+
+
+class SummaryWorker(TaskWorker):
+
+    def process(self, data):
+        return len(data)
+
+
+def make_payload(kind, size):
+    rng = random.Random(0)
+    if kind == 'small':
+        return {'x': 1.5, 'n': 42, 'name': 'scenario_1', 'flags': [1, 2, 3]}
+    if kind == 'list':
+        return [rng.random() for i in range(size)]
+    return Blob(bytes(bytearray(rng.getrandbits(8) for i in range(256)))
+                * (8 * size // 256))
+
+
+def run(endpoint, serializer, return_data, payload, seconds):
+    client = Client(dispatcher=endpoint,
+                    serializer=None if serializer == 'none' else serializer,
+                    return_data=return_data)
+    count = 0
+    stime = time.time()
+    while True:
+        client.add_task(Task(id=count, data=payload))
+        result = client.get_result()
+        assert result['result'] == len(payload)
+        count += 1
+        elapsed = time.time() - stime
+        if elapsed > seconds:
+            return count / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument('--wire', default='serpent',
+                        help='Pyro4 serializer for the task dicts')
+    parser.add_argument('--size', type=int, default=100000)
+    parser.add_argument('--seconds', type=float, default=0.5,
+                        help='Time spent on each configuration')
+    args = parser.parse_args()
+
+    endpoint = Endpoint(get_wire_serializer(args.wire))
+    serializers = [s for s in SERIALIZERS
+                   if s != 'pickle5' or out_of_band_available]
+    kinds = ['small', 'list', 'blob']
+    print("wire serializer: %s, size: %d; round trips per second"
+          % (args.wire, args.size))
+    print("%-18s" % ('serializer',) + "".join("%12s" % k for k in kinds))
+    payloads = dict((k, make_payload(k, args.size)) for k in kinds)
+    for serializer in serializers:
+        for return_data in (True, False):
+            name = serializer + ('' if return_data else '-strip')
+            rates = []
+            for k in kinds:
+                try:
+                    rates.append("%12.1f" % run(endpoint, serializer,
+                                                return_data, payloads[k],
+                                                args.seconds))
+                except SecurityError:
+                    # serpent refuses to serialize the Blob class
+                    rates.append("%12s" % 'n/a')
+            print("%-18s" % (name,) + "".join(rates))
+
+
+if __name__ == '__main__':
+    main()
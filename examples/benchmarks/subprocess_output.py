@@ -0,0 +1,78 @@
+"""
+Measure the throughput of the pyutilib.subprocess output readers.
+
+A child Python process writes a fixed amount of line-oriented output
+to stdout (and optionally stderr), which run_command() collects through
+the reader threads (ostream / tee).  The benchmark is repeated for
+several values of the read_chunksize option; read_chunksize=1
+corresponds to the historical byte-at-a-time reader.
+"""
+
+import argparse
+import sys
+
+import six
+import pyutilib.misc
+import pyutilib.subprocess
+from pyutilib.subprocess import timer
+
+CHILD_SCRIPT = """
+import sys
+line = 'x' * %(width)d + '\\n'
+block = line * 1000
+n = %(nbytes)d // len(block) + 1
+for i in range(n):
+    sys.stdout.write(block)
+    if %(stderr)s:
+        sys.stderr.write(line)
+"""
+
+
+def run_once(nbytes, width, chunksize, tee, stderr):
+    script = CHILD_SCRIPT % {
+        'nbytes': nbytes,
+        'width': width,
+        'stderr': stderr,
+    }
+    out = six.StringIO()
+    if tee:
+        tee_out = six.StringIO()
+        pyutilib.misc.setup_redirect(tee_out)
+    try:
+        start = timer()
+        pyutilib.subprocess.run([sys.executable, '-c', script],
+                                ostream=out,
+                                tee=tee,
+                                read_chunksize=chunksize)
+        elapsed = timer() - start
+    finally:
+        if tee:
+            pyutilib.misc.reset_redirect()
+    return len(out.getvalue()), elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--megabytes', type=float, default=8,
+                        help='Amount of output generated by the child')
+    parser.add_argument('--width', type=int, default=79,
+                        help='Length of each output line')
+    parser.add_argument('--chunksizes', default='1,1024,65536',
+                        help='Comma-separated list of read chunk sizes')
+    parser.add_argument('--tee', action='store_true',
+                        help='Also tee the output to (a redirected) stdout')
+    parser.add_argument('--stderr', action='store_true',
+                        help='Also write to stderr (uses the merged reader)')
+    args = parser.parse_args()
+
+    nbytes = int(args.megabytes * 2**20)
+    print("%12s %12s %10s %10s" % ('chunksize', 'bytes', 'seconds', 'MB/s'))
+    for chunksize in (int(x) for x in args.chunksizes.split(',')):
+        size, elapsed = run_once(nbytes, args.width, chunksize, args.tee,
+                                 args.stderr)
+        print("%12d %12d %10.3f %10.2f" %
+              (chunksize, size, elapsed, size / 2.0**20 / elapsed))
+
+
+if __name__ == '__main__':
+    main()
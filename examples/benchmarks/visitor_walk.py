@@ -0,0 +1,162 @@
+"""
+Measure the time to walk large expression trees with the visitors in
+pyutilib.misc.visitor.
+
+A random expression tree of sum and product nodes is built, whose
+leaves are variables and floating point constants.  The tree is
+evaluated with ValueVisitor.dfs_postorder_deque(),
+ValueVisitor.dfs_postorder_stack() and
+DispatchValueVisitor.dfs_postorder_dispatch(), and the nodes are
+counted with SimpleVisitor.dfs_postorder() and SimpleVisitor.bfs().
+The evaluations must return the same value.
+"""
+
+import argparse
+import random
+import time
+
+from pyutilib.misc.visitor import (SimpleVisitor, ValueVisitor,
+                                   DispatchValueVisitor)
+
+
+class Var(object):
+    __slots__ = ('value',)
+    children = ()
+
+    def __init__(self, value):
+        self.value = value
+
+
+class Sum(object):
+    __slots__ = ('children',)
+
+    def __init__(self, children):
+        self.children = children
+
+
+class Product(object):
+    __slots__ = ('children',)
+
+    def __init__(self, children):
+        self.children = children
+
+
+def _prod(values):
+    ans = 1.0
+    for value in values:
+        ans *= value
+    return ans
+
+
+def build_tree(nnodes, seed=1):
+    """
+    Build a tree with about nnodes nodes, level by level from the leaves.
+    """
+    rng = random.Random(seed)
+    nodes = []
+    for i in range(nnodes * 3 // 5):
+        if rng.random() < 0.7:
+            nodes.append(Var(rng.uniform(-1, 1)))
+        else:
+            nodes.append(rng.uniform(-1, 1))
+    while len(nodes) > 1:
+        parents = []
+        i = 0
+        while i < len(nodes):
+            n = rng.randint(2, 3)
+            cls = Sum if rng.random() < 0.7 else Product
+            parents.append(cls(nodes[i:i + n]))
+            i += n
+        if len(parents[-1].children) == 1:
+            parents[-1] = parents[-1].children[0]
+        nodes = parents
+    return nodes[0]
+
+
+class EvaluationVisitor(ValueVisitor):
+
+    def visit(self, node, values):
+        if node.__class__ is Sum:
+            return sum(values)
+        return _prod(values)
+
+    def visiting_potential_leaf(self, node):
+        if node.__class__ is float:
+            return True, node
+        if node.__class__ is Var:
+            return True, node.value
+        return False, None
+
+    def finalize(self, ans):
+        return ans
+
+
+class CountVisitor(SimpleVisitor):
+
+    def __init__(self):
+        self.count = 0
+
+    def visit(self, node):
+        self.count += 1
+
+    def children(self, node):
+        if node.__class__ is float:
+            return ()
+        return node.children
+
+    def is_leaf(self, node):
+        return node.__class__ is float or node.__class__ is Var
+
+    def finalize(self):
+        return self.count
+
+
+def dispatch_visitor():
+    return DispatchValueVisitor(
+        leaf_callbacks={float: lambda node: node,
+                        Var: lambda node: node.value},
+        node_callbacks={Sum: lambda node, values: sum(values),
+                        Product: lambda node, values: _prod(values)})
+
+
+def run(name, fn, root, repeat):
+    best = None
+    for i in range(repeat):
+        start = time.time()
+        ans = fn(root)
+        elapsed = time.time() - start
+        best = elapsed if best is None else min(best, elapsed)
+    print("%-34s %10.3f %16.6g" % (name, best, ans))
+    return ans
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--nodes', type=int, default=1000000,
+                        help="approximate number of nodes in the tree")
+    parser.add_argument('--repeat', type=int, default=3,
+                        help="number of times that each walk is timed")
+    args = parser.parse_args()
+
+    root = build_tree(args.nodes)
+    count = CountVisitor().dfs_postorder(root)
+    print("%d nodes" % count)
+    print("%-34s %10s %16s" % ("walker", "time (s)", "result"))
+    values = [
+        run("ValueVisitor.dfs_postorder_deque",
+            EvaluationVisitor().dfs_postorder_deque, root, args.repeat),
+        run("ValueVisitor.dfs_postorder_stack",
+            EvaluationVisitor().dfs_postorder_stack, root, args.repeat),
+        run("DispatchValueVisitor", dispatch_visitor().dfs_postorder_dispatch,
+            root, args.repeat),
+    ]
+    run("SimpleVisitor.dfs_postorder",
+        lambda root: CountVisitor().dfs_postorder(root), root, args.repeat)
+    run("SimpleVisitor.bfs", lambda root: CountVisitor().bfs(root), root,
+        args.repeat)
+    if len(set(values)) != 1:
+        raise RuntimeError("The evaluations differ: %r" % values)
+
+
+if __name__ == '__main__':
+    main()
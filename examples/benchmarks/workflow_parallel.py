@@ -0,0 +1,128 @@
+"""
+Measure the makespan of a wide pyutilib.workflow DAG with serial and
+concurrent (thread pool) execution.
+
+The workflow has --depth layers of --width tasks.  Task i of a layer
+depends on tasks i and i+1 (mod width) of the previous layer, and a
+final task sums the outputs of the last layer.  Each task does one of
+the following kinds of work (--kinds):
+
+  sleep    sleep for --duration seconds (e.g., waiting for I/O or for
+           an external command)
+  hash     compute SHA-256 digests of a 1 MB buffer for about
+           --duration seconds; hashlib releases the GIL, so this
+           work can run in parallel in threads
+  python   a pure Python loop that runs for about --duration seconds;
+           this holds the GIL, so threads do not speed it up
+  none     no work, which measures the overhead of the scheduler
+
+The speedup is relative to serial execution of the same workflow.
+"""
+
+import argparse
+import hashlib
+import time
+
+import pyutilib.workflow
+
+_buffer = b'x' * (1 << 20)
+
+
+def _sleep(duration):
+    time.sleep(duration)
+
+
+def _hash(duration):
+    endtime = time.time() + duration
+    while time.time() < endtime:
+        hashlib.sha256(_buffer).digest()
+
+
+def _python(duration):
+    endtime = time.time() + duration
+    while time.time() < endtime:
+        sum(i * i for i in range(1000))
+
+
+def _none(duration):
+    pass
+
+
+work = {'sleep': _sleep, 'hash': _hash, 'python': _python, 'none': _none}
+
+
+class WorkTask(pyutilib.workflow.Task):
+
+    def __init__(self, kind, duration):
+        pyutilib.workflow.Task.__init__(self)
+        self.inputs.declare('x', action='append')
+        self.outputs.declare('y')
+        self.work = work[kind]
+        self.duration = duration
+
+    def execute(self):
+        self.work(self.duration)
+        self.y = sum(self.x)
+
+
+def create_workflow(args, kind, executor, max_workers):
+    # Ports refer to tasks with weak references, so the tasks are
+    # returned with the workflow
+    tasks = []
+    layer = None
+    for d in range(args.depth):
+        new_layer = [WorkTask(kind, args.duration) for i in range(args.width)]
+        for i, task in enumerate(new_layer):
+            if layer is None:
+                task.inputs.x = 1
+            else:
+                task.inputs.x = layer[i].outputs.y
+                task.inputs.x = layer[(i + 1) % args.width].outputs.y
+        tasks.extend(new_layer)
+        layer = new_layer
+    final = WorkTask('none', 0)
+    for task in layer:
+        final.inputs.x = task.outputs.y
+    tasks.append(final)
+    w = pyutilib.workflow.Workflow(executor=executor, max_workers=max_workers)
+    w.add(final)
+    return w, tasks
+
+
+def run(args, kind, executor, max_workers):
+    w, tasks = create_workflow(args, kind, executor, max_workers)
+    stime = time.time()
+    ans = w()
+    elapsed = time.time() - stime
+    assert ans.y == args.width * 2**(args.depth - 1)
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument('--width', type=int, default=32)
+    parser.add_argument('--depth', type=int, default=4)
+    parser.add_argument('--duration', type=float, default=0.01,
+                        help='Task duration (seconds)')
+    parser.add_argument('--kinds', nargs='+', default=['sleep', 'hash',
+                                                        'python', 'none'],
+                        choices=sorted(work))
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 4, 16],
+                        help='Thread pool sizes')
+    args = parser.parse_args()
+
+    print("%d tasks (width=%d, depth=%d)" %
+          (args.width * args.depth, args.width, args.depth))
+    print("%8s %10s %12s %8s" % ('kind', 'executor', 'makespan s',
+                                 'speedup'))
+    for kind in args.kinds:
+        serial = run(args, kind, None, None)
+        print("%8s %10s %12.3f %8s" % (kind, 'serial', serial, '1.00'))
+        for num in args.workers:
+            elapsed = run(args, kind, 'thread', num)
+            print("%8s %10s %12.3f %8.2f" % (kind, 'thread-%d' % num,
+                                             elapsed, serial / elapsed))
+
+if __name__ == '__main__':
+    main()
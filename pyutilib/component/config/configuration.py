@@ -16,8 +16,8 @@ A key role of this class is to support initialization of Option objects.
 """
 
 import os.path
-from pyutilib.component.core import PluginError, Interface, Plugin, ExtensionPoint, implements, IOptionDataProvider
-from pyutilib.component.config.options import IOption, IFileOption, IUpdatedOptionsAction
+from pyutilib.component.core import PluginError, Interface, Plugin, ExtensionPoint, implements, IOptionDataProvider, PluginGlobals
+from pyutilib.component.config.options import IOption, IFileOption, IUpdatedOptionsAction, OptionPlugin
 
 
 class ConfigurationError(PluginError):
@@ -35,6 +35,78 @@ class IConfiguration(Interface):
         """Save configuration information to the specified file."""
 
 
+def _has_default_method(plugin, name):
+    """Return True if the plugin uses the OptionPlugin method."""
+    method = getattr(type(plugin), name, None)
+    default = getattr(OptionPlugin, name)
+    return getattr(method, '__func__', method) is \
+        getattr(default, '__func__', default)
+
+
+class _OptionIndex(object):
+    """
+    An index of the option plugins by section and option name.
+
+    The plugins that use the OptionPlugin matches_section() and
+    matches_name() methods are indexed by their section and name, and
+    the plugins with a section regular expression are grouped by that
+    expression, so each expression is matched once per section.  The
+    methods of the other plugins are called for each section and
+    option.  The matching plugins are returned in the order of the
+    IOption extension point.
+    """
+
+    def __init__(self, plugins):
+        self.generation = PluginGlobals.generation
+        self.plugins = list(plugins)
+        # section -> indices of the plugins
+        self.sections = {}
+        # section_re -> (compiled expression, indices of the plugins)
+        self.patterns = {}
+        # indices of the plugins that redefine the matching methods
+        self.generic = []
+        for i, plugin in enumerate(self.plugins):
+            if not (_has_default_method(plugin, 'matches_section') and
+                    _has_default_method(plugin, 'matches_name')):
+                self.generic.append(i)
+                continue
+            self.sections.setdefault(plugin.section, []).append(i)
+            if plugin.section_re is not None:
+                self.patterns.setdefault(plugin.section_re,
+                                         (plugin.section_p, []))[1].append(i)
+
+    def section(self, section):
+        """
+        Return a function that returns the list of the plugins that
+        match this section and a given option name.
+        """
+        plugins = self.plugins
+        matched = set(self.sections.get(section, ()))
+        for section_p, indices in self.patterns.values():
+            if section_p.match(section) is not None:
+                matched.update(indices)
+        # option name -> indices of the plugins
+        names = {}
+        wildcards = []
+        for i in sorted(matched):
+            name = plugins[i].name
+            if name == "":
+                wildcards.append(i)
+            else:
+                names.setdefault(name, []).append(i)
+        generic = [i for i in self.generic
+                   if plugins[i].matches_section(section)]
+
+        def matches(option):
+            indices = names.get(option, [])
+            if wildcards or generic:
+                indices = sorted(indices + wildcards + [
+                    i for i in generic if plugins[i].matches_name(option)])
+            return [plugins[i] for i in indices]
+
+        return matches
+
+
 class Configuration(Plugin):
     """This class manages configuration data.  Further, this configuration
     I/O is coordinated with Option objects.  When configuration data is read
@@ -108,21 +180,20 @@ class Configuration(Plugin):
         #
         # Iterate through all sections, in the order they were
         # loaded.  Load data for extensions that match each section name.
+        # The index is rebuilt if loading an option changes the plugins.
         #
+        index = None
         for sec in self.section:
+            if index is None or index.generation != PluginGlobals.generation:
+                index = _OptionIndex(self.option_plugins)
             #
             # Find the option_plugins that match this section
             #
-            plugins = []
-            for plugin in self.option_plugins:
-                if plugin.matches_section(sec):
-                    plugins.append(plugin)
+            matches = index.section(sec)
             for option in self.data[sec]:
                 flag = False
-                for plugin in plugins:
-                    if plugin.matches_name(option):
-                        flag = plugin.load(option,
-                                           self.data[sec][option]) or flag
+                for plugin in matches(option):
+                    flag = plugin.load(option, self.data[sec][option]) or flag
                 if not flag:
                     raise ConfigurationError(
                         "Problem loading file %r. Option %r in section %r is not recognized!"
@@ -148,25 +219,21 @@ class Configuration(Plugin):
         self.section.sort()
         flag = False
         header = "\nNote: the following configuration options have been omitted because their\nvalue is 'None':\n"
+        index = _OptionIndex(self.option_plugins)
         for sec in self.section:
-            plugins = []
-            for plugin in self.option_plugins:
-                if plugin.matches_section(sec):
-                    plugins.append(plugin)
+            matches = index.section(sec)
             #
             options = list(self.data[sec].keys())
             options.sort()
             for option in options:
-                for plugin in plugins:
-                    if plugin.matches_name(option):
-                        if not self.data[sec][option] is None:
-                            val = self.data[sec][option]
-                            self.config.append((sec, option, val))
-                        else:
-                            flag = True
-                            header = header + "  section=%r option=%r\n" % (
-                                sec, option)
-                        break
+                if matches(option):
+                    if not self.data[sec][option] is None:
+                        val = self.data[sec][option]
+                        self.config.append((sec, option, val))
+                    else:
+                        flag = True
+                        header = header + "  section=%r option=%r\n" % (
+                            sec, option)
         if flag:
             header = header + "\n"
         else:
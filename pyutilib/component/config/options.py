@@ -134,6 +134,34 @@ class OptionData(Plugin):
                 del self.data[key]
 
 
+class _DataProviderBinding(object):
+    """
+    Returns the IOptionDataProvider service of an extension point.  The
+    service is bound until PluginGlobals.generation changes, which
+    happens when plugins are activated, deactivated, enabled, disabled
+    or deleted.  Thus, most option reads and writes do not search the
+    extension point.
+    """
+
+    __slots__ = ('ep', 'generation', 'ref')
+
+    def __init__(self, ep):
+        self.ep = ep
+        self.generation = None
+        self.ref = None
+
+    def __call__(self):
+        if self.generation == PluginGlobals.generation:
+            provider = self.ref()
+            if provider is not None:
+                return provider
+        provider = self.ep.service()
+        if provider is not None:
+            self.ref = weakref.ref(provider)
+            self.generation = PluginGlobals.generation
+        return provider
+
+
 class OptionPlugin(Plugin):
     """Manages the initialization of an Option."""
 
@@ -145,6 +173,7 @@ class OptionPlugin(Plugin):
         construct one if one hasn't already been provided.
         """
         self.data = ExtensionPoint(IOptionDataProvider)
+        self._data_provider = _DataProviderBinding(self.data)
         if PluginGlobals._default_OptionData is None:
             PluginGlobals._default_OptionData = OptionData()
         #
@@ -158,6 +187,7 @@ class OptionPlugin(Plugin):
             PluginGlobals.plugin_instances[
                 PluginGlobals._default_OptionData._id] = weakref.ref(
                     PluginGlobals._default_OptionData)
+            PluginGlobals.generation += 1
         #
         if len(self.data) == 0:
             #if False:
@@ -207,7 +237,7 @@ class OptionPlugin(Plugin):
         """
         Get the option value.
         """
-        return self.data.service().get(self.section, self.name)
+        return self._data_provider().get(self.section, self.name)
 
     def set_value(self, _value_, raw=False):
         """
@@ -216,11 +246,11 @@ class OptionPlugin(Plugin):
         specified to force the raw value to be inserted.
         """
         if raw:
-            self.data.service().set(self.section, self.name, _value_)
+            self._data_provider().set(self.section, self.name, _value_)
         else:
             if not type(_value_) is list or len(_value_) == 0:
                 _value_ = [_value_]
-            self.data.service().set(self.section, self.name, self.convert(
+            self._data_provider().set(self.section, self.name, self.convert(
                 _value_, self.default))
 
     def load(self, _option_, _value_):
@@ -336,11 +366,17 @@ class VirtualOption(object):
         """Returns the value of the option, accessed through the local instance."""
         if owner is None:  #pragma:nocover
             return self
-        return self._get_option(instance).get_value()
+        option = self.option
+        if option is None:
+            option = self._get_option(instance)
+        return option.get_value()
 
     def __set__(self, instance, value):
         """Sets the value of the option"""
-        self._get_option(instance).set_value(value)
+        option = self.option
+        if option is None:
+            option = self._get_option(instance)
+        option.set_value(value)
 
     def __repr__(self, simple=False):
         """Returns a string representation of the option name"""
@@ -409,31 +445,32 @@ class DictOption(Option):
             ep = ExtensionPoint(IOptionDataProvider)
             ep.service().ignore_missing = ignore_missing
             self.__dict__["data"] = ep
+            self.__dict__["_data_provider"] = _DataProviderBinding(ep)
 
         def __iter__(self):
-            if not self._section_ in self.data.service().data:
+            if not self._section_ in self._data_provider().data:
                 return {}.__iter__()
-            return self.data.service().data[self._section_].__iter__()
+            return self._data_provider().data[self._section_].__iter__()
 
         def __getitem__(self, name):
-            return self.data.service().get(self._section_, name)
+            return self._data_provider().get(self._section_, name)
 
         def keys(self):
-            if not self._section_ in self.data.service().data:
+            if not self._section_ in self._data_provider().data:
                 return []
-            return self.data.service().data[self._section_].keys()
+            return self._data_provider().data[self._section_].keys()
 
         def __getattr__(self, name):
             try:
                 return self.__dict__[name]
             except:
-                return self.data.service().get(self._section_, name)
+                return self._data_provider().get(self._section_, name)
 
         def __setattr__(self, name, value):
             if name[0] == "_":
                 self.__dict__[name] = value
             else:
-                self.data.service().set(self._section_, name, value)
+                self._data_provider().set(self._section_, name, value)
 
     def __init__(self, **kwds):
         """Constructor."""
@@ -469,7 +506,7 @@ class DictOption(Option):
         Data is loaded one option/value pair at a time, so this
         method circumvents the core logic of this class.
         """
-        self.data.service().set(self.section, _option_, _value_[-1])
+        self._data_provider().set(self.section, _option_, _value_[-1])
         return True
 
     def default_str(self):
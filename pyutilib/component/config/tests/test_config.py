@@ -10,7 +10,7 @@ currdir = dirname(abspath(__file__)) + os.sep
 
 from nose.tools import nottest
 from pyutilib.component.core import ExtensionPoint, Plugin, PluginGlobals
-from pyutilib.component.config.options import FileOption, declare_option
+from pyutilib.component.config.options import FileOption, Option, DictOption, declare_option
 from pyutilib.component.config import Configuration, ConfigurationError
 import pyutilib.th as unittest
 import pyutilib.misc
@@ -148,6 +148,42 @@ class Test(unittest.TestCase):
         PluginGlobals.remove_env(
             "testing.config_loading", cleanup=True, singleton=False)
 
+    def test_load6(self):
+        """Test load method with regular expressions, section options
+        and options that redefine the matching methods"""
+        PluginGlobals.add_env("testing.config_loading")
+
+        class CustomOption(Option):
+
+            def matches_section(self, section):
+                return section == "custom"
+
+            def matches_name(self, name):
+                return True
+
+            def load(self, option, value):
+                self.loaded.append((option, value))
+                return True
+
+        class TMP3(Plugin):
+
+            def __init__(self):
+                declare_option("yy", section_re='extra:.*')
+                declare_option("extra", section="extra:one", cls=DictOption)
+                declare_option("custom", cls=CustomOption)
+
+        try:
+            config = Configuration()
+            tmp3 = TMP3()
+            tmp3._custom.loaded = []
+            config.load(currdir + "config5.ini")
+            self.assertEqual(tmp3.yy, "2")
+            self.assertEqual(tmp3.extra.zz, "3")
+            self.assertEqual(tmp3._custom.loaded, [("anything", ["4"])])
+        finally:
+            PluginGlobals.remove_env(
+                "testing.config_loading", cleanup=True, singleton=False)
+
     def test_save1(self):
         """Test save method"""
         config = Configuration()
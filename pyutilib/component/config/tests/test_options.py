@@ -6,7 +6,7 @@ currdir = dirname(abspath(__file__)) + os.sep
 
 import unittest
 from pyutilib.component.core import Interface, PluginGlobals, ExtensionPoint, implements, Plugin
-from pyutilib.component.config.options import Option, OptionError, IOption, declare_option, FileOption, IntOption, FloatOption, DictOption, BoolOption
+from pyutilib.component.config.options import Option, OptionData, OptionError, IOption, declare_option, FileOption, IntOption, FloatOption, DictOption, BoolOption
 
 PluginGlobals.add_env("testing.options")
 
@@ -361,6 +361,28 @@ class TestOption(unittest.TestCase):
         except OptionError:
             pass
 
+    def test_data_provider(self):
+        """Test that options use the current IOptionDataProvider service"""
+
+        class TMP_data_provider(Plugin):
+            declare_option("o1", section="a.b", default=1)
+
+        obj = TMP_data_provider()
+        self.assertEqual(obj.o1, 1)
+        default = PluginGlobals._default_OptionData
+        data = OptionData()
+        default.deactivate()
+        try:
+            data.set("a.b", "o1", 2)
+            self.assertEqual(obj.o1, 2)
+            obj.o1 = 3
+            self.assertEqual(data.get("a.b", "o1"), 3)
+            self.assertEqual(default.get("a.b", "o1"), 1)
+        finally:
+            data.deactivate()
+            default.activate()
+        self.assertEqual(obj.o1, 1)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -105,6 +105,7 @@ class PluginEnvironment(object):
         #
         self.loaders = None
         self.loader_paths = None
+        self.plugin_manifest = None
         #
         self.name = name
         self.log = logger_factory(self.name)
@@ -123,20 +124,31 @@ class PluginEnvironment(object):
         self.nonsingleton_plugins = set()
 
     def cleanup(self, singleton=True):
-        # ZZZ
-        # return
+        """Remove the plugins in this environment from the plugin
+        registry.  The nonsingleton plugins (and the singleton plugins,
+        if singleton is True) are also removed from the interfaces in
+        one pass over the interfaces."""
         if PluginGlobals is None or PluginGlobals.plugin_instances is None:
             return
+        removed = set()
         if singleton:
             for id_ in itervalues(self.singleton_services):
                 if (id_ in PluginGlobals.plugin_instances and
                         PluginGlobals.plugin_instances[id_] is not None):
                     del PluginGlobals.plugin_instances[id_]
+                    removed.add(id_)
             self.singleton_services = {}
         #
         for id_ in self.nonsingleton_plugins:
             del PluginGlobals.plugin_instances[id_]
+        removed.update(self.nonsingleton_plugins)
         self.nonsingleton_plugins = set()
+        #
+        if removed and PluginGlobals.interface_services is not None:
+            for services in itervalues(PluginGlobals.interface_services):
+                # The intersection iterates over the smaller set
+                services.difference_update(services & removed)
+        PluginGlobals.generation += 1
 
     def plugins(self):
         for id_ in itervalues(self.singleton_services):
@@ -146,8 +158,16 @@ class PluginEnvironment(object):
         for id_ in sorted(self.nonsingleton_plugins):
             yield PluginGlobals.plugin_instances[id_]
 
-    def load_services(self, path=None, auto_disable=False, name_re=True):
-        """Load services from IPluginLoader extension points"""
+    def load_services(self, path=None, auto_disable=False, name_re=True,
+                      manifest=None):
+        """Load services from IPluginLoader extension points.
+
+        If manifest is the name of a file, then the loaders that support
+        it record the plugins that each module declares in this file.
+        The modules that are recorded in the manifest are only imported
+        when one of their interfaces, plugin classes or factory aliases
+        is first requested.
+        """
 
         if self.loaders is None:
             self.loaders = ExtensionPoint(IPluginLoader)
@@ -190,6 +210,7 @@ class PluginEnvironment(object):
         else:
             name_p = re.compile(name_re)
         #
+        self.plugin_manifest = manifest
         for loader in self.loaders:
             loader.load(self, search_path, disable_p, name_p)
         # self.clear_cache()
@@ -265,31 +286,90 @@ class ExtensionPoint(object):
         extension point.  This tacitly filters out disabled extension
         points.
 
-        TODO - Can this support caching?
-        How would that relate to the weakref test?
+        The services of each interface are cached in
+        PluginGlobals.extension_cache, sorted by id, until the
+        PluginGlobals.generation counter changes.  The cache holds
+        weak references to the services, and the services whose
+        enabled() method is not the default are checked in every call.
+        The cache is rebuilt if a service has been deleted.
         """
-        strkey = str(key)
-        ans = set()
+        services = PluginGlobals.interface_services.get(self.interface, None)
+        entry = PluginGlobals.extension_cache.get(self.interface, None)
+        if (entry is None or services is None or
+                entry[0] != PluginGlobals.generation or
+                entry[1] is not services or entry[2] != len(services)):
+            if PluginGlobals.lazy_modules and PluginGlobals.load_lazy_modules(
+                    ('interface', self.interface.__name__)):
+                services = PluginGlobals.interface_services.get(self.interface,
+                                                                None)
+            if not services:
+                return []
+            entry = self._cache_extensions(services)
+        if all:
+            ans = [ref() for ref in entry[3]]
+        elif entry[4] is None:
+            ans = [plugin for plugin in (ref() for ref in entry[3])
+                   if plugin is None or plugin.enabled()]
+        else:
+            ans = [ref() for ref in entry[4]]
+        if None in ans:
+            # A service was deleted without being deactivated
+            PluginGlobals.generation += 1
+            return self.extensions(all=all, key=key)
+        if key is not None:
+            strkey = str(key)
+            ans = [plugin for plugin in ans if strkey == plugin.name]
+        return ans
+
+    def _cache_extensions(self, services):
+        """Cache the services that implement the interface of this
+        extension point.
+
+        The cache entry is the tuple (generation, services, len(services),
+        refs, enabled_refs), where refs are weak references to the
+        services sorted by id, and enabled_refs are the references to
+        the enabled services (or None if a service can be enabled or
+        disabled without changing PluginGlobals.generation).
+        """
+        plugin_instances = PluginGlobals.plugin_instances
+        # plugin cls -> True if enabled() is not redefined
+        default_enabled = {}
+        ans = []
         remove = set()
-        if self.interface in PluginGlobals.interface_services:
-            for id_ in PluginGlobals.interface_services[self.interface]:
-                if id_ not in PluginGlobals.plugin_instances:
-                    remove.add(id_)
-                    continue
-                if id_ < 0:
-                    plugin = PluginGlobals.plugin_instances[id_]
-                else:
-                    plugin = PluginGlobals.plugin_instances[id_]()
-                if plugin is None:
-                    remove.add(id_)
-                elif ((all or plugin.enabled()) and
-                      (key is None or strkey == plugin.name)):
-                    ans.add(plugin)
-            # Remove weakrefs that were empty
-            # ZZ
-            for id_ in remove:
-                PluginGlobals.interface_services[self.interface].remove(id_)
-        return sorted(ans, key=lambda x: x._id)
+        static = True
+        for id_ in services:
+            if id_ not in plugin_instances:
+                remove.add(id_)
+                continue
+            if id_ < 0:
+                plugin = plugin_instances[id_]
+            else:
+                plugin = plugin_instances[id_]()
+            if plugin is None:
+                remove.add(id_)
+                continue
+            ref = plugin_instances[id_] if id_ > 0 else weakref.ref(plugin)
+            cls = plugin.__class__
+            if cls not in default_enabled:
+                enabled = getattr(cls.enabled, '__func__', cls.enabled)
+                default_enabled[cls] = enabled is _default_enabled
+            enable = plugin.__dict__.get('_enable_value', None)
+            if not default_enabled[cls] or type(enable) is not bool:
+                static = False
+            ans.append((id_, ref, enable))
+        # Remove weakrefs that were empty
+        for id_ in remove:
+            services.remove(id_)
+        ans.sort()
+        refs = [item[1] for item in ans]
+        if static:
+            enabled_refs = [item[1] for item in ans if item[2]]
+        else:
+            enabled_refs = None
+        entry = (PluginGlobals.generation, services, len(services), refs,
+                 enabled_refs)
+        PluginGlobals.extension_cache[self.interface] = entry
+        return entry
 
     def __repr__(self, simple=False):
         """Return a textual representation of the extension point.
@@ -325,6 +405,23 @@ class PluginGlobals(object):
     #   id -> weakref(instance)
     plugin_instances = {}
 
+    # A counter that is incremented when plugins are activated,
+    # deactivated, enabled, disabled or deleted.  This invalidates
+    # the extension_cache.
+    generation = 0
+
+    # A dictionary of the services that are cached by ExtensionPoint
+    #   interface cls -> (generation, ...)
+    extension_cache = {}
+
+    # A dictionary of the functions that import modules whose plugins
+    # have not been loaded yet, which are called when the plugins are
+    # first requested
+    #   ('interface', interface name) -> list of functions
+    #   ('class', plugin class name) -> list of functions
+    #   ('alias', interface name, alias) -> list of functions
+    lazy_modules = {}
+
     # Environments
     env = {'pca': PluginEnvironment('pca', bootstrap=True)}
     env_map = {1: 'pca'}
@@ -395,6 +492,7 @@ class PluginGlobals(object):
         del PluginGlobals.env[name]
         if cleanup:
             tmp.cleanup(singleton=singleton)
+        PluginGlobals.generation += 1
         PluginGlobals.env_stack = [name_ for name_ in PluginGlobals.env_stack
                                    if name_ in PluginGlobals.env]
         return tmp
@@ -407,6 +505,9 @@ class PluginGlobals(object):
             env_.cleanup()
         PluginGlobals.interface_services = {}
         PluginGlobals.plugin_instances = {}
+        PluginGlobals.generation += 1
+        PluginGlobals.extension_cache = {}
+        PluginGlobals.lazy_modules = {}
         PluginGlobals.env = {'pca': PluginEnvironment('pca', bootstrap=True)}
         PluginGlobals.env_map = {1: 'pca'}
         PluginGlobals.env_stack = ['pca']
@@ -446,6 +547,38 @@ class PluginGlobals(object):
         """Load services from IPluginLoader extension points"""
         PluginGlobals.get_env().load_services(**kwds)
 
+    @staticmethod
+    def add_lazy_module(load, keys):
+        """Register a function that imports a module when the plugins
+        for one of the keys in lazy_modules are first requested.  The
+        function may be called more than once."""
+        for key in keys:
+            PluginGlobals.lazy_modules.setdefault(key, []).append(load)
+        # Invalidate the cached services, so ExtensionPoint checks for
+        # lazy modules
+        PluginGlobals.generation += 1
+
+    @staticmethod
+    def load_lazy_modules(key):
+        """Import the modules that were registered for a key in
+        lazy_modules.  Returns True if modules were registered."""
+        loaders = PluginGlobals.lazy_modules.pop(key, None)
+        if not loaders:
+            return False
+        #
+        # Remove the other keys of these modules before loading them
+        #
+        for other in list(PluginGlobals.lazy_modules.keys()):
+            remaining = [load for load in PluginGlobals.lazy_modules[other]
+                         if load not in loaders]
+            if remaining:
+                PluginGlobals.lazy_modules[other] = remaining
+            else:
+                del PluginGlobals.lazy_modules[other]
+        for load in loaders:
+            load()
+        return True
+
     @staticmethod
     def pprint(**kwds):
         """A pretty-print function"""
@@ -886,19 +1019,20 @@ class Plugin(with_metaclass(PluginMeta, object)):
         for interface in self.__interfaces__:
             PluginGlobals.interface_services.setdefault(interface,
                                                         set()).add(self._id)
+        PluginGlobals.generation += 1
 
     def deactivate(self):
         """Unregister this plugin with all interfaces that it implements."""
-        # ZZ
-        # return
         if PluginGlobals is None or PluginGlobals.interface_services is None:
             # This could happen when python quits
             return
-        # for interface in self.__interfaces__:
-        # if interface in PluginGlobals.interface_services:
-        for interface in PluginGlobals.interface_services:
-            # Remove an element if it exists
-            PluginGlobals.interface_services[interface].discard(self._id)
+        interface_services = PluginGlobals.interface_services
+        for interface in self.__interfaces__:
+            services = interface_services.get(interface, None)
+            if services is not None:
+                # Remove an element if it exists
+                services.discard(self._id)
+        PluginGlobals.generation += 1
 
     #
     # Support "with" statements. Forgetting to call deactivate
@@ -947,6 +1081,16 @@ class Plugin(with_metaclass(PluginMeta, object)):
             locals_.setdefault('_inherited_interfaces', set()).add(interface)
         locals_['_service'] = service
 
+    def _get_enable(self):
+        return self.__dict__['_enable_value']
+
+    def _set_enable(self, value):
+        # The enabled services are cached by ExtensionPoint
+        self.__dict__['_enable_value'] = value
+        PluginGlobals.generation += 1
+
+    _enable = property(_get_enable, _set_enable)
+
     def disable(self):
         """Disable this plugin"""
         self._enable = False
@@ -977,6 +1121,11 @@ alias = Plugin.alias
 implements = Plugin.implements
 
 
+# The value of plugin.enabled() can only change when PluginGlobals.generation
+# is incremented if this method is not redefined and plugin._enable is a bool
+_default_enabled = getattr(Plugin.enabled, '__func__', Plugin.enabled)
+
+
 class SingletonPlugin(Plugin):
     """The base class for singleton plugins.  The PluginMeta class
     instantiates a SingletonPlugin class when it is declared.  Note that
@@ -995,21 +1144,33 @@ def CreatePluginFactory(_interface):
 
     class PluginFactoryFunctor(object):
 
+        def _load_alias(self, name):
+            if (name not in _interface._factory_active and
+                    PluginGlobals.lazy_modules):
+                PluginGlobals.load_lazy_modules(
+                    ('alias', _interface.__name__, name))
+
         def __call__(self, _name=None, args=[], **kwds):
             if _name is None:
                 return self
             _name = str(_name)
+            self._load_alias(_name)
             if _name not in _interface._factory_active:
                 return None
             return PluginFactory(_interface._factory_cls[_name], args, **kwds)
 
         def services(self):
+            if PluginGlobals.lazy_modules:
+                PluginGlobals.load_lazy_modules(
+                    ('interface', _interface.__name__))
             return list(_interface._factory_active.keys())
 
         def get_class(self, name):
+            self._load_alias(name)
             return _interface._factory_cls[name]
 
         def doc(self, name):
+            self._load_alias(name)
             tmp = _interface._factory_doc[name]
             if tmp is None:
                 return ""
@@ -1034,9 +1195,11 @@ def PluginFactory(classname, args=[], **kwds):
     """Construct a Plugin instance, and optionally assign it a name"""
 
     if isinstance(classname, str):
+        registry = PluginGlobals.get_env(kwds.get('env', None)).plugin_registry
+        if classname not in registry and PluginGlobals.lazy_modules:
+            PluginGlobals.load_lazy_modules(('class', classname))
         try:
-            cls = PluginGlobals.get_env(kwds.get('env', None)).plugin_registry[
-                classname]
+            cls = registry[classname]
         except KeyError:
             raise PluginError("Unknown class %r" % str(classname))
     else:
@@ -2,6 +2,7 @@
 # Unit Tests for component/core
 #
 
+import gc
 import re
 import sys
 import os
@@ -231,6 +232,52 @@ class TestExtensionPoint(unittest.TestCase):
         except PluginError:
             pass
 
+    def test_ep_cache(self):
+        """Test the invalidation of the ExtensionPoint cache"""
+        ep = ExtensionPoint(IDebug1)
+        s1 = Plugin1()
+        s2 = Plugin2()
+        self.assertEqual(ep(), [s1, s2])
+        ans = ep()
+        ans.pop()
+        self.assertEqual(ep(), [s1, s2])
+        s1.disable()
+        self.assertEqual(ep(), [s2])
+        self.assertEqual(ep(all=True), [s1, s2])
+        s1.enable()
+        self.assertEqual(ep(), [s1, s2])
+        s2._enable = False
+        self.assertEqual(ep(), [s1])
+        s2._enable = True
+        s1.deactivate()
+        self.assertEqual(ep(), [s2])
+        s1.activate()
+        self.assertEqual(ep(), [s1, s2])
+        s2.name = "p2"
+        self.assertEqual(ep("p2"), [s2])
+        del s1, ans
+        gc.collect()
+        self.assertEqual(ep(), [s2])
+
+    def test_ep_cache_enabled(self):
+        """Test services whose enabled() method is redefined"""
+
+        class Plugin12(Plugin):
+            implements(IDebug1, service=True)
+            flag = True
+
+            def enabled(self):
+                return self.flag
+
+        ep = ExtensionPoint(IDebug1)
+        s1 = Plugin1()
+        s2 = Plugin12()
+        self.assertEqual(ep(), [s1, s2])
+        s2.flag = False
+        self.assertEqual(ep(), [s1])
+        s2.flag = True
+        self.assertEqual(ep(), [s1, s2])
+
     def test_ep_namespace1(self):
         """Test the semantics of the use of namespaces in interface decl"""
         env = PluginEnvironment("tmpenv")
@@ -423,6 +470,33 @@ class TestManager(unittest.TestCase):
         #self.assertEqual(env.services, set([]))
         self.assertTrue(PluginGlobals.services("testing") >= set([s0, s1, s2]))
 
+    def test_cleanup(self):
+        """Test that cleanup() removes the plugins from the interfaces"""
+        env = PluginGlobals.add_env("dummy")
+        try:
+            plugins = [Plugin4() for i in range(10)]
+            ids = set(p._id for p in plugins)
+            self.assertEqual(len(ExtensionPoint(IDebug1)), 10)
+            env.cleanup()
+            self.assertEqual(len(ExtensionPoint(IDebug1)), 0)
+            self.assertFalse(
+                ids & PluginGlobals.interface_services[IDebug1])
+            self.assertFalse(
+                ids & PluginGlobals.interface_services[IDebug2])
+            self.assertFalse(ids & set(PluginGlobals.plugin_instances))
+        finally:
+            PluginGlobals.remove_env("dummy")
+
+    def test_deactivate(self):
+        """Test that deactivate() removes a plugin from its interfaces"""
+        s1 = Plugin4()
+        s2 = Plugin1()
+        s1.deactivate()
+        self.assertNotIn(s1._id, PluginGlobals.interface_services[IDebug1])
+        self.assertNotIn(s1._id, PluginGlobals.interface_services[IDebug2])
+        self.assertEqual(ExtensionPoint(IDebug1)(), [s2])
+        self.assertEqual(ExtensionPoint(IDebug2)(), [])
+
     def Xtest_get(self):
         env = PluginEnvironment("dummy")
         PluginGlobals.add_env(env)
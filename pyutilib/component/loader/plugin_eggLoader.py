@@ -12,11 +12,13 @@
 
 __all__ = ['EggLoader']
 
+import functools
 import os
 import sys
 import logging
 from pyutilib.component.config import ManagedPlugin
-from pyutilib.component.core import implements, ExtensionPoint, IPluginLoader
+from pyutilib.component.core import implements, ExtensionPoint, IPluginLoader, PluginGlobals
+from pyutilib.component.loader.plugin_manifest import PluginManifest, record_plugins, register_lazy_module
 
 logger = logging.getLogger('pyutilib.component.core.pca')
 pkg_resources_avail = None
@@ -113,7 +115,7 @@ class EggLoader(ManagedPlugin):
         for dist, e in errors.items():
             _log_error(dist, e)
 
-        for entry in working_set.iter_entry_points(self.entry_point_name):
+        def _load_entry(entry):
             if generate_debug_messages:
                 env.log.debug('Loading %r from %r', entry.name,
                               entry.dist.location)
@@ -125,11 +127,49 @@ class EggLoader(ManagedPlugin):
                     pkg_resources.UnknownExtra):
                 e = sys.exc_info()[1]
                 _log_error(entry, e)
+                return False
             else:
                 if not disable_re.match(os.path.dirname(
                         entry.module_name)) is None:
                     #_enable_plugin(env, entry.module_name)
                     pass
+            return True
+
+        #
+        # If a manifest is specified, then the entry points that it
+        # records are loaded when their plugins are first requested
+        #
+        manifest_file = getattr(env, 'plugin_manifest', None)
+        if manifest_file is None:
+            for entry in working_set.iter_entry_points(self.entry_point_name):
+                _load_entry(entry)
+        else:
+            manifest = PluginManifest(manifest_file)
+            current_env = PluginGlobals.get_env()
+            prefix = 'egg:%s:' % self.entry_point_name
+            entry_keys = set()
+            for entry in working_set.iter_entry_points(self.entry_point_name):
+                key = '%s%s:%s' % (prefix, entry.dist.location, entry)
+                entry_keys.add(key)
+                try:
+                    mtime = os.path.getmtime(entry.dist.location)
+                except (OSError, TypeError):
+                    mtime = None
+                stamp = [str(entry.dist.version), mtime]
+                declared = manifest.lookup(key, stamp)
+                if declared is not None:
+                    if register_lazy_module(
+                            declared, functools.partial(_load_entry, entry),
+                            current_env) and generate_debug_messages:
+                        env.log.debug('Deferring %r from %r', entry.name,
+                                      entry.dist.location)
+                    continue
+                loaded, declared = record_plugins(
+                    functools.partial(_load_entry, entry))
+                if loaded:
+                    manifest.update(key, stamp, declared)
+            manifest.prune(lambda key: key.startswith(prefix), entry_keys)
+            manifest.write()
 
         env.log.info('END -    Loading plugins with an EggLoader service')
 
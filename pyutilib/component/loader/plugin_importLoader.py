@@ -13,6 +13,7 @@
 __all__ = ['ImportLoader']
 
 from glob import glob
+import functools
 import imp
 import re
 import os
@@ -20,7 +21,8 @@ import sys
 import logging
 
 from pyutilib.component.config import ManagedSingletonPlugin
-from pyutilib.component.core import implements, ExtensionPoint, IIgnorePluginWhenLoading, IPluginLoader, Plugin
+from pyutilib.component.core import implements, ExtensionPoint, IIgnorePluginWhenLoading, IPluginLoader, Plugin, PluginGlobals
+from pyutilib.component.loader.plugin_manifest import PluginManifest, record_plugins, register_lazy_module
 
 
 class ImportLoader(ManagedSingletonPlugin):
@@ -37,79 +39,135 @@ class ImportLoader(ManagedSingletonPlugin):
         generate_debug_messages = __debug__ and env.log.isEnabledFor(
             logging.DEBUG)
         env.log.info('Loading plugins with ImportLoader')
+        #
+        # If a manifest is specified, then the modules that it
+        # records are imported when their plugins are first requested
+        #
+        manifest_file = getattr(env, 'plugin_manifest', None)
+        manifest = None
+        if manifest_file is not None:
+            manifest = PluginManifest(manifest_file)
+            current_env = PluginGlobals.get_env()
+            plugin_keys = set()
+            plugin_dirs = set()
         for path in search_path:
             plugin_files = glob(os.path.join(path, '*.py'))
+            if manifest is not None:
+                plugin_dirs.add(os.path.abspath(path))
             #
             # Note: for reproducibility, this fixes the order that
             # files are loaded
             #
             for plugin_file in sorted(plugin_files):
                 #print("ImportLoader:",plugin_file)
-                #
-                # Load the module
-                #
-                module = None
                 plugin_name = os.path.basename(plugin_file[:-3])
-                if plugin_name not in sys.modules and name_re.match(
+                if manifest is not None:
+                    key = os.path.abspath(plugin_file)
+                    plugin_keys.add(key)
+                if plugin_name in sys.modules or not name_re.match(
                         plugin_name):
-                    try:
-                        module = imp.load_source(plugin_name, plugin_file)
-                        if generate_debug_messages:
-                            env.log.debug('Loading file plugin %s from %s' % \
-                                  (plugin_name, plugin_file))
-                    except Exception:
-                        e = sys.exc_info()[1]
-                        env.log.error(
-                            'Failed to load plugin from %s',
-                            plugin_file,
-                            exc_info=True)
-                        env.log.error('Load error: %r' % str(e))
+                    continue
+                if manifest is None:
+                    self._load_module(env, plugin_name, plugin_file,
+                                      disable_re)
+                    continue
                 #
-                # Disable singleton plugins that match
+                # Defer the import of modules that have not changed
+                # since they were recorded in the manifest
                 #
-                if not module is None:
-                    if not disable_re.match(plugin_name) is None:
+                stat = os.stat(plugin_file)
+                stamp = [stat.st_mtime, stat.st_size]
+                declared = manifest.lookup(key, stamp)
+                if declared is not None:
+                    if register_lazy_module(
+                            declared,
+                            functools.partial(self._load_module, env,
+                                              plugin_name, plugin_file,
+                                              disable_re), current_env):
                         if generate_debug_messages:
-                            env.log.debug('Disabling services in module %s' %
-                                          plugin_name)
-                        for item in dir(module):
-                            #
-                            # This seems like a hack, but
-                            # without this we can disable pyutilib
-                            # functionality!
-                            #
-                            flag = False
-                            for service in ImportLoader.ep_services:
-                                if service.ignore(item):
-                                    flag = True
-                                    break
-                            if flag:
-                                continue
+                            env.log.debug('Deferring file plugin %s from %s' % \
+                                  (plugin_name, plugin_file))
+                    continue
+                module, declared = record_plugins(
+                    functools.partial(self._load_module, env, plugin_name,
+                                      plugin_file, disable_re))
+                if module is not None:
+                    manifest.update(key, stamp, declared)
+        if manifest is not None:
+            manifest.prune(lambda key: os.path.dirname(key) in plugin_dirs,
+                           plugin_keys)
+            manifest.write()
+
+    def _load_module(self, env, plugin_name, plugin_file, disable_re):
+        """Import a plugin file, and return the module (or None if the
+        import failed)"""
+        generate_debug_messages = __debug__ and env.log.isEnabledFor(
+            logging.DEBUG)
+        if plugin_name in sys.modules:
+            return None
+        #
+        # Load the module
+        #
+        module = None
+        try:
+            module = imp.load_source(plugin_name, plugin_file)
+            if generate_debug_messages:
+                env.log.debug('Loading file plugin %s from %s' % \
+                      (plugin_name, plugin_file))
+        except Exception:
+            e = sys.exc_info()[1]
+            env.log.error(
+                'Failed to load plugin from %s',
+                plugin_file,
+                exc_info=True)
+            env.log.error('Load error: %r' % str(e))
+        #
+        # Disable singleton plugins that match
+        #
+        if not module is None:
+            if not disable_re.match(plugin_name) is None:
+                if generate_debug_messages:
+                    env.log.debug('Disabling services in module %s' %
+                                  plugin_name)
+                for item in dir(module):
+                    #
+                    # This seems like a hack, but
+                    # without this we can disable pyutilib
+                    # functionality!
+                    #
+                    flag = False
+                    for service in ImportLoader.ep_services:
+                        if service.ignore(item):
+                            flag = True
+                            break
+                    if flag:
+                        continue
 
-                            cls = getattr(module, item)
-                            try:
-                                is_instance = isinstance(cls, Plugin)
-                            except TypeError:  #pragma:nocover
-                                is_instance = False
-                            try:
-                                is_plugin = issubclass(cls, Plugin)
-                            except TypeError:
-                                is_plugin = False
-                            try:
-                                is_singleton = not (cls.__instance__ is None)
-                            except AttributeError:  #pragma:nocover
-                                is_singleton = False
-                            if is_singleton and is_plugin:
-                                if generate_debug_messages:
-                                    env.log.debug('Disabling service %s' % item)
-                                cls.__instance__._enable = False
-                            if is_instance:
-                                if generate_debug_messages:
-                                    env.log.debug('Disabling service %s' % item)
-                                cls._enable = False
-                    elif generate_debug_messages:
-                        env.log.debug('All services in module %s are enabled' %
-                                      plugin_name)
+                    cls = getattr(module, item)
+                    try:
+                        is_instance = isinstance(cls, Plugin)
+                    except TypeError:  #pragma:nocover
+                        is_instance = False
+                    try:
+                        is_plugin = issubclass(cls, Plugin)
+                    except TypeError:
+                        is_plugin = False
+                    try:
+                        is_singleton = not (cls.__instance__ is None)
+                    except AttributeError:  #pragma:nocover
+                        is_singleton = False
+                    if is_singleton and is_plugin:
+                        if generate_debug_messages:
+                            env.log.debug('Disabling service %s' % item)
+                        cls.__instance__._enable = False
+                    if is_instance:
+                        if generate_debug_messages:
+                            env.log.debug('Disabling service %s' % item)
+                        cls._enable = False
+            elif generate_debug_messages:
+                env.log.debug('All services in module %s are enabled' %
+                              plugin_name)
+        return module
 
 # Copyright (C) 2005-2008 Edgewall Software
 # Copyright (C) 2005-2006 Christopher Lenz <cmlenz@gmx.de>
@@ -0,0 +1,194 @@
+#  _________________________________________________________________________
+#
+#  PyUtilib: A Python utility library.
+#  Copyright (c) 2008 Sandia Corporation.
+#  This software is distributed under the BSD License.
+#  Under the terms of Contract DE-AC04-94AL85000 with Sandia Corporation,
+#  the U.S. Government retains certain rights in this software.
+#  _________________________________________________________________________
+"""
+A manifest of the plugins that are declared by the modules that plugin
+loaders import.  The manifest records the interfaces, plugin classes and
+factory aliases that were registered when each module was imported, so
+later loads can defer the import until one of them is requested.
+"""
+
+__all__ = ['PluginManifest']
+
+import json
+import logging
+import os
+import sys
+import tempfile
+
+from pyutilib.component.core import PluginGlobals
+
+logger = logging.getLogger('pyutilib.component.core.pca')
+
+# os.rename() replaces an existing file on POSIX systems
+_replace = getattr(os, 'replace', os.rename)
+
+
+class PluginManifest(object):
+    """
+    A JSON file that maps a key for each module (e.g. its path) to the
+    plugins that the module declares.  Each entry has a stamp (e.g. the
+    modification time and size of the file), and an entry is stale if
+    the stamp of the module changes.
+    """
+
+    version = 1
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.modules = {}
+        self.modified = False
+        self.read()
+
+    def read(self):
+        """Read the manifest file.  A missing or invalid file is ignored."""
+        try:
+            with open(self.filename, 'r') as INPUT:
+                data = json.load(INPUT)
+        except (IOError, OSError, ValueError):
+            data = None
+        if not isinstance(data, dict) or data.get('version') != self.version:
+            self.modules = {}
+        else:
+            self.modules = data.get('modules', {})
+        self.modified = False
+
+    def write(self):
+        """Write the manifest file, if it was modified.  The manifest is
+        only a cache, so a failure to write it is logged as a warning.
+
+        The manifest is written to a temporary file that replaces the
+        manifest file, so concurrent processes that load plugins never
+        see a partial manifest.
+        """
+        if not self.modified:
+            return
+        tmpname = None
+        try:
+            fd, tmpname = tempfile.mkstemp(
+                dir=os.path.dirname(os.path.abspath(self.filename)),
+                prefix=os.path.basename(self.filename) + '.',
+                suffix='.tmp')
+            with os.fdopen(fd, 'w') as OUTPUT:
+                json.dump({'version': self.version,
+                           'modules': self.modules},
+                          OUTPUT,
+                          indent=2,
+                          sort_keys=True)
+            _replace(tmpname, self.filename)
+            tmpname = None
+        except (IOError, OSError):
+            logger.warning("Failed to write the plugin manifest %s: %s",
+                           self.filename, sys.exc_info()[1])
+        finally:
+            if tmpname is not None:
+                try:
+                    os.remove(tmpname)
+                except OSError:
+                    pass
+        self.modified = False
+
+    def lookup(self, key, stamp):
+        """Return the entry for a module, or None if it is missing or
+        stale."""
+        entry = self.modules.get(key, None)
+        if entry is None or entry.get('stamp') != stamp:
+            return None
+        return entry
+
+    def update(self, key, stamp, declared):
+        """Record the plugins that a module declares."""
+        entry = dict(declared)
+        entry['stamp'] = stamp
+        self.modules[key] = entry
+        self.modified = True
+
+    def prune(self, owned, keys):
+        """Remove the entries for which owned(key) is true, except the
+        entries in keys."""
+        for key in list(self.modules.keys()):
+            if key not in keys and owned(key):
+                del self.modules[key]
+                self.modified = True
+
+
+def record_plugins(load):
+    """
+    Call load(), and return a tuple with its value and a dictionary of
+    the interfaces, plugin classes and factory aliases that were
+    registered in the current environment while it was called.
+    """
+    env = PluginGlobals.get_env()
+    counter = PluginGlobals.plugin_counter
+    registry = dict(env.plugin_registry)
+    ans = load()
+    classes = [cls for name, cls in env.plugin_registry.items()
+               if registry.get(name, None) is not cls]
+    #
+    # Plugins get the next id from plugin_counter (singletons get a
+    # negative id), so new services have ids larger than counter.
+    #
+    interfaces = set()
+    for interface, services in PluginGlobals.interface_services.items():
+        for id_ in services:
+            if abs(id_) > counter:
+                interfaces.add(interface.__name__)
+                break
+    aliases = {}
+    for cls in classes:
+        for interface in cls.__interfaces__:
+            interfaces.add(interface.__name__)
+            for name, doc, subclass in getattr(cls, '_factory_aliases', ()):
+                if getattr(interface, '_factory_cls', {}).get(name) is cls:
+                    aliases.setdefault(interface.__name__, []).append(name)
+    declared = {'interfaces': sorted(interfaces),
+                'classes': sorted(cls.__name__ for cls in classes),
+                'aliases': dict((name, sorted(set(names)))
+                                for name, names in aliases.items())}
+    return ans, declared
+
+
+class LazyModule(object):
+    """
+    A function that calls load() in a plugin environment the first time
+    that it is called.
+    """
+
+    def __init__(self, load, env):
+        self.load = load
+        self.env = env
+        self.loaded = False
+
+    def __call__(self):
+        if self.loaded:
+            return
+        self.loaded = True
+        if PluginGlobals.env.get(self.env.name, None) is not self.env:
+            # The environment was removed
+            return
+        PluginGlobals.add_env(self.env)
+        try:
+            self.load()
+        finally:
+            PluginGlobals.pop_env()
+
+
+def register_lazy_module(declared, load, env):
+    """
+    Register a function that loads a module in env when one of the
+    declared interfaces, plugin classes or aliases is first requested.
+    Returns False if the module does not declare any plugins.
+    """
+    keys = [('interface', name) for name in declared.get('interfaces', ())]
+    keys.extend(('class', name) for name in declared.get('classes', ()))
+    for interface, names in declared.get('aliases', {}).items():
+        keys.extend(('alias', interface, name) for name in names)
+    if not keys:
+        return False
+    PluginGlobals.add_lazy_module(LazyModule(load, env), keys)
+    return True
@@ -3,11 +3,19 @@
 #
 
 import os
+import re
+import sys
+import json
+import shutil
+import tempfile
+import threading
 from os.path import abspath, dirname
 currdir = dirname(abspath(__file__)) + os.sep
 
 import pyutilib.th as unittest
 import pyutilib.component.core
+from pyutilib.component.loader import ImportLoader
+from pyutilib.component.loader.plugin_manifest import PluginManifest
 
 
 #
@@ -69,5 +77,127 @@ class TestLoader(unittest.TestCase):
             name_re=True)
 
 
+lazy_plugin_source = """
+from pyutilib.component.core import Plugin, SingletonPlugin, implements, IPluginLoadPath
+
+class LazyLoadPath(SingletonPlugin):
+    implements(IPluginLoadPath, service=True)
+
+    def get_load_path(self):
+        return []
+
+class LazyPlugin(Plugin):
+    pass
+"""
+
+
+class TestLazyLoader(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.manifest = os.path.join(self.tmpdir, 'manifest.json')
+        self.plugins = os.path.join(self.tmpdir, 'plugins')
+        os.mkdir(self.plugins)
+        with open(os.path.join(self.plugins, 'lazy_plugins.py'), 'w') as OUTPUT:
+            OUTPUT.write(lazy_plugin_source)
+        sys.modules.pop('lazy_plugins', None)
+        pyutilib.component.core.PluginGlobals.add_env("testing.lazy")
+
+    def tearDown(self):
+        pyutilib.component.core.PluginGlobals.remove_env(
+            "testing.lazy", cleanup=True)
+        pyutilib.component.core.PluginGlobals.lazy_modules = {}
+        sys.modules.pop('lazy_plugins', None)
+        shutil.rmtree(self.tmpdir)
+
+    def load(self):
+        # Call the ImportLoader directly, since other tests can disable it
+        env = pyutilib.component.core.PluginGlobals.get_env()
+        env.plugin_manifest = self.manifest
+        ImportLoader().load(env, [self.plugins], re.compile('^$'),
+                            re.compile('.*'))
+
+    def reset(self):
+        # Forget the module, as if the plugins were loaded by a new process
+        pyutilib.component.core.PluginGlobals.remove_env(
+            "testing.lazy", cleanup=True)
+        sys.modules.pop('lazy_plugins', None)
+        pyutilib.component.core.PluginGlobals.add_env("testing.lazy")
+
+    def test_manifest(self):
+        # The manifest is created when the plugins are first loaded
+        self.load()
+        self.assertTrue('lazy_plugins' in sys.modules)
+        with open(self.manifest) as INPUT:
+            modules = json.load(INPUT)['modules']
+        entry = modules[os.path.join(abspath(self.plugins), 'lazy_plugins.py')]
+        self.assertEqual(entry['interfaces'], ['IPluginLoadPath'])
+        self.assertEqual(entry['classes'], ['LazyLoadPath', 'LazyPlugin'])
+        # An unchanged module is imported when its interface is requested
+        self.reset()
+        self.load()
+        self.assertFalse('lazy_plugins' in sys.modules)
+        ep = pyutilib.component.core.ExtensionPoint(
+            pyutilib.component.core.IPluginLoadPath)
+        self.assertTrue('LazyLoadPath' in
+                        [type(service).__name__ for service in ep])
+        self.assertTrue('lazy_plugins' in sys.modules)
+        self.assertEqual(pyutilib.component.core.PluginGlobals.lazy_modules,
+                         {})
+
+    def test_class(self):
+        # An unchanged module is imported when a class is requested
+        self.load()
+        self.reset()
+        self.load()
+        self.assertFalse('lazy_plugins' in sys.modules)
+        plugin = pyutilib.component.core.PluginFactory('LazyPlugin')
+        self.assertEqual(type(plugin).__name__, 'LazyPlugin')
+        self.assertTrue('lazy_plugins' in sys.modules)
+
+    def test_changed(self):
+        # A module is imported and recorded again if it is changed
+        self.load()
+        self.reset()
+        with open(os.path.join(self.plugins, 'lazy_plugins.py'), 'a') as OUTPUT:
+            OUTPUT.write("\nclass LazyPlugin2(Plugin):\n    pass\n")
+        self.load()
+        self.assertTrue('lazy_plugins' in sys.modules)
+        with open(self.manifest) as INPUT:
+            modules = json.load(INPUT)['modules']
+        entry = modules[os.path.join(abspath(self.plugins), 'lazy_plugins.py')]
+        self.assertEqual(entry['classes'],
+                         ['LazyLoadPath', 'LazyPlugin', 'LazyPlugin2'])
+        # A module is removed from the manifest if it is deleted
+        self.reset()
+        os.remove(os.path.join(self.plugins, 'lazy_plugins.py'))
+        self.load()
+        with open(self.manifest) as INPUT:
+            self.assertEqual(json.load(INPUT)['modules'], {})
+
+    def test_write(self):
+        # Concurrent writers replace the manifest without errors
+        def write(i):
+            for j in range(20):
+                manifest = PluginManifest(self.manifest)
+                manifest.update('module%d' % i, [j], {'classes': []})
+                manifest.write()
+        threads = [threading.Thread(target=write, args=(i,))
+                   for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertTrue(len(PluginManifest(self.manifest).modules) >= 1)
+        self.assertEqual(sorted(os.listdir(self.tmpdir)),
+                         ['manifest.json', 'plugins'])
+        # A manifest that cannot be written is ignored
+        manifest = PluginManifest(
+            os.path.join(self.tmpdir, 'missing', 'manifest.json'))
+        manifest.update('module', [0], {'classes': []})
+        manifest.write()
+        self.assertFalse(os.path.exists(os.path.join(self.tmpdir, 'missing')))
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -11,7 +11,7 @@ import pyutilib.misc.GlobalData
 from pyutilib.misc.archivereader import ArchiveReaderFactory, ArchiveReader,\
            ZipArchiveReader, TarArchiveReader, DirArchiveReader, FileArchiveReader,\
            GzipFileArchiveReader, BZ2FileArchiveReader
-from pyutilib.misc.comparison import compare_file_with_numeric_values, compare_file, compare_large_file
+from pyutilib.misc.comparison import compare_file_with_numeric_values, compare_file, compare_large_file, find_large_file_difference
 from pyutilib.misc.cross import cross, cross_iter, flattened_cross_iter
 from pyutilib.misc.dict_with_default import SparseMapping
 from pyutilib.misc.factory import Factory
@@ -28,4 +28,4 @@ from pyutilib.misc.redirect_io import capture_output, setup_redirect, reset_redi
 from pyutilib.misc.singleton import Singleton, MonoState
 from pyutilib.misc.tee_io import TeeStream, ConsoleBuffer
 from pyutilib.misc.xml_utils import get_xml_text, escape, compare_xml_files
-from pyutilib.misc.visitor import SimpleVisitor, ValueVisitor
+from pyutilib.misc.visitor import SimpleVisitor, ValueVisitor, DispatchValueVisitor, NodeValueCache
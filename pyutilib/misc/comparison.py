@@ -17,15 +17,43 @@ import zipfile
 import gzip
 import filecmp
 import math
+import codecs
+import hashlib
+import locale
+import mmap
+from multiprocessing.pool import ThreadPool
 if sys.version_info >= (3, 0):
     xrange = range
     import io
+try:
+    import numpy
+    numpy_available = True
+except ImportError:
+    numpy_available = False
 
 strict_float_p = re.compile(
     r"(?<![\w+-\.])(?:[+-])?(?:\d+(?:\.\d*)?|\.\d+)(?:[eE][+-]?\d+)?\b")
 relaxed_float_p = re.compile(
     r"(?:[+-])?(?:\d+(?:\.\d*)?|\.\d+)(?:[eE][+-]?\d+)?")
 whitespace_p = re.compile(r" +")
+#
+# Patterns that split a block of lines into text and numbers.  When
+# _extract_floats() replaces a number with " # ", a number that
+# immediately follows it (e.g., the "-2" in "1-2") is no longer preceded
+# by a digit, so it matches strict_float_p.  Such a run of adjacent
+# numbers is matched as a single token.
+#
+_split_float_p = {
+    strict_float_p: re.compile(r"(" + strict_float_p.pattern + r"(?:" +
+                               relaxed_float_p.pattern + r"\b)*)"),
+    relaxed_float_p: re.compile(r"(" + relaxed_float_p.pattern + r")")
+}
+# Whitespace around the line separator of a block of lines
+line_separator_p = re.compile(r"\s*\x00\s*")
+
+# The approximate number of characters that are read from each file in
+# a block by compare_file_with_numeric_values()
+_block_size = 1024 * 1024
 
 
 def remove_chars_in_list(s, l):
@@ -152,46 +180,42 @@ def _extract_floats(line, regex):
         line = regex.sub(" # ", line, count=1)
 
 
-def compare_file_with_numeric_values(filename1,
-                                     filename2,
-                                     ignore=["\n", "\r"],
-                                     filter=None,
-                                     tolerance=0.0,
-                                     strict_numbers=True):
-    """
-    Do a simple comparison of two files that ignores differences
-    in newline types and whitespace.  Numeric values are compared within a specified tolerance.
+def _numeric_lines_differ(line1, line2, float_p, absolute_tolerance,
+                          relative_tolerance):
+    try:
+        floats1, line1 = _extract_floats(line1, float_p)
+        floats2, line2 = _extract_floats(line2, float_p)
+    except:
+        return True
 
-    The return value is the tuple: (status,lineno).  If status is True,
-    then a difference has occured on the specified line number.  If
-    the status is False, then lineno is None.
+    #print "floats1 '%s'" % floats1
+    #print "floats2 '%s'" % floats2
 
-    The goal of this utility is to simply indicate whether there are
-    differences in files.  The Python 'difflib' is much more comprehensive
-    and consequently more costly to apply.  The shutil.filecmp utility is
-    similar, but it does not ignore differences in file newlines.  Also,
-    this utility can ignore an arbitrary set of characters.
-    """
-    if not os.path.exists(filename1):
-        raise IOError("compare_file: cannot find file `" + filename1 + "' (in "
-                      + os.getcwd() + ")")
-    if not os.path.exists(filename2):
-        raise IOError("compare_file: cannot find file `" + filename2 + "' (in "
-                      + os.getcwd() + ")")
+    if len(floats1) != len(floats2):
+        return True
 
-    #if filecmp.cmp(filename1, filename2):
-    #    return [False, None, ""]
+    for v1, v2 in zip(floats1, floats2):
+        vDiff = math.fabs(v1 - v2)
+        vMax = max(math.fabs(v1), math.fabs(v2))
+        if vDiff > absolute_tolerance and \
+           vDiff / vMax > relative_tolerance:
+            return True
 
-    if strict_numbers:
-        float_p = strict_float_p
-    else:
-        float_p = relaxed_float_p
+    line1 = whitespace_p.sub(' ', line1.strip())
+    line2 = whitespace_p.sub(' ', line2.strip())
 
-    try:
-        absolute_tolerance, relative_tolerance = tolerance
-    except:
-        absolute_tolerance = relative_tolerance = tolerance
+    #print "Line1 '%s'" % line1
+    #print "Line2 '%s'" % line2
 
+    return line1 != line2
+
+
+def _compare_numeric_lines(filename1, filename2, ignore, filter, float_p,
+                           absolute_tolerance, relative_tolerance):
+    """
+    Compare two files one line at a time.  Returns the line number of
+    the first difference, or None.
+    """
     INPUT1 = INPUT2 = None
     try:
         INPUT1 = open_possibly_compressed_file(filename1)
@@ -226,50 +250,277 @@ def compare_file_with_numeric_values(filename1,
             #print "line2 '%s'" % line2
 
             if line1 is None and line2 is None:
-                return [False, None, ""]
+                return None
 
             if line1 is None or line2 is None:
-                return [True, lineno, file_diff(
-                    filename1, filename2, lineno=lineno)]
-
-            try:
-                floats1, line1 = _extract_floats(line1, float_p)
-                floats2, line2 = _extract_floats(line2, float_p)
-            except:
-                return [True, lineno, file_diff(
-                    filename1, filename2, lineno=lineno)]
+                return lineno
 
-            #print "floats1 '%s'" % floats1
-            #print "floats2 '%s'" % floats2
+            if _numeric_lines_differ(line1, line2, float_p,
+                                     absolute_tolerance, relative_tolerance):
+                return lineno
+    finally:
+        if INPUT1 is not None:
+            INPUT1.close()
+        if INPUT2 is not None:
+            INPUT2.close()
 
-            if len(floats1) != len(floats2):
-                return [True, lineno, file_diff(
-                    filename1, filename2, lineno=lineno)]
 
-            for v1, v2 in zip(floats1, floats2):
-                vDiff = math.fabs(v1 - v2)
-                vMax = max(math.fabs(v1), math.fabs(v2))
-                if vDiff > absolute_tolerance and \
-                   vDiff / vMax > relative_tolerance:
-                    return [True, lineno, file_diff(
-                        filename1, filename2, lineno=lineno)]
+class _LineBlockReader(object):
+    """
+    Reads the lines of a file in blocks, and skips the lines that
+    read_and_filter_line() skips.
+    """
 
-            line1 = whitespace_p.sub(' ', line1.strip())
-            line2 = whitespace_p.sub(' ', line2.strip())
+    def __init__(self, stream, ignore, filter):
+        self.stream = stream
+        self.filter = filter
+        chars = [c for c in ignore if len(c) == 1]
+        self.table = dict((ord(c), None) for c in chars)
+        self.deletechars = "".join(c for c in chars if isinstance(c, str))
+        if "\n" in chars:
+            # Remove the ignored characters from a block of lines at
+            # once, and replace the newlines with a line separator
+            self.block_table = dict(self.table)
+            self.block_table[ord("\n")] = u"\x00"
+        else:
+            self.block_table = None
+        self.lines = []
+        # The line numbers of self.lines
+        self.linenos = []
+        # The number of lines that have been read
+        self.lineno = 0
+        self.eof = False
+
+    def remove(self, line):
+        # remove_chars_in_list(line, ignore)
+        if sys.version_info < (3, 0) and isinstance(line, str):
+            return line.translate(None, self.deletechars)
+        return line.translate(self.table)
+
+    def remove_block(self, chunk):
+        if self.block_table is not None and \
+           not (sys.version_info < (3, 0) and isinstance(chunk[0], str)):
+            text = "".join(chunk)
+            if "\x00" not in text:
+                lines = text.translate(self.block_table).split("\x00")
+                if chunk[-1].endswith("\n"):
+                    lines.pop()
+                # Lines can also end with a carriage return, which is
+                # not translated by streams with newline=''
+                if len(lines) == len(chunk):
+                    return lines
+        return [self.remove(line) for line in chunk]
+
+    def fill(self):
+        while not self.lines and not self.eof:
+            chunk = self.stream.readlines(_block_size)
+            if not chunk:
+                self.eof = True
+                break
+            start = self.lineno
+            self.lineno += len(chunk)
+            if self.filter is None:
+                lines = self.remove_block(chunk)
+                if all(lines):
+                    self.lines = lines
+                    self.linenos = list(xrange(start + 1, self.lineno + 1))
+                    continue
+                for i, line in enumerate(lines):
+                    if line:
+                        self.lines.append(line)
+                        self.linenos.append(start + i + 1)
+                continue
+            for i, line in enumerate(chunk):
+                line_ = self.remove(line)
+                if not line_:
+                    continue
+                filtered = self.filter(line)
+                if filtered is True:
+                    continue
+                elif filtered is False:
+                    line = line_
+                else:
+                    line = filtered
+                if line:
+                    self.lines.append(line)
+                    self.linenos.append(start + i + 1)
+
+    def consume(self, n):
+        del self.lines[:n]
+        del self.linenos[:n]
+
+
+def _numeric_values_differ(tokens1, tokens2, absolute_tolerance,
+                           relative_tolerance):
+    if numpy_available:
+        v1 = numpy.array([float(x) for x in tokens1])
+        v2 = numpy.array([float(x) for x in tokens2])
+        with numpy.errstate(all='ignore'):
+            vDiff = numpy.fabs(v1 - v2)
+            vMax = numpy.maximum(numpy.fabs(v1), numpy.fabs(v2))
+            return bool(
+                numpy.any((vDiff > absolute_tolerance) &
+                          (vDiff / vMax > relative_tolerance)))
+    for x1, x2 in zip(tokens1, tokens2):
+        if x1 == x2:
+            continue
+        v1 = float(x1)
+        v2 = float(x2)
+        vDiff = math.fabs(v1 - v2)
+        vMax = max(math.fabs(v1), math.fabs(v2))
+        if vDiff > absolute_tolerance and \
+           vDiff / vMax > relative_tolerance:
+            return True
+    return False
+
+
+def _numeric_blocks_differ(lines1, lines2, float_p, absolute_tolerance,
+                           relative_tolerance):
+    """
+    Compare two blocks of lines with the same number of lines.  Returns
+    True or False, or None if the lines of the blocks must be compared
+    one at a time.
+    """
+    if lines1 == lines2:
+        return False
+    text1 = '\x00'.join(lines1)
+    text2 = '\x00'.join(lines2)
+    if text1.count('\x00') >= len(lines1) or \
+       text2.count('\x00') >= len(lines2):
+        # The separator occurs in a line
+        return None
+    # [text, number, text, number, ..., text]
+    parts1 = _split_float_p[float_p].split(text1)
+    parts2 = _split_float_p[float_p].split(text2)
+    if len(parts1) != len(parts2):
+        return True
+    tokens1 = parts1[1::2]
+    tokens2 = parts2[1::2]
+    try:
+        # A run of adjacent numbers is not a valid float
+        for x in tokens1:
+            float(x)
+        if tokens1 != tokens2:
+            for x in tokens2:
+                float(x)
+    except ValueError:
+        return None
+    if tokens1 != tokens2 and _numeric_values_differ(
+            tokens1, tokens2, absolute_tolerance, relative_tolerance):
+        return True
+    parts1 = parts1[0::2]
+    parts2 = parts2[0::2]
+    if parts1 == parts2:
+        return False
+    text1 = line_separator_p.sub('\x00', ' # '.join(parts1).strip())
+    text2 = line_separator_p.sub('\x00', ' # '.join(parts2).strip())
+    return whitespace_p.sub(' ', text1) != whitespace_p.sub(' ', text2)
 
-            #print "Line1 '%s'" % line1
-            #print "Line2 '%s'" % line2
 
-            if line1 != line2:
-                return [True, lineno, file_diff(
-                    filename1, filename2, lineno=lineno)]
+def _compare_numeric_blocks(filename1, filename2, ignore, filter, float_p,
+                            absolute_tolerance, relative_tolerance):
+    """
+    Compare two files in blocks of lines.  Returns the line number of
+    the first difference, or None.
+    """
+    INPUT1 = INPUT2 = None
+    try:
+        INPUT1 = open_possibly_compressed_file(filename1)
+        INPUT2 = open_possibly_compressed_file(filename2)
+        reader1 = _LineBlockReader(INPUT1, ignore, filter)
+        reader2 = _LineBlockReader(INPUT2, ignore, filter)
+        while True:
+            reader1.fill()
+            reader2.fill()
+            n = min(len(reader1.lines), len(reader2.lines))
+            if n == 0:
+                if reader1.lines:
+                    return reader1.linenos[0]
+                if reader2.lines:
+                    return reader1.lineno + 1
+                return None
+            lines1 = reader1.lines[:n]
+            lines2 = reader2.lines[:n]
+            if _numeric_blocks_differ(lines1, lines2, float_p,
+                                      absolute_tolerance,
+                                      relative_tolerance) is not False:
+                # Find the line that differs
+                for i in xrange(n):
+                    if _numeric_lines_differ(lines1[i], lines2[i], float_p,
+                                             absolute_tolerance,
+                                             relative_tolerance):
+                        return reader1.linenos[i]
+            reader1.consume(n)
+            reader2.consume(n)
     finally:
         if INPUT1 is not None:
             INPUT1.close()
         if INPUT2 is not None:
             INPUT2.close()
 
-    return [False, None, ""]
+
+def compare_file_with_numeric_values(filename1,
+                                     filename2,
+                                     ignore=["\n", "\r"],
+                                     filter=None,
+                                     tolerance=0.0,
+                                     strict_numbers=True):
+    """
+    Do a simple comparison of two files that ignores differences
+    in newline types and whitespace.  Numeric values are compared within a specified tolerance.
+
+    The return value is the tuple: (status,lineno).  If status is True,
+    then a difference has occured on the specified line number.  If
+    the status is False, then lineno is None.
+
+    The goal of this utility is to simply indicate whether there are
+    differences in files.  The Python 'difflib' is much more comprehensive
+    and consequently more costly to apply.  The shutil.filecmp utility is
+    similar, but it does not ignore differences in file newlines.  Also,
+    this utility can ignore an arbitrary set of characters.
+
+    The files are compared in large blocks of lines.  The numbers in a
+    block are extracted with a single regular expression search, and
+    they are compared with numpy if it is available.  The lines of a
+    block are only compared one at a time to find the line number of a
+    difference.
+    """
+    if not os.path.exists(filename1):
+        raise IOError("compare_file: cannot find file `" + filename1 + "' (in "
+                      + os.getcwd() + ")")
+    if not os.path.exists(filename2):
+        raise IOError("compare_file: cannot find file `" + filename2 + "' (in "
+                      + os.getcwd() + ")")
+
+    #if filecmp.cmp(filename1, filename2):
+    #    return [False, None, ""]
+
+    if strict_numbers:
+        float_p = strict_float_p
+    else:
+        float_p = relaxed_float_p
+
+    try:
+        absolute_tolerance, relative_tolerance = tolerance
+    except:
+        absolute_tolerance = relative_tolerance = tolerance
+
+    args = (filename1, filename2, ignore, filter, float_p,
+            absolute_tolerance, relative_tolerance)
+    if absolute_tolerance < 0:
+        # Equal numbers are different, so the blocks cannot be compared
+        lineno = _compare_numeric_lines(*args)
+    else:
+        try:
+            lineno = _compare_numeric_blocks(*args)
+        except UnicodeDecodeError:
+            # A block contains a decoding error.  Compare the lines one
+            # at a time to find it, or a difference that precedes it.
+            lineno = _compare_numeric_lines(*args)
+
+    if lineno is None:
+        return [False, None, ""]
+    return [True, lineno, file_diff(filename1, filename2, lineno=lineno)]
 
 
 def compare_file(filename1,
@@ -356,58 +607,310 @@ def compare_file(filename1,
             INPUT2.close()
 
 
-def compare_large_file(filename1,
-                       filename2,
-                       ignore=["\t", " ", "\n", "\r"],
-                       bufSize=1 * 1024 * 1024):
+def _large_file_mode(ignore):
     """
-    Do a simple comparison of two files that ignores white space, or
-    characters specified in "ignore" list.
+    Return True if files can be compared as bytes (instead of decoded
+    text) with the given list of ignored characters.
+    """
+    chars = [c for c in ignore if len(c) == 1]
+    if any(ord(c) > 127 for c in chars):
+        return False
+    # Plain files are read as text with universal newlines, which are
+    # not translated in bytes
+    if "\r" not in chars or "\n" not in chars:
+        return False
+    if sys.version_info >= (3, 0):
+        # ASCII bytes only occur as ASCII characters in UTF-8 text
+        try:
+            encoding = locale.getpreferredencoding(False)
+            return codecs.lookup(encoding).name == 'utf-8'
+        except (LookupError, ValueError):
+            return False
+    return True
 
-    The return value is True if a difference is found, False otherwise.
 
-    For very long text files, this function will be faster than
-    compare_file() because it reads the files in by large chunks
-    instead of by line.  The cost is that you don't get the lineno
-    at which the difference occurs.
+def _open_large_file(filename, binary):
     """
+    Open a file for compare_large_file().  A plain file is memory mapped
+    if it is compared as bytes.
+    """
+    if not binary:
+        return open_possibly_compressed_file(filename)
+    if not os.path.exists(filename):
+        raise IOError("cannot find file `" + filename + "'")
+    try:
+        is_zipfile = zipfile.is_zipfile(filename)
+    except:
+        is_zipfile = False
+    if is_zipfile:
+        zf1 = zipfile.ZipFile(filename, "r")
+        if len(zf1.namelist()) != 1:
+            zf1.close()
+            raise IOError("cannot compare with a zip file that contains "
+                          "multiple files: `" + filename + "'")
+        return zf1.open(zf1.namelist()[0], 'r')
+    elif filename.endswith('.gz'):
+        return gzip.open(filename, 'rb')
+    INPUT = open(filename, 'rb')
+    try:
+        mm = mmap.mmap(INPUT.fileno(), 0, access=mmap.ACCESS_READ)
+    except (ValueError, EnvironmentError):
+        # Empty files cannot be mapped
+        return INPUT
+    INPUT.close()
+    return mm
+
+
+def _char_remover(ignore, binary):
+    # Return a function that does remove_chars_in_list(s, ignore)
+    chars = [c for c in ignore if len(c) == 1]
+    if binary:
+        deletechars = b"".join(c.encode('ascii') for c in chars)
+        return lambda s: s.translate(None, deletechars)
+    if sys.version_info < (3, 0):
+        return lambda s: remove_chars_in_list(s, chars)
+    table = dict((ord(c), None) for c in chars)
+    return lambda s: s.translate(table)
+
+
+def _mismatch(buf1, buf2, n):
+    # The index of the first difference in buf1[:n] and buf2[:n]
+    lo = 0
+    while n - lo > 64:
+        mid = (lo + n) // 2
+        if buf1[lo:mid] == buf2[lo:mid]:
+            lo = mid
+        else:
+            n = mid
+    while buf1[lo] == buf2[lo]:
+        lo += 1
+    return lo
 
-    INPUT1 = open_possibly_compressed_file(filename1)
+
+class _FilteredReader(object):
+    """
+    Reads a file in chunks and removes the ignored characters.  The
+    offsets of the chunks are kept, so that the position of a character
+    in the file can be found.
+    """
+
+    def __init__(self, stream, remove, bufSize, offset, data):
+        self.stream = stream
+        self.remove = remove
+        self.bufSize = bufSize
+        self.buf = data[:0]
+        # (offset, data, number of characters kept) for the chunks
+        # whose characters are in self.buf
+        self.chunks = []
+        # The number of characters of chunks[0] that have been consumed
+        self.pos = 0
+        # The offset of the next chunk
+        self.offset = offset
+        self.eof = False
+        if data:
+            self.add(data)
+
+    def add(self, data):
+        filtered = self.remove(data)
+        self.chunks.append((self.offset, data, len(filtered)))
+        self.offset += len(data)
+        self.buf += filtered
+
+    def fill(self):
+        while not self.buf and not self.eof:
+            data = self.stream.read(self.bufSize)
+            if not data:
+                self.eof = True
+            else:
+                self.add(data)
+
+    def consume(self, n):
+        self.buf = self.buf[n:]
+        self.pos += n
+        while self.chunks and self.pos >= self.chunks[0][2]:
+            self.pos -= self.chunks.pop(0)[2]
+
+    def file_offset(self, i):
+        # The offset in the file of the character self.buf[i]
+        i += self.pos
+        for offset, data, n in self.chunks:
+            if i < n:
+                # The shortest prefix of the chunk that contains i+1
+                # characters that are kept
+                lo, hi = 0, len(data)
+                while lo < hi:
+                    mid = (lo + hi) // 2
+                    if len(self.remove(data[:mid])) > i:
+                        hi = mid
+                    else:
+                        lo = mid + 1
+                return offset + lo - 1
+            i -= n
+
+
+def _identical_prefix(INPUT1, INPUT2, bufSize, max_workers):
+    """
+    Skip the blocks at the beginning of two files that are identical.
+    Returns (offset, data1, data2), where data1 and data2 are the first
+    blocks that differ, or None if the files are identical.
+    """
+    if max_workers > 1 and isinstance(INPUT1, mmap.mmap) and \
+       isinstance(INPUT2, mmap.mmap):
+        #
+        # Compare the hashes of the blocks in a thread pool.  The hash
+        # functions release the GIL.
+        #
+        size = min(len(INPUT1), len(INPUT2))
+        if len(INPUT1) == len(INPUT2) and size < 2 * bufSize:
+            max_workers = 1
+        else:
+            if sys.version_info < (3, 0):
+                # Python 2 cannot create a memoryview of an mmap, so
+                # the blocks are copied
+                view1 = INPUT1
+                view2 = INPUT2
+            else:
+                view1 = memoryview(INPUT1)
+                view2 = memoryview(INPUT2)
+
+            def same(i):
+                return hashlib.sha1(view1[i:i + bufSize]).digest() == \
+                    hashlib.sha1(view2[i:i + bufSize]).digest()
+
+            pool = ThreadPool(max_workers)
+            try:
+                offset = size
+                blocks = range(0, size, bufSize)
+                for i, flag in zip(blocks, pool.imap(same, blocks)):
+                    if not flag:
+                        offset = i
+                        break
+            finally:
+                pool.terminate()
+                if view1 is not INPUT1:
+                    view1.release()
+                    view2.release()
+            if offset == size and len(INPUT1) == len(INPUT2):
+                return None
+            INPUT1.seek(offset)
+            INPUT2.seek(offset)
+            return offset, INPUT1.read(bufSize), INPUT2.read(bufSize)
+    offset = 0
+    while True:
+        data1 = INPUT1.read(bufSize)
+        data2 = INPUT2.read(bufSize)
+        if data1 != data2:
+            return offset, data1, data2
+        if not data1:
+            return None
+        offset += len(data1)
+
+
+def _count_newlines(filename, binary, offset, bufSize):
+    INPUT = _open_large_file(filename, binary)
     try:
-        INPUT2 = open_possibly_compressed_file(filename2)
+        newline = b"\n" if binary else "\n"
+        count = 0
+        while offset > 0:
+            data = INPUT.read(min(offset, bufSize))
+            if not data:
+                break
+            count += data.count(newline)
+            offset -= len(data)
+        return count
+    finally:
+        INPUT.close()
+
+
+def find_large_file_difference(filename1,
+                               filename2,
+                               ignore=["\t", " ", "\n", "\r"],
+                               bufSize=1 * 1024 * 1024,
+                               max_workers=1):
+    """
+    Find the first difference in two files, ignoring white space or the
+    characters specified in the "ignore" list.
+
+    The return value is None if the files are equal.  Otherwise, it is
+    the tuple (offset, lineno) of the location of the first difference
+    in filename1.  If filename1 is a prefix of filename2, then this is
+    the end of filename1.
+
+    If the carriage return and newline characters are ignored, then the
+    files are compared as bytes, and the offset is a byte offset in the
+    (uncompressed) file.  Plain files are memory mapped, and the blocks
+    at the beginning of the files that are identical are skipped without
+    removing the ignored characters.  If max_workers is greater than
+    one, then these blocks are compared by hashing them in a pool of
+    max_workers threads.  Otherwise, the files are read as text and the
+    offset is the number of characters that precede the difference.
+    """
+    binary = _large_file_mode(ignore)
+    INPUT1 = _open_large_file(filename1, binary)
+    try:
+        INPUT2 = _open_large_file(filename2, binary)
     except IOError:
         INPUT1.close()
         raise
-    #
-    # This is check is deferred until the zipfiles are setup to ensure a consistent logic for
-    # zipfile analysis.  If the files are the same, but they are zipfiles with > 1 files, then we
-    # raise an exception.
-    #
-    if not sys.platform.startswith('win') and os.stat(filename1) == os.stat(
-            filename2):
-        INPUT1.close()
-        INPUT2.close()
-        return False
+    try:
+        #
+        # This is check is deferred until the zipfiles are setup to ensure a consistent logic for
+        # zipfile analysis.  If the files are the same, but they are zipfiles with > 1 files, then we
+        # raise an exception.
+        #
+        if not sys.platform.startswith('win') and os.stat(filename1) == os.stat(
+                filename2):
+            return None
 
-    f1Size = os.stat(filename1).st_size
-    f2Size = os.stat(filename2).st_size
+        prefix = _identical_prefix(INPUT1, INPUT2, bufSize, max_workers)
+        if prefix is None:
+            return None
+        offset, data1, data2 = prefix
 
-    result = False
+        remove = _char_remover(ignore, binary)
+        reader1 = _FilteredReader(INPUT1, remove, bufSize, offset, data1)
+        reader2 = _FilteredReader(INPUT2, remove, bufSize, offset, data2)
+        while True:
+            reader1.fill()
+            reader2.fill()
+            n = min(len(reader1.buf), len(reader2.buf))
+            if n == 0:
+                if reader1.buf:
+                    offset = reader1.file_offset(0)
+                elif reader2.buf:
+                    offset = reader1.offset
+                else:
+                    return None
+                break
+            if reader1.buf[:n] != reader2.buf[:n]:
+                offset = reader1.file_offset(
+                    _mismatch(reader1.buf, reader2.buf, n))
+                break
+            reader1.consume(n)
+            reader2.consume(n)
+    finally:
+        INPUT1.close()
+        INPUT2.close()
+    return offset, _count_newlines(filename1, binary, offset, bufSize) + 1
 
-    while True:
-        buf1 = get_desired_chars_from_file(INPUT1, bufSize, ignore)
-        buf2 = get_desired_chars_from_file(INPUT2, bufSize, ignore)
 
-        if len(buf1) == 0 and len(buf2) == 0:
-            break
-        elif len(buf1) == 0 or len(buf2) == 0:
-            result = True
-            break
+def compare_large_file(filename1,
+                       filename2,
+                       ignore=["\t", " ", "\n", "\r"],
+                       bufSize=1 * 1024 * 1024,
+                       max_workers=1):
+    """
+    Do a simple comparison of two files that ignores white space, or
+    characters specified in "ignore" list.
 
-        if len(buf1) != len(buf2) or buf1 != buf2:
-            result = True
-            break
+    The return value is True if a difference is found, False otherwise.
 
-    INPUT1.close()
-    INPUT2.close()
-    return result
+    For very long text files, this function will be faster than
+    compare_file() because it reads the files in by large chunks
+    instead of by line.  The cost is that you don't get the lineno
+    at which the difference occurs; use find_large_file_difference()
+    to get the location of the difference.
+    """
+    return find_large_file_difference(
+        filename1, filename2, ignore=ignore, bufSize=bufSize,
+        max_workers=max_workers) is not None
@@ -210,87 +210,237 @@ def load_json(str):
     return json.loads(str, object_hook=_to_dict)
 
 
-def compare_repn(baseline,
-                 output,
-                 tolerance=0.0,
-                 prefix="<root>",
-                 exact=True,
-                 using_yaml=True):
-    if type(baseline) != type(output) and not (
-            type(baseline) in [int, float] and type(output) in [int, float]):
-        raise IOError(
-            "(%s) Structural difference:\nbaseline:\n%s\noutput:\n%s" %
-            (prefix, pprint.pformat(baseline), pprint.pformat(output)))
+class _RepnDifference(object):
+    """
+    A difference found by compare_repn().  The message is only formatted
+    when it is reported, because formatting the baseline and output
+    values can be expensive.
+    """
+
+    __slots__ = ('error', 'kind', 'prefix', 'baseline', 'output', 'detail')
+
+    def __init__(self, error, kind, prefix, baseline, output, detail=None):
+        self.error = error
+        self.kind = kind
+        self.prefix = prefix
+        self.baseline = baseline
+        self.output = output
+        self.detail = detail
+
+    def message(self):
+        prefix = self.prefix
+        baseline = self.baseline
+        output = self.output
+        if self.kind == 'structure':
+            return "(%s) Structural difference:\nbaseline:\n%s\noutput:\n%s" % (
+                prefix, pprint.pformat(baseline), pprint.pformat(output))
+        elif self.kind == 'longer':
+            return "(%s) Baseline has longer list than output:\nbaseline:\n%s\noutput:\n%s" % (
+                prefix, pprint.pformat(baseline), pprint.pformat(output))
+        elif self.kind == 'length':
+            return "(%s) Baseline list length does not equal output list:\nbaseline:\n%s\noutput:\n%s" % (
+                prefix, pprint.pformat(baseline), pprint.pformat(output))
+        elif self.kind == 'item':
+            j, last = self.detail
+            return "(%s) Could not find item %d in output list:\nbaseline:\n%s\noutput:\n%s\nERROR: %s" % (
+                prefix, j, pprint.pformat(baseline), pprint.pformat(output),
+                '' if last is None else last.message())
+        elif self.kind == 'keys':
+            return "(%s) Baseline and output have different keys:\nbaseline:\n%s\noutput:\n%s" % (
+                prefix, pprint.pformat(baseline.keys()),
+                pprint.pformat(output.keys()))
+        elif self.kind == 'key':
+            return "(%s) Baseline key %s that does not exist in output:baseline:\n%s\noutput:\n%s" % (
+                prefix, self.detail, pprint.pformat(baseline.keys()),
+                pprint.pformat(output.keys()))
+        elif self.kind == 'float':
+            return "(%s) Floating point values differ: baseline=%.17g and output=%.17g (tolerance=%.17g)" % (
+                prefix, baseline, output, self.detail)
+        return "(%s) Values differ:\nbaseline:\n%s\noutput:\n%s" % (
+            prefix, pprint.pformat(baseline), pprint.pformat(output))
+
+
+# The result of _compare_values() for lists and dicts
+_CONTAINER = object()
+_containers = (list, dict, OrderedDict)
+_numbers = (int, float)
+
+
+def _compare_values(baseline, output, tolerance, prefix):
+    # Returns a _RepnDifference, None if the values are equal, or
+    # _CONTAINER if the values are lists or dicts that must be compared
+    # item by item
+    baseline_type = type(baseline)
+    output_type = type(output)
+    if baseline_type is output_type:
+        if baseline_type in _containers:
+            return _CONTAINER
+        if baseline_type is not float:
+            if baseline != output:
+                return _RepnDifference(ValueError, 'value', prefix, baseline,
+                                       output)
+            return None
+    elif baseline_type not in _numbers or output_type not in _numbers:
+        return _RepnDifference(IOError, 'structure', prefix, baseline, output)
+    # At least one of the values is a float
+    if not tolerance is None and math.fabs(baseline - output) > tolerance:
+        return _RepnDifference(ValueError, 'float', prefix, baseline, output,
+                               tolerance)
+    return None
+
+
+def _compare_containers(baseline, output, tolerance, prefix, exact, limit):
+    #
+    # A generator that compares two lists or dicts.  It yields a tuple
+    # (baseline, output, prefix, limit) to request the comparison of
+    # two items that are lists or dicts, and it receives the list of
+    # their differences.  The last value that it yields is the list of
+    # differences (at most limit, if limit is not None), after which it
+    # is not resumed.
     #
     if type(baseline) is list:
         if not exact and len(baseline) > len(output):
-            raise IOError(
-                "(%s) Baseline has longer list than output:\nbaseline:\n%s\noutput:\n%s"
-                % (prefix, pprint.pformat(baseline), pprint.pformat(output)))
-        if exact and len(baseline) != len(output):
-            raise IOError(
-                "(%s) Baseline list length does not equal output list:\nbaseline:\n%s\noutput:\n%s"
-                % (prefix, pprint.pformat(baseline), pprint.pformat(output)))
+            yield [_RepnDifference(IOError, 'longer', prefix, baseline,
+                                   output)]
+            return
+        elif exact and len(baseline) != len(output):
+            yield [_RepnDifference(IOError, 'length', prefix, baseline,
+                                   output)]
+            return
+        #
+        # Match the baseline items with a subsequence of the output
+        # items
+        #
         j = 0
         i = 0
-        msg = ''
-        while j < len(baseline) and i < len(output):
-            try:
-                compare_repn(
-                    baseline[j],
-                    output[i],
-                    tolerance=tolerance,
-                    prefix=prefix + "[" + str(i) + "]",
-                    exact=exact,
-                    using_yaml=using_yaml)
+        last = None
+        nbaseline = len(baseline)
+        noutput = len(output)
+        while j < nbaseline and i < noutput:
+            item_prefix = prefix + "[" + str(i) + "]"
+            diff = _compare_values(baseline[j], output[i], tolerance,
+                                   item_prefix)
+            if diff is _CONTAINER:
+                diffs = yield (baseline[j], output[i], item_prefix, 1)
+                diff = diffs[0] if diffs else None
+            if diff is None:
                 j += 1
-            except Exception:
-                msg = sys.exc_info()[1]
-                print(msg)
-                pass
+            else:
+                last = diff
             i += 1
-        if j < len(baseline):
-            raise IOError(
-                "(%s) Could not find item %d in output list:\nbaseline:\n%s\noutput:\n%s\nERROR: %s"
-                % (prefix, j, pprint.pformat(baseline), pprint.pformat(output),
-                   msg))
+        if j < nbaseline:
+            yield [_RepnDifference(IOError, 'item', prefix, baseline, output,
+                                   (j, last))]
+        else:
+            yield []
+        return
     #
-    elif type(baseline) is dict or type(baseline) is OrderedDict:
-        if exact and len(baseline.keys()) != len(output.keys()):
-            raise IOError(
-                "(%s) Baseline and output have different keys:\nbaseline:\n%s\noutput:\n%s"
-                % (prefix, pprint.pformat(baseline.keys()),
-                   pprint.pformat(output.keys())))
-        for key in baseline:
-            if not key in output:
-                raise IOError(
-                    "(%s) Baseline key %s that does not exist in output:baseline:\n%s\noutput:\n%s"
-                    % (prefix, key, pprint.pformat(baseline.keys()),
-                       pprint.pformat(output.keys())))
-            compare_repn(
-                baseline[key],
-                output[key],
-                tolerance=tolerance,
-                prefix=prefix + "." + str(key),
-                exact=exact,
-                using_yaml=using_yaml)
+    if exact and len(baseline.keys()) != len(output.keys()):
+        yield [_RepnDifference(IOError, 'keys', prefix, baseline, output)]
+        return
+    diffs = []
+    for key in baseline:
+        if limit is not None and len(diffs) >= limit:
+            break
+        if not key in output:
+            diffs.append(
+                _RepnDifference(IOError, 'key', prefix, baseline, output, key))
+            continue
+        item_prefix = prefix + "." + str(key)
+        diff = _compare_values(baseline[key], output[key], tolerance,
+                               item_prefix)
+        if diff is _CONTAINER:
+            diffs.extend((yield (baseline[key], output[key], item_prefix,
+                                 None if limit is None else
+                                 limit - len(diffs))))
+        elif diff is not None:
+            diffs.append(diff)
+    yield diffs
+
+
+def _repn_differences(baseline, output, tolerance, prefix, exact, limit):
+    """
+    Return a list of the differences between two values (at most limit,
+    if limit is not None).
+    """
+    diff = _compare_values(baseline, output, tolerance, prefix)
+    if diff is not _CONTAINER:
+        return [] if diff is None else [diff]
+    #
+    # The nested lists and dicts are compared with a stack of
+    # generators, rather than recursively.
+    #
+    stack = [_compare_containers(baseline, output, tolerance, prefix, exact,
+                                 limit)]
+    value = None
+    while True:
+        item = stack[-1].send(value)
+        if type(item) is list:
+            stack.pop()
+            if not stack:
+                return item
+            value = item
+        else:
+            stack.append(
+                _compare_containers(item[0], item[1], tolerance, item[2],
+                                    exact, item[3]))
+            value = None
+
+
+def compare_repn(baseline,
+                 output,
+                 tolerance=0.0,
+                 prefix="<root>",
+                 exact=True,
+                 using_yaml=True,
+                 max_differences=1):
+    """
+    Compare two values that are composed of lists, dicts and scalars.
+    An IOError (for a structural difference) or a ValueError (for
+    different values) is raised if the values differ.
+
+    If exact is False, then the baseline lists are compared with a
+    subsequence of the output lists, and the output dicts can have
+    keys that are not in the baseline.  Floating point values are
+    compared with the specified absolute tolerance.
+
+    The exception describes at most max_differences differences (all
+    differences if max_differences is None), which must be at least 1.
+    After a difference is found in an item of a dict, the other items
+    of the dict are still compared; the other differences in a list
+    are not reported.
+    """
+    if max_differences is not None and max_differences < 1:
+        raise ValueError("max_differences must be at least 1 (or None): %r"
+                         % (max_differences,))
+    #
+    # When several differences are reported, one more difference is
+    # collected to tell if any differences were omitted
     #
-    elif (type(baseline) is float or type(output) is float
-         ) and type(baseline) in [int, float] and type(output) in [int, float]:
-        if not tolerance is None and math.fabs(baseline - output) > tolerance:
-            raise ValueError(
-                "(%s) Floating point values differ: baseline=%.17g and output=%.17g (tolerance=%.17g)"
-                % (prefix, baseline, output, tolerance))
-    elif baseline != output:  #pragma:nocover
-        raise ValueError("(%s) Values differ:\nbaseline:\n%s\noutput:\n%s" % (
-            prefix, pprint.pformat(baseline), pprint.pformat(output)))
+    limit = max_differences
+    if limit is not None and limit > 1:
+        limit += 1
+    diffs = _repn_differences(baseline, output, tolerance, prefix, exact,
+                              limit)
+    if not diffs:
+        return
+    if len(diffs) == 1:
+        raise diffs[0].error(diffs[0].message())
+    omitted = limit is not None and len(diffs) > max_differences
+    if omitted:
+        diffs = diffs[:max_differences]
+    msg = "\n".join(diff.message() for diff in diffs)
+    if omitted:
+        msg += "\n(Only the first %d differences are reported)" % len(diffs)
+    raise diffs[0].error(msg)
 
 
 def compare_strings(baseline,
                     output,
                     tolerance=0.0,
                     exact=True,
-                    using_yaml=True):
+                    using_yaml=True,
+                    max_differences=1):
     if using_yaml:
         try:
             baseline_repn = load_yaml(baseline)
@@ -319,7 +469,8 @@ def compare_strings(baseline,
         output_repn,
         tolerance=tolerance,
         exact=exact,
-        using_yaml=using_yaml)
+        using_yaml=using_yaml,
+        max_differences=max_differences)
 
 
 def compare_files(baseline_fname,
@@ -330,7 +481,8 @@ def compare_files(baseline_fname,
                   output_begin='',
                   output_end=None,
                   exact=True,
-                  using_yaml=True):
+                  using_yaml=True,
+                  max_differences=1):
     INPUT = open_possibly_compressed_file(baseline_fname)
     baseline = extract_subtext(
         INPUT, begin_str=baseline_begin, end_str=baseline_end)
@@ -343,7 +495,8 @@ def compare_files(baseline_fname,
         output,
         tolerance=tolerance,
         exact=exact,
-        using_yaml=using_yaml)
+        using_yaml=using_yaml,
+        max_differences=max_differences)
 
 
 def compare_json_files(baseline_fname,
@@ -353,7 +506,8 @@ def compare_json_files(baseline_fname,
                        baseline_end='',
                        output_begin='',
                        output_end=None,
-                       exact=True):
+                       exact=True,
+                       max_differences=1):
     return compare_files(
         baseline_fname,
         output_fname,
@@ -363,7 +517,8 @@ def compare_json_files(baseline_fname,
         output_begin=output_begin,
         output_end=output_end,
         exact=exact,
-        using_yaml=False)
+        using_yaml=False,
+        max_differences=max_differences)
 
 
 def compare_yaml_files(baseline_fname,
@@ -373,7 +528,8 @@ def compare_yaml_files(baseline_fname,
                        baseline_end='',
                        output_begin='',
                        output_end=None,
-                       exact=True):
+                       exact=True,
+                       max_differences=1):
     return compare_files(
         baseline_fname,
         output_fname,
@@ -383,4 +539,5 @@ def compare_yaml_files(baseline_fname,
         output_begin=output_begin,
         output_end=output_end,
         exact=exact,
-        using_yaml=True)
+        using_yaml=True,
+        max_differences=max_differences)
@@ -31,3 +31,15 @@ class TestHierarchicalTimer(unittest.TestCase):
         self.assertAlmostEqual(timer.get_num_calls('all.a.aa'), 50)
         timer.get_total_time('all.b')
         print(timer)
+
+    def test_add_time(self):
+        timer = HierarchicalTimer()
+        timer.add_time('all.a', 2.0)
+        timer.add_time(('all', 'a'), 1.0, n_calls=2)
+        timer.add_time('all', 4.0)
+        timer.add_time('other.b', 1.0)
+        self.assertEqual(timer.get_num_calls('all.a'), 3)
+        self.assertAlmostEqual(timer.get_relative_percent_time('all.a'), 75)
+        # A parent timer that is created has no calls
+        self.assertEqual(timer.get_num_calls('other'), 0)
+        self.assertIn('nan', str(timer))
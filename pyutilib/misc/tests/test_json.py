@@ -4,6 +4,7 @@
 #
 
 import os
+import sys
 from os.path import abspath, dirname
 currdir = dirname(abspath(__file__)) + os.sep
 import pyutilib.th as unittest
@@ -145,6 +146,90 @@ class Test(unittest.TestCase):
         pyutilib.misc.compare_json_files(
             currdir + 'jsondata2.jsn.gz', currdir + 'jsondata2.jsn', exact=True)
 
+    def test16(self):
+        # Verify that several differences in a dict can be reported
+        baseline = dict(('x%d' % i, i) for i in range(10))
+        output = dict(('x%d' % i, -i) for i in range(10))
+        try:
+            pyutilib.misc.compare_repn(baseline, output, max_differences=3)
+            self.fail("Expected ValueError")
+        except ValueError:
+            msg = str(sys.exc_info()[1])
+        self.assertEqual(msg.count("Values differ"), 3)
+        self.assertIn("(Only the first 3 differences are reported)", msg)
+        try:
+            pyutilib.misc.compare_repn(baseline, output, max_differences=None)
+            self.fail("Expected ValueError")
+        except ValueError:
+            msg = str(sys.exc_info()[1])
+        # x0 is equal to -x0
+        self.assertEqual(msg.count("Values differ"), 9)
+        self.assertNotIn("Only the first", msg)
+        # The note is only added if differences are omitted
+        try:
+            pyutilib.misc.compare_repn(baseline, output, max_differences=9)
+            self.fail("Expected ValueError")
+        except ValueError:
+            msg = str(sys.exc_info()[1])
+        self.assertEqual(msg.count("Values differ"), 9)
+        self.assertNotIn("Only the first", msg)
+        try:
+            pyutilib.misc.compare_repn(baseline, output, max_differences=8)
+            self.fail("Expected ValueError")
+        except ValueError:
+            msg = str(sys.exc_info()[1])
+        self.assertEqual(msg.count("Values differ"), 8)
+        self.assertIn("(Only the first 8 differences are reported)", msg)
+
+    def test16a(self):
+        # Verify that max_differences must be at least 1
+        for max_differences in (0, -1):
+            try:
+                pyutilib.misc.compare_repn({'a': 1}, {'a': 3},
+                                           max_differences=max_differences)
+                self.fail("Expected ValueError")
+            except ValueError:
+                msg = str(sys.exc_info()[1])
+            self.assertIn("max_differences must be at least 1", msg)
+
+    def test17(self):
+        # Verify that the values are not formatted unless a difference
+        # is reported
+        class Value(object):
+            calls = 0
+
+            def __eq__(self, other):
+                return True
+
+            def __ne__(self, other):
+                return False
+
+            def __repr__(self):
+                Value.calls += 1
+                return 'Value'
+
+        value = Value()
+        baseline = [value, [value, value]]
+        output = [[value, value], value, value, [value, value]]
+        pyutilib.misc.compare_repn(baseline, output, exact=False)
+        self.assertEqual(Value.calls, 0)
+
+    def test18(self):
+        # Verify that deeply nested values can be compared
+        baseline = []
+        output = []
+        for i in range(5000):
+            baseline = [baseline]
+            output = [output]
+        pyutilib.misc.compare_repn(baseline, output)
+        baseline = 1
+        output = 2
+        for i in range(5000):
+            baseline = {'x': baseline}
+            output = {'x': output}
+        self.assertRaises(ValueError, pyutilib.misc.compare_repn, baseline,
+                          output)
+
 
 if __name__ == "__main__":
     unittest.main()
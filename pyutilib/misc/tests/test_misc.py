@@ -405,6 +405,54 @@ yy: 2""")
                 "test_file_compare1b - unexpected differences in filecmp6.txt and filecmp8.txt at line %d"
                 % lineno)
 
+    def test_file_compare1c(self):
+        # Test that the comparison of blocks of lines finds the same
+        # differences as the comparison of individual lines
+        comparison = pyutilib.misc.comparison
+        baseline = ["x[1,2] = 1.5  dual= 2e-3", "", "status: 1-2 3.5.6",
+                    "  value\t-1e5 + .5", "#", "date 2019-01-01", "end 7"]
+        cases = [
+            (baseline, None),
+            (["x[1,2] = 1.5000001  dual= 2.0000001e-3", "status: 1-2 3.5.6",
+              "", "value\t-1e5  + 0.5", "#", "date 2019-01-01", "end 7.0"],
+             None),
+            (baseline[:3] + ["  value\t-1e5 + .6"] + baseline[4:], 4),
+            (baseline[:2] + ["status: 1 -2 3.5.6"] + baseline[3:], None),
+            (baseline[:2] + ["status: 1 -2 3.5 .6"] + baseline[3:], None),
+            (baseline[:2] + ["status: 1-2 3.5.7"] + baseline[3:], 3),
+            (baseline[:2] + ["status: 1-2 3.56"] + baseline[3:], 3),
+            (baseline[:5] + ["date 2019 -01-01", "end 7"], None),
+            (baseline[:5] + ["date 2019-01-02", "end 7"], 6),
+            (baseline[:-1], 7),
+            (baseline + ["more"], 8),
+        ]
+        block_size = comparison._block_size
+        numpy_available = comparison.numpy_available
+        try:
+            for comparison._block_size, comparison.numpy_available in [
+                    (block_size, numpy_available), (16, numpy_available),
+                    (16, False)]:
+                for lines, lineno in cases:
+                    with open(currdir + "filecmp1.out", "w") as OUTPUT:
+                        OUTPUT.write("\n".join(baseline) + "\n")
+                    with open(currdir + "filecmp2.out", "w") as OUTPUT:
+                        OUTPUT.write("\r\n".join(lines))
+                    [flag, lineno_, diffstr
+                    ] = pyutilib.misc.compare_file_with_numeric_values(
+                        currdir + "filecmp1.out", currdir + "filecmp2.out",
+                        tolerance=1e-6)
+                    self.assertEqual(flag, lineno is not None)
+                    self.assertEqual(lineno_, lineno)
+                    self.assertEqual(lineno_, comparison._compare_numeric_lines(
+                        currdir + "filecmp1.out", currdir + "filecmp2.out",
+                        ["\n", "\r"], None, comparison.strict_float_p,
+                        1e-6, 1e-6))
+        finally:
+            comparison._block_size = block_size
+            comparison.numpy_available = numpy_available
+            os.remove(currdir + "filecmp1.out")
+            os.remove(currdir + "filecmp2.out")
+
     def test_file_compare2(self):
         # Test that large file comparison works
         flag = pyutilib.misc.compare_large_file(currdir + "filecmp1.txt",
@@ -442,6 +490,53 @@ yy: 2""")
         except IOError:
             pass
 
+    def test_file_compare2a(self):
+        # Test that the location of a difference in large files is found
+        import gzip
+        baseline = "line 1\nline 2\n" + "x y z\n" * 1000 + "end\n"
+        with open(currdir + "filecmp1.out", "w") as OUTPUT:
+            OUTPUT.write(baseline)
+        with gzip.open(currdir + "filecmp1.out.gz", "wb") as OUTPUT:
+            OUTPUT.write(baseline.encode('utf-8'))
+        try:
+            offset = baseline.index("end")
+            for text, diff in [
+                (baseline, None),
+                (baseline.replace("x y z", "xyz\t"), None),
+                (baseline.replace("x y z\nend", "x y q\nend"),
+                 (offset - 2, 1002)),
+                (baseline.replace("end", "and"), (offset, 1003)),
+                (baseline[:-2], (offset + 2, 1003)),
+                (baseline + "more", (len(baseline), 1004)),
+            ]:
+                with open(currdir + "filecmp2.out", "w") as OUTPUT:
+                    OUTPUT.write(text)
+                for filename in ("filecmp1.out", "filecmp1.out.gz"):
+                    for bufSize, max_workers in [(1024 * 1024, 1), (7, 1),
+                                                 (64, 3)]:
+                        self.assertEqual(
+                            pyutilib.misc.find_large_file_difference(
+                                currdir + filename,
+                                currdir + "filecmp2.out",
+                                bufSize=bufSize,
+                                max_workers=max_workers), diff)
+                        self.assertEqual(
+                            pyutilib.misc.compare_large_file(
+                                currdir + filename,
+                                currdir + "filecmp2.out",
+                                bufSize=bufSize,
+                                max_workers=max_workers), diff is not None)
+            # Files that are compared as text
+            self.assertEqual(
+                pyutilib.misc.find_large_file_difference(
+                    currdir + "filecmp1.out",
+                    currdir + "filecmp2.out",
+                    ignore=["\n"]), (len(baseline), 1004))
+        finally:
+            os.remove(currdir + "filecmp1.out")
+            os.remove(currdir + "filecmp1.out.gz")
+            os.remove(currdir + "filecmp2.out")
+
     def test_remove_chars(self):
         # Test the remove_chars_in_list works
         a = pyutilib.misc.comparison.remove_chars_in_list("", "")
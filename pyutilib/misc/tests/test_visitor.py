@@ -1,6 +1,6 @@
 import pyutilib.misc
 import pyutilib.th as unittest
-from pyutilib.misc.visitor import SimpleVisitor, ValueVisitor
+from pyutilib.misc.visitor import SimpleVisitor, ValueVisitor, DispatchValueVisitor, NodeValueCache
 
 
 class Node(object):
@@ -50,6 +50,33 @@ class SumVisitor(ValueVisitor):
     def finalize(self, ans):
         return self.count
 
+class CountingSumVisitor(SumVisitor):
+
+    def __init__(self):
+        SumVisitor.__init__(self)
+        self.visits = 0
+
+    def visit(self, node, values):
+        if values:
+            self.visits += 1
+        return SumVisitor.visit(self, node, values)
+
+    def finalize(self, ans):
+        return ans
+
+class LeafNode(Node):
+    pass
+
+class DispatchSumVisitor(DispatchValueVisitor):
+
+    def visit(self, node, values):
+        return node.num + sum(values)
+
+    def visiting_potential_leaf(self, node):
+        if len(node.children) == 0:
+            return True, node.num
+        return False, None
+
 
 class Test(unittest.TestCase):
 
@@ -93,6 +120,26 @@ class Test(unittest.TestCase):
         ans = visitor.dfs_postorder(self.root)
         self.assertEqual(ans, [14,15,16,5,17,18,19,6,20,21,22,7,2,23,24,25,8,26,27,28,9,29,30,31,10,3,32,33,34,11,35,36,37,12,38,39,40,13,4,1])
 
+    def test_dfs_postorder_dag(self):
+        # The children of a shared node are only searched once
+        x = Node()
+        x.num = 3
+        x.children = [Node(), Node()]
+        x.children[0].num = 1
+        x.children[1].num = 2
+        a = Node()
+        a.num = 4
+        a.children = [x]
+        b = Node()
+        b.num = 5
+        b.children = [x]
+        r = Node()
+        r.num = 6
+        r.children = [a, b]
+        visitor = CollectVisitor()
+        ans = visitor.dfs_postorder(r)
+        self.assertEqual(ans, [1,2,3,4,3,5,6])
+
     def test_retval_dfs_postorder_tree(self):
         visitor = SumVisitor()
         ans = visitor.dfs_postorder_deque(self.root)
@@ -111,6 +158,90 @@ class Test(unittest.TestCase):
         ans = visitor.dfs_postorder_stack(root)
         self.assertEqual(ans, 1)
 
+    def test_retval_dfs_postorder_dispatch(self):
+        # Nodes without a callback are visited with visit()
+        visitor = DispatchSumVisitor()
+        ans = visitor.dfs_postorder_dispatch(self.root)
+        self.assertEqual(ans, 820)
+        # The callbacks for Node are used for subclasses
+        visitor = DispatchSumVisitor(
+            leaf_callbacks={LeafNode: lambda node: 2*node.num},
+            node_callbacks={Node: lambda node, values: node.num + sum(values)})
+        ans = visitor.dfs_postorder_dispatch(self.root)
+        self.assertEqual(ans, 820)
+        leaf = self.root.children[0].children[0].children[0]
+        leaf.__class__ = LeafNode
+        visitor.reset_dispatch()
+        ans = visitor.dfs_postorder_dispatch(self.root)
+        self.assertEqual(ans, 820 + leaf.num)
+        # The dictionaries are only searched once for each type
+        visitor.leaf_callbacks[LeafNode] = lambda node: 0
+        ans = visitor.dfs_postorder_dispatch(self.root)
+        self.assertEqual(ans, 820 + leaf.num)
+        visitor.reset_dispatch()
+        ans = visitor.dfs_postorder_dispatch(self.root)
+        self.assertEqual(ans, 820 - leaf.num)
+
+    def test_retval_dfs_postorder_dispatch_trivial(self):
+        root = Node()
+        root.num = 1
+        visitor = DispatchSumVisitor()
+        ans = visitor.dfs_postorder_dispatch(root)
+        self.assertEqual(ans, 1)
+        visitor = DispatchSumVisitor(leaf_callbacks={Node: lambda node: 3})
+        ans = visitor.dfs_postorder_dispatch(root)
+        self.assertEqual(ans, 3)
+
+    def test_retval_dfs_postorder_dag(self):
+        visitor = SumVisitor()
+        ans = visitor.dfs_postorder_dag(self.root)
+        self.assertEqual(ans, 820)
+        #
+        # A DAG where each node has two edges to the next node
+        #
+        leaf = Node()
+        leaf.num = 1
+        root = leaf
+        for i in range(40):
+            node = Node()
+            node.children = [root, root]
+            root = node
+        visitor = CountingSumVisitor()
+        ans = visitor.dfs_postorder_dag(root)
+        self.assertEqual(ans, 2**40)
+        self.assertEqual(visitor.visits, 40)
+
+    def test_retval_dfs_postorder_dag_cache(self):
+        visitor = CountingSumVisitor()
+        cache = NodeValueCache()
+        ans = visitor.dfs_postorder_dag(self.root, cache)
+        self.assertEqual(ans, 820)
+        self.assertEqual(visitor.visits, 13)
+        self.assertEqual(len(cache), 13)
+        # The cached values are reused
+        ans = visitor.dfs_postorder_dag(self.root, cache)
+        self.assertEqual(ans, 820)
+        self.assertEqual(visitor.visits, 13)
+        ans = visitor.dfs_postorder_dag(self.root.children[1], cache)
+        self.assertEqual(ans, 3 + 8 + 9 + 10 + sum(range(23, 32)))
+        self.assertEqual(visitor.visits, 13)
+        # The cache size is bounded, and the least recently used
+        # values are discarded
+        cache = NodeValueCache(maxsize=2)
+        ans = visitor.dfs_postorder_dag(self.root, cache)
+        self.assertEqual(ans, 820)
+        self.assertEqual(len(cache), 2)
+        visitor.visits = 0
+        ans = visitor.dfs_postorder_dag(self.root.children[2], cache)
+        self.assertEqual(visitor.visits, 0)
+        ans = visitor.dfs_postorder_dag(self.root.children[0], cache)
+        self.assertEqual(visitor.visits, 4)
+        self.assertEqual(cache.get(id(self.root)), None)
+        self.assertIs(cache.get(id(self.root.children[0]))[0],
+                      self.root.children[0])
+        cache.clear()
+        self.assertEqual(len(cache), 0)
+
     def test_count_bfs(self):
         cvisitor = CountVisitor()
         ans = cvisitor.bfs(self.root)
@@ -162,6 +162,14 @@ tic = _globalTimer.tic
 toc = _globalTimer.toc
 
 
+def _per_call(timer):
+    # Timers that are created by HierarchicalTimer.add_time() for the
+    # parents of other timers may not have any calls
+    if timer.n_calls == 0:
+        return float('nan')
+    return timer.total_time / timer.n_calls
+
+
 class _HierarchicalHelper(object):
     def __init__(self):
         self.tic_toc = TicTocTimer()
@@ -195,7 +203,7 @@ class _HierarchicalHelper(object):
                            name=name,
                            ncalls=timer.n_calls,
                            cumtime=timer.total_time,
-                           percall=timer.total_time/timer.n_calls,
+                           percall=_per_call(timer),
                            percent=_percent )
                 s += timer.to_str(
                     indent=indent + ' '*stage_identifier_lengths[0],
@@ -404,7 +412,7 @@ class HierarchicalTimer(object):
                        name=name,
                        ncalls=timer.n_calls,
                        cumtime=timer.total_time,
-                       percall=timer.total_time/timer.n_calls,
+                       percall=_per_call(timer),
                        percent=self.get_total_percent_time(name))
             s += timer.to_str(
                 indent=' '*stage_identifier_lengths[0],
@@ -412,6 +420,33 @@ class HierarchicalTimer(object):
         s += underline.replace('-', '=')
         return s
 
+    def add_time(self, identifier, elapsed, n_calls=1):
+        """
+        Add time that was measured elsewhere to a timer.  The timer and
+        its parent timers are created if they do not exist (a parent
+        timer that is created has no calls).
+
+        Parameters
+        ----------
+        identifier: str or tuple of str
+            The full name of the timer including parent timers separated
+            with dots, or a tuple of the names.
+        elapsed: float
+            The time to add, in seconds
+        n_calls: int
+            The number of calls to add
+        """
+        if isinstance(identifier, str):
+            identifier = identifier.split('.')
+        timer = self
+        for name in identifier:
+            child = timer.timers.get(name, None)
+            if child is None:
+                child = timer.timers[name] = _HierarchicalHelper()
+            timer = child
+        timer.n_calls += n_calls
+        timer.total_time += elapsed
+
     def reset(self):
         """
         Completely reset the timer.
@@ -1,4 +1,4 @@
-from collections import deque
+from collections import deque, OrderedDict
 
 
 class SimpleVisitor(object):
@@ -71,12 +71,15 @@ class SimpleVisitor(object):
         Returns:
             The value of the :func:`finalize` method.
         """
+        visit = self.visit
+        is_leaf = self.is_leaf
+        children = self.children
         dq = deque([node])
         while dq:
             current = dq.popleft()
-            self.visit(current)
-            if not self.is_leaf(current):
-                dq.extend(self.children(current))
+            visit(current)
+            if not is_leaf(current):
+                dq.extend(children(current))
         return self.finalize()
 
     def xbfs(self, node):
@@ -95,13 +98,16 @@ class SimpleVisitor(object):
         Returns:
             The value of the :func:`finalize` method.
         """
+        visit = self.visit
+        is_leaf = self.is_leaf
+        children = self.children
         dq = deque([node])
         while dq:
             current = dq.popleft()
-            self.visit(current)
-            for c in self.children(current):
-                if self.is_leaf(c):
-                    self.visit(c)
+            visit(current)
+            for c in children(current):
+                if is_leaf(c):
+                    visit(c)
                 else:
                     dq.append(c)
         return self.finalize()
@@ -117,13 +123,15 @@ class SimpleVisitor(object):
         Returns:
             The value of the :func:`finalize` method.
         """
+        visit = self.visit
+        is_leaf = self.is_leaf
+        children = self.children
         dq = deque([node])
         while dq:
             current = dq.pop()
-            self.visit(current)
-            if not self.is_leaf(current):
-                for c in reversed(self.children(current)):
-                    dq.append(c)
+            visit(current)
+            if not is_leaf(current):
+                dq.extend(reversed(children(current)))
         return self.finalize()
 
     dfs = dfs_preorder
@@ -133,24 +141,47 @@ class SimpleVisitor(object):
         Perform depth-first search starting at a node,
         where nodes are visited after their children.
 
+        The children of a node are only searched once.  If a node is
+        shared in a DAG, then it is visited again, but its children
+        are not.
+
         Args:
             node: a node in a tree
 
         Returns:
             The value of the :func:`finalize` method.
         """
-        expanded = set()
-        dq = deque([node])
-        while dq:
-            current = dq[-1]
-            if id(current) in expanded:
-                dq.pop()
-                self.visit(current)
-            else:
-                for c in reversed(self.children(current)):
-                    dq.append(c)
-                expanded.add(id(current))
-        return self.finalize()
+        visit = self.visit
+        children = self.children
+        #
+        # The stack contains the nodes whose children are being
+        # visited, with their children and the index of the next child.
+        #
+        _stack = []
+        _obj = node
+        _argList = children(node)
+        _idx = 0
+        _len = len(_argList)
+        expanded = set([id(node)])
+        while 1:
+            while _idx < _len:
+                _sub = _argList[_idx]
+                _idx += 1
+                _subList = children(_sub)
+                _n = len(_subList)
+                if _n and id(_sub) not in expanded:
+                    expanded.add(id(_sub))
+                    _stack.append((_obj, _argList, _idx, _len))
+                    _obj = _sub
+                    _argList = _subList
+                    _idx = 0
+                    _len = _n
+                else:
+                    visit(_sub)
+            visit(_obj)
+            if not _stack:
+                return self.finalize()
+            _obj, _argList, _idx, _len = _stack.pop()
 
     def dfs_inorder(self, node):
         """
@@ -182,6 +213,56 @@ class SimpleVisitor(object):
         return self.finalize()
 
 
+class NodeValueCache(object):
+    """
+    A cache of the values of nodes that are computed by
+    :func:`ValueVisitor.dfs_postorder_dag`.
+
+    A cache can be passed to several searches to reuse the values of
+    the nodes that they share.  This is only correct if the nodes (and
+    the values of their descendants) do not change between the
+    searches.  If :attr:`maxsize` is not :const:`None`, then the least
+    recently used values are discarded to keep at most :attr:`maxsize`
+    values.
+
+    The cache keeps a reference to each node whose value it stores,
+    so the id() of a node cannot be reused while its value is cached.
+    """
+
+    def __init__(self, maxsize=None):
+        self.maxsize = maxsize
+        self._values = OrderedDict()
+
+    def __len__(self):
+        return len(self._values)
+
+    def clear(self):
+        """
+        Discard the cached values.
+        """
+        self._values.clear()
+
+    def get(self, key, default=None):
+        """
+        Return the tuple ``(node, value)`` for the node whose id() is
+        :attr:`key`, or :attr:`default` if it is not cached.
+        """
+        entry = self._values.pop(key, None)
+        if entry is None:
+            return default
+        self._values[key] = entry
+        return entry
+
+    def __setitem__(self, key, entry):
+        values = self._values
+        if key in values:
+            del values[key]
+        values[key] = entry
+        if self.maxsize is not None:
+            while len(values) > self.maxsize:
+                values.popitem(last=False)
+
+
 class ValueVisitor(object):
 
     def visit(self, node, values):  #pragma: no cover
@@ -325,31 +406,40 @@ class ValueVisitor(object):
         Returns:
             The value of the :func:`finalize` method.
         """
-        flag, value = self.visiting_potential_leaf(node)
+        visiting_potential_leaf = self.visiting_potential_leaf
+        children = self.children
+        visit = self.visit
+        flag, value = visiting_potential_leaf(node)
         if flag:
             return value
-        _stack = [ (node, self.children(node), 0, len(self.children(node)), [])]
+        #
+        # The stack contains the nodes whose arguments are being
+        # visited:
+        #   _obj        Current expression object
+        #   _argList    The arguments for this expression objet
+        #   _idx        The current argument being considered
+        #   _len        The number of arguments
+        #   _result     The values of the arguments that were visited
+        #
+        _stack = []
+        _obj = node
+        _argList = children(node)
+        _idx = 0
+        _len = len(_argList)
+        _result = []
         #
         # Iterate until the stack is empty
         #
         # Note: 1 is faster than True for Python 2.x
         #
         while 1:
-            #
-            # Get the top of the stack
-            #   _obj        Current expression object
-            #   _argList    The arguments for this expression objet
-            #   _idx        The current argument being considered
-            #   _len        The number of arguments
-            #
-            _obj, _argList, _idx, _len, _result = _stack.pop()
             #
             # Iterate through the arguments
             #
             while _idx < _len:
                 _sub = _argList[_idx]
                 _idx += 1
-                flag, value = self.visiting_potential_leaf(_sub)
+                flag, value = visiting_potential_leaf(_sub)
                 if flag:
                     _result.append( value )
                 else:
@@ -358,20 +448,205 @@ class ValueVisitor(object):
                     #
                     _stack.append( (_obj, _argList, _idx, _len, _result) )
                     _obj                    = _sub
-                    _argList                = self.children(_sub)
+                    _argList                = children(_sub)
                     _idx                    = 0
                     _len                    = len(_argList)
                     _result                 = []
             #
             # Process the current node
             #
-            ans = self.visit(_obj, _result)
-            if _stack:
+            ans = visit(_obj, _result)
+            if not _stack:
+                return self.finalize(ans)
+            #
+            # "return" the recursion by putting the return value on the end of the results stack
+            #
+            _obj, _argList, _idx, _len, _result = _stack.pop()
+            _result.append( ans )
+
+    def dfs_postorder_dag(self, node, cache=None):
+        """
+        Perform depth-first search starting at a node,
+        where nodes are visited after their children.
+
+        The value of each node that is not a leaf is cached, so
+        a node that is shared by several parents in a
+        directed acyclic graph is only visited once.  The
+        values are cached in a dictionary that maps the id() of
+        a node to the tuple ``(node, value)``.
+
+        Args:
+            node: a node in a tree or directed acyclic graph
+            cache: the cache of the node values.  If this is
+                :const:`None`, then a new dictionary is used
+                for this search.  Otherwise, this is a dictionary
+                or a :class:`NodeValueCache` object whose values
+                are reused.
+
+        Returns:
+            The value of the :func:`finalize` method.
+        """
+        visiting_potential_leaf = self.visiting_potential_leaf
+        children = self.children
+        visit = self.visit
+        if cache is None:
+            cache = {}
+        cache_get = cache.get
+        flag, value = visiting_potential_leaf(node)
+        if flag:
+            return value
+        entry = cache_get(id(node))
+        if entry is not None and entry[0] is node:
+            return self.finalize(entry[1])
+        _stack = []
+        _obj = node
+        _argList = children(node)
+        _idx = 0
+        _len = len(_argList)
+        _result = []
+        while 1:
+            while _idx < _len:
+                _sub = _argList[_idx]
+                _idx += 1
+                flag, value = visiting_potential_leaf(_sub)
+                if flag:
+                    _result.append( value )
+                    continue
+                entry = cache_get(id(_sub))
+                if entry is not None and entry[0] is _sub:
+                    _result.append( entry[1] )
+                    continue
                 #
-                # "return" the recursion by putting the return value on the end of the results stack
+                # Push an expression onto the stack
                 #
-                _stack[-1][-1].append( ans )
-            else:
+                _stack.append( (_obj, _argList, _idx, _len, _result) )
+                _obj                    = _sub
+                _argList                = children(_sub)
+                _idx                    = 0
+                _len                    = len(_argList)
+                _result                 = []
+            #
+            # Process the current node
+            #
+            ans = visit(_obj, _result)
+            cache[id(_obj)] = (_obj, ans)
+            if not _stack:
                 return self.finalize(ans)
+            _obj, _argList, _idx, _len, _result = _stack.pop()
+            _result.append( ans )
+
+
+class DispatchValueVisitor(ValueVisitor):
+    """
+    A :class:`ValueVisitor` that selects the function used to compute
+    the value of a node with the type of the node.
+
+    The :attr:`leaf_callbacks` dictionary maps node types to functions
+    ``f(node)`` that return the value of a leaf node, and the
+    :attr:`node_callbacks` dictionary maps node types to functions
+    ``f(node, values)`` that return the value of a node given the
+    values of its children.  A node whose type (or base class) is in
+    neither dictionary is processed with the
+    :func:`visiting_potential_leaf` and :func:`visit` methods.
+
+    The callbacks for a type are found once, when the first node of
+    that type is visited.  Call :func:`reset_dispatch` if the
+    dictionaries are changed after a search.
+    """
+
+    def __init__(self, leaf_callbacks=None, node_callbacks=None):
+        self.leaf_callbacks = {} if leaf_callbacks is None \
+                              else dict(leaf_callbacks)
+        self.node_callbacks = {} if node_callbacks is None \
+                              else dict(node_callbacks)
+        self._dispatch = {}
+
+    def reset_dispatch(self):
+        """
+        Discard the callbacks that were selected for the node types.
+        """
+        self._dispatch = {}
 
+    def _dispatch_entry(self, node_type):
+        #
+        # Returns (True, f) for a leaf type, (False, f) for a node type,
+        # or None if the type does not have a callback
+        #
+        entry = None
+        for cls in getattr(node_type, '__mro__', (node_type,)):
+            if cls in self.leaf_callbacks:
+                entry = (True, self.leaf_callbacks[cls])
+                break
+            if cls in self.node_callbacks:
+                entry = (False, self.node_callbacks[cls])
+                break
+        self._dispatch[node_type] = entry
+        return entry
+
+    def dfs_postorder_dispatch(self, node):
+        """
+        Perform depth-first search starting at a node,
+        where nodes are visited after their children.
 
+        This method uses a stack to manage the set of nodes
+        that need to be explored, and it calls the
+        :func:`children` method once for each node that is
+        not a leaf.
+
+        Args:
+            node: a node in a tree
+
+        Returns:
+            The value of the :func:`finalize` method.
+        """
+        dispatch = self._dispatch
+        dispatch_entry = self._dispatch_entry
+        visiting_potential_leaf = self.visiting_potential_leaf
+        children = self.children
+        visit = self.visit
+        #
+        # The root node is the only argument of a placeholder
+        # expression at the bottom of the stack.
+        #
+        _stack = []
+        _obj = None
+        _callback = None
+        _argList = (node,)
+        _idx = 0
+        _len = 1
+        _result = []
+        while 1:
+            while _idx < _len:
+                _sub = _argList[_idx]
+                _idx += 1
+                _type = _sub.__class__
+                try:
+                    entry = dispatch[_type]
+                except KeyError:
+                    entry = dispatch_entry(_type)
+                if entry is None:
+                    flag, value = visiting_potential_leaf(_sub)
+                    if flag:
+                        _result.append(value)
+                        continue
+                    callback = visit
+                elif entry[0]:
+                    _result.append(entry[1](_sub))
+                    continue
+                else:
+                    callback = entry[1]
+                #
+                # Push an expression onto the stack
+                #
+                _stack.append((_obj, _callback, _argList, _idx, _len, _result))
+                _obj = _sub
+                _callback = callback
+                _argList = children(_sub)
+                _idx = 0
+                _len = len(_argList)
+                _result = []
+            if not _stack:
+                return self.finalize(_result[0])
+            ans = _callback(_obj, _result)
+            _obj, _callback, _argList, _idx, _len, _result = _stack.pop()
+            _result.append(ans)
@@ -18,6 +18,7 @@ from six import iteritems
 import pyutilib.pyro.util
 from pyutilib.pyro.util import get_nameserver, using_pyro3, using_pyro4
 from pyutilib.pyro.util import Pyro as _pyro
+from pyutilib.pyro.serialization import PayloadSerializer, get_serializer
 
 if sys.version_info >= (3, 0):
     xrange = range
@@ -35,12 +36,24 @@ class Client(object):
                  port=None,
                  num_dispatcher_tries=30,
                  caller_name="Client",
-                 dispatcher=None):
+                 dispatcher=None,
+                 serializer=None,
+                 return_data=True):
 
-        if _pyro is None:
+        # A dispatcher object (e.g., a LocalDispatcher) can be used
+        # without Pyro
+        if _pyro is None and dispatcher is None:
             raise ImportError("Pyro or Pyro4 is not available")
         self.type = type
         self.id = 0
+        # When a serializer is given, the task data (and the results
+        # computed by the workers) are sent as encoded bytes (see
+        # pyutilib.pyro.serialization).  When return_data is False, the
+        # workers remove the task data from the returned results.
+        self._serializer = None
+        if serializer is not None:
+            self._serializer = get_serializer(serializer)
+        self._return_data = return_data
 
         # Deprecated in Pyro3
         # Removed in Pyro4
@@ -105,14 +118,14 @@ class Client(object):
             assert port is None
             assert host is None
             self.dispatcher = dispatcher
-            if using_pyro4:
+            if using_pyro4 and hasattr(self.dispatcher, '_pyroUri'):
                 self.URI = self.dispatcher._pyroUri
             else:
-                self.URI = self.dispatcher.URI
+                self.URI = getattr(self.dispatcher, 'URI', None)
             print('Client assigned dispatcher with URI=%s' % (self.URI))
 
     def close(self):
-        if self.dispatcher is not None:
+        if self.dispatcher is not None and self.URI is not None:
             if using_pyro4:
                 self.dispatcher._pyroRelease()
             else:
@@ -125,39 +138,76 @@ class Client(object):
                   "type=" + str(task_type))
         self.dispatcher.clear_queue(type=task_type)
 
+    def _encode_task(self, task):
+        # Returns the task that is sent to the dispatcher.  The task of
+        # the caller is copied before its data is serialized, so the
+        # caller keeps its data.
+        serialize = self._serializer is not None and \
+            not task.get('serialized', False)
+        if not serialize and self._return_data:
+            return task
+        task = dict(task)
+        if serialize:
+            task['data'] = self._serializer.dumps(task['data'])
+            task['serialized'] = True
+        if not self._return_data:
+            task['return_data'] = False
+        return task
+
+    def _decode_result(self, result):
+        if result is not None and result.get('serialized', False):
+            serializer = self._serializer
+            if serializer is None:
+                serializer = PayloadSerializer()
+            result['result'] = serializer.loads(result['result'])
+            if result['data'] is not None:
+                result['data'] = serializer.loads(result['data'])
+            del result['serialized']
+        return result
+
     def add_tasks(self, tasks, verbose=False):
+        encoded = {}
         for task_type in tasks:
+            encoded[task_type] = []
             for task in tasks[task_type]:
                 if task['id'] is None:
                     self.id += 1
                 task['client'] = self.CLIENTNAME
+                encoded[task_type].append(self._encode_task(task))
                 if verbose:
                     print("Adding task " + str(task['id']) + " to dispatcher "
                           "queue with type=" + str(task_type) + " - in bulk")
-        self.dispatcher.add_tasks(tasks)
+        self.dispatcher.add_tasks(encoded)
 
     def add_task(self, task, override_type=None, verbose=False):
         task_type = override_type if (override_type is not None) else self.type
         if task['id'] is None:
             self.id += 1
         task['client'] = self.CLIENTNAME
+        encoded = self._encode_task(task)
         if verbose:
             print("Adding task " + str(task['id']) + " to dispatcher "
                   "queue with type=" + str(task_type) + " - individually")
-        self.dispatcher.add_task(task, type=task_type)
+        self.dispatcher.add_task(encoded, type=task_type)
 
     def get_result(self, override_type=None, block=True, timeout=5):
         task_type = override_type if (override_type is not None) else self.type
-        return self.dispatcher.get_result(
-            type=task_type, block=block, timeout=timeout)
+        return self._decode_result(self.dispatcher.get_result(
+            type=task_type, block=block, timeout=timeout))
 
     def get_results(self, override_type=None, block=True, timeout=5):
         task_type = override_type if (override_type is not None) else self.type
-        return self.dispatcher.get_results(
+        results = self.dispatcher.get_results(
             [(task_type, block, timeout)])[task_type]
+        for result in results:
+            self._decode_result(result)
+        return results
 
     def get_results_all_queues(self):
-        return self.dispatcher.get_results_all_queues()
+        results = self.dispatcher.get_results_all_queues()
+        for result in results:
+            self._decode_result(result)
+        return results
 
     def num_tasks(self, override_type=None):
         task_type = override_type if (override_type is not None) else self.type
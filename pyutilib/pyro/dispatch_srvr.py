@@ -65,6 +65,57 @@ def main():
         help="Port that the nameserver is bound on",
         type="int",
         default=None)
+    parser.add_option(
+        "--scheduling-policy",
+        dest="policy",
+        help=("The order in which queued tasks are handed out to workers: "
+              "fifo, priority (smallest task priority first), or "
+              "shortest_expected_first (smallest task expected_duration "
+              "first). The default is fifo."),
+        type="choice",
+        choices=sorted(pyutilib.pyro.scheduling_policies),
+        default="fifo")
+    parser.add_option(
+        "--fair-bulk-fetch",
+        dest="fair_bulk_fetch",
+        help=("Limit each bulk request for tasks to an even share of the "
+              "queued tasks among the registered workers, rather than "
+              "handing out the entire queue."),
+        default=False,
+        action="store_true")
+    parser.add_option(
+        "--lease-timeout",
+        dest="lease_timeout",
+        metavar="SECONDS",
+        help=("Requeue the tasks handed to a worker if the worker neither "
+              "returns their results nor sends a heartbeat within this "
+              "many seconds. Only workers started with a heartbeat "
+              "interval are tracked. By default, tasks are never requeued."),
+        type="float",
+        default=None)
+    parser.add_option(
+        "--metrics",
+        dest="metrics",
+        help=("Collect queue and worker metrics (task rates, queue wait "
+              "times, worker throughput and latency, in-flight tasks), "
+              "which clients can query with the get_metrics() method."),
+        default=False,
+        action="store_true")
+    parser.add_option(
+        "--metrics-file",
+        dest="metrics_file",
+        metavar="FILE",
+        help=("Collect metrics (see --metrics) and append them to this "
+              "file as JSON lines ('-' for stdout)."),
+        default=None)
+    parser.add_option(
+        "--metrics-interval",
+        dest="metrics_interval",
+        metavar="SECONDS",
+        help=("The interval between the lines written to the metrics "
+              "file. The default is 60 seconds."),
+        type="float",
+        default=60.0)
     parser.add_option(
         "--allow-multiple-dispatchers",
         dest="allow_multiple_dispatchers",
@@ -103,7 +154,13 @@ def main():
         verbose=verbose,
         max_allowed_connections=options.max_allowed_connections,
         worker_limit=options.worker_limit,
-        clear_group=not options.allow_multiple_dispatchers)
+        clear_group=not options.allow_multiple_dispatchers,
+        policy=options.policy,
+        fair_bulk_fetch=options.fair_bulk_fetch,
+        lease_timeout=options.lease_timeout,
+        metrics=options.metrics,
+        metrics_file=options.metrics_file,
+        metrics_interval=options.metrics_interval)
 
 
 if __name__ == '__main__':
@@ -7,16 +7,21 @@
 #  the U.S. Government retains certain rights in this software.
 #  _________________________________________________________________________
 
-__all__ = ['Dispatcher', 'DispatcherServer']
+__all__ = ['Dispatcher', 'DispatcherServer', 'scheduling_policies']
 
 import os
 import sys
 import uuid
+import heapq
+import itertools
+import threading
+import time
 from collections import defaultdict
 
 from pyutilib.pyro.util import get_nameserver, using_pyro3, using_pyro4
 from pyutilib.pyro.util import Pyro as _pyro
 from pyutilib.pyro.util import set_maxconnections, get_dispatchers
+from pyutilib.pyro.metrics import DispatcherMetrics, MetricsReporter
 
 if sys.version_info >= (3, 0):
     import queue as Queue
@@ -39,6 +44,53 @@ else:
     expose = lambda obj: obj
 
 
+#
+# Scheduling policies map a task to a sort key; tasks with smaller keys
+# are handed out first, and tasks with equal keys are handed out in the
+# order they were added.  A policy of None is a plain FIFO queue.
+#
+#   priority:
+#       tasks with the smallest 'priority' are dispatched first (as
+#       with Queue.PriorityQueue); tasks without a priority are
+#       treated as priority 0
+#   shortest_expected_first:
+#       tasks with the smallest 'expected_duration' are dispatched
+#       first; tasks without an expected duration are dispatched last
+#
+scheduling_policies = {
+    'fifo': None,
+    'priority': lambda task: task.get('priority', 0),
+    'shortest_expected_first':
+        lambda task: (task.get('expected_duration') is None,
+                      task.get('expected_duration')),
+}
+
+
+class _OrderedTaskQueue(Queue.Queue):
+    """
+    A thread-safe queue that returns items in order of key(item),
+    breaking ties in FIFO order.
+    """
+
+    def __init__(self, key, maxsize=0):
+        self._key = key
+        Queue.Queue.__init__(self, maxsize)
+
+    def _init(self, maxsize):
+        self.queue = []
+        self._counter = itertools.count()
+
+    def _qsize(self, len=len):
+        return len(self.queue)
+
+    def _put(self, item):
+        heapq.heappush(self.queue,
+                       (self._key(item), next(self._counter), item))
+
+    def _get(self):
+        return heapq.heappop(self.queue)[2]
+
+
 def _clear_queue_threadsafe(q):
     while not q.empty():
         try:
@@ -55,12 +107,78 @@ class Dispatcher(base):
             raise ImportError("Pyro or Pyro4 is not available")
         if using_pyro3:
             _pyro.core.ObjBase.__init__(self)
-        self._task_queue = defaultdict(Queue.Queue)
+        policy = kwds.pop("policy", None)
+        if policy is None or policy == 'fifo':
+            self._task_queue_factory = Queue.Queue
+        else:
+            key = scheduling_policies.get(policy, policy)
+            if not hasattr(key, '__call__'):
+                raise ValueError("Unknown scheduling policy '%s'; expected "
+                                 "one of %s or a callable" %
+                                 (policy, sorted(scheduling_policies)))
+            self._task_queue_factory = lambda: _OrderedTaskQueue(key)
+        self._task_queue = defaultdict(self._task_queue_factory)
         self._result_queue = defaultdict(Queue.Queue)
         self._verbose = kwds.pop("verbose", False)
         self._registered_workers = set()
         self._acquired_workers = set()
         self._worker_limit = kwds.pop("worker_limit", None)
+        # Limit each bulk get_tasks() request to an even share of the
+        # queued tasks among the registered workers
+        self._fair_bulk_fetch = kwds.pop("fair_bulk_fetch", False)
+        #
+        # Task leases: when lease_timeout is set, tasks handed to a named
+        # worker (get_task(s) with worker_name) are tracked until their
+        # results are returned.  If the worker neither returns results
+        # nor calls heartbeat() within lease_timeout seconds, its
+        # in-flight tasks are put back on their queues.  Results that
+        # arrive for a task after it was requeued are discarded.
+        #
+        # Note: tasks that do not generate a response are never leased.
+        #
+        self._lease_timeout = kwds.pop("lease_timeout", None)
+        self._lease_lock = threading.Lock()
+        self._lease_counter = itertools.count(1)
+        # worker name -> [deadline, {lease: (type, task)}]
+        self._leases = {}
+        # lease -> worker name, for the leases that are outstanding.
+        # Lease numbers are not reused, so a result whose lease is not
+        # outstanding is for a task that was requeued or forgotten.
+        self._lease_owner = {}
+        self._lease_stats = {'requeued_tasks': 0,
+                             'expired_workers': 0,
+                             'late_results': 0}
+        self._lease_monitor_stop = threading.Event()
+        if self._lease_timeout is not None:
+            if self._lease_timeout <= 0:
+                raise ValueError("lease_timeout must be a positive number")
+            th = threading.Thread(target=self._lease_monitor)
+            th.daemon = True
+            th.start()
+        #
+        # Metrics: when enabled, the dispatcher counts the tasks and
+        # results passing through each queue and records queue wait
+        # times and per-worker processing latencies (see
+        # pyutilib.pyro.metrics).  They are returned by get_metrics(),
+        # and are written as JSON lines to metrics_file (a filename, or
+        # '-' for stdout) every metrics_interval seconds.
+        #
+        metrics_file = kwds.pop("metrics_file", None)
+        metrics_interval = kwds.pop("metrics_interval", 60.0)
+        self._metrics = None
+        if kwds.pop("metrics", False) or metrics_file is not None:
+            self._metrics = DispatcherMetrics()
+        self._metrics_reporter = None
+        self._metrics_stream = None
+        if metrics_file is not None:
+            if metrics_interval <= 0:
+                raise ValueError("metrics_interval must be a positive number")
+            if metrics_file == '-':
+                stream = sys.stdout
+            else:
+                stream = self._metrics_stream = open(metrics_file, 'a')
+            self._metrics_reporter = MetricsReporter(
+                self.get_metrics, stream, metrics_interval)
         if self._verbose:
             print("Verbose output enabled...")
 
@@ -83,10 +201,25 @@ class Dispatcher(base):
         if self._verbose:
             print("Unregistering worker with name: %s" % (name))
         self._registered_workers.remove(name)
+        self._requeue_worker_tasks(name)
+
+    @oneway
+    def heartbeat(self, name):
+        """
+        Renew the lease on all tasks held by the named worker
+        """
+        if self._lease_timeout is None:
+            return
+        with self._lease_lock:
+            entry = self._leases.get(name)
+            if entry is not None:
+                entry[0] = time.time() + self._lease_timeout
 
     @oneway
     def shutdown(self):
         print("Dispatcher received request to shut down - initiating...")
+        self._lease_monitor_stop.set()
+        self._stop_metrics_reporter()
         if using_pyro3:
             self.getDaemon().shutdown()
         else:
@@ -97,6 +230,8 @@ class Dispatcher(base):
         if self._verbose:
             print("Received request to add task=<Task id=" + str(task['id']) +
                   ">; queue type=" + str(type))
+        if self._metrics is not None:
+            self._metrics.tasks_added(type, (task,))
         self._task_queue[type].put(task)
 
     # process a set of tasks in one shot - the input
@@ -110,6 +245,8 @@ class Dispatcher(base):
                 for task_type in tasks)))
         for task_type in tasks:
             task_queue = self._task_queue[task_type]
+            if self._metrics is not None:
+                self._metrics.tasks_added(task_type, tasks[task_type])
             for task in tasks[task_type]:
                 task_queue.put(task)
 
@@ -118,6 +255,11 @@ class Dispatcher(base):
         if self._verbose:
             print("Received request to add result with "
                   "result=" + str(result) + "; queue type=" + str(type))
+        if self._lease_timeout is not None \
+           and not self._release_leases((result,)):
+            return
+        if self._metrics is not None:
+            self._metrics.results_added(type, (result,))
         self._result_queue[type].put(result)
 
     # process a set of results in one shot - the input
@@ -131,8 +273,13 @@ class Dispatcher(base):
                                        for result in results[result_type]])
                         for result_type in results)))
         for result_type in results:
+            result_list = results[result_type]
+            if self._lease_timeout is not None:
+                result_list = self._release_leases(result_list)
+            if self._metrics is not None:
+                self._metrics.results_added(result_type, result_list)
             result_queue = self._result_queue[result_type]
-            for result in results[result_type]:
+            for result in result_list:
                 result_queue.put(result)
 
     #
@@ -153,14 +300,20 @@ class Dispatcher(base):
             _clear_queue_threadsafe(self._result_queue[type])
         except KeyError:
             pass
+        self._forget_leases((type,))
+        if self._metrics is not None:
+            self._metrics.queues_cleared((type,))
 
     def clear_queues(self, types):
         for type in types:
             self.clear_queue(type=type)
 
     def clear_all_queues(self):
-        self._task_queue = defaultdict(Queue.Queue)
+        self._task_queue = defaultdict(self._task_queue_factory)
         self._result_queue = defaultdict(Queue.Queue)
+        self._forget_leases()
+        if self._metrics is not None:
+            self._metrics.queues_cleared()
 
     def clear_task_queue(self, type=None):
         if self._verbose:
@@ -170,13 +323,19 @@ class Dispatcher(base):
             _clear_queue_threadsafe(self._task_queue[type])
         except KeyError:
             pass
+        self._forget_leases((type,))
+        if self._metrics is not None:
+            self._metrics.queues_cleared((type,))
 
     def clear_task_queues(self, types):
         for type in types:
             self.clear_task_queue(type=type)
 
     def clear_all_task_queues(self):
-        self._task_queue = defaultdict(Queue.Queue)
+        self._task_queue = defaultdict(self._task_queue_factory)
+        self._forget_leases()
+        if self._metrics is not None:
+            self._metrics.queues_cleared()
 
     def clear_result_queue(self, type=None):
         if self._verbose:
@@ -216,42 +375,69 @@ class Dispatcher(base):
             return True
         return False
 
-    def get_task(self, type=None, block=True, timeout=5):
+    def get_task(self, type=None, block=True, timeout=5, worker_name=None):
         if self._verbose:
             print("Received request to get a task from "
                   "queue type=" + str(type) + "; block=" + str(block) +
                   "; timeout=" + str(timeout) + " seconds")
         try:
             task = self._task_queue[type].get(block=block, timeout=timeout)
-            return task
         except Queue.Empty:
             return None
-
-    def get_tasks(self, type_block_timeout_list):
+        if self._metrics is not None:
+            self._metrics.tasks_dispatched(type, (task,))
+        if worker_name is not None and self._lease_timeout is not None:
+            self._grant_leases(worker_name, type, (task,))
+        return task
+
+    def get_tasks(self,
+                  type_block_timeout_list,
+                  max_tasks=None,
+                  worker_name=None):
         if self._verbose:
             print("Received request to get tasks in bulk. "
-                  "Queue request types=" + str(type_block_timeout_list))
+                  "Queue request types=" + str(type_block_timeout_list) +
+                  "; max_tasks=" + str(max_tasks))
 
         ret = {}
         for type, block, timeout in type_block_timeout_list:
+            task_queue = self._task_queue[type]
             task_list = []
             try:
-                task_list.append(self._task_queue[type].get(block=block,
-                                                            timeout=timeout))
+                task_list.append(task_queue.get(block=block,
+                                                timeout=timeout))
             except Queue.Empty:
                 pass
             else:
-                while self._task_queue[type].qsize():
+                limit = self._bulk_fetch_limit(task_queue, max_tasks)
+                while task_queue.qsize() and \
+                      (limit is None or len(task_list) < limit):
                     try:
-                        task_list.append(self._task_queue[type].get(
+                        task_list.append(task_queue.get(
                             block=block, timeout=timeout))
                     except Queue.Empty:
                         pass
             if len(task_list) > 0:
+                if self._metrics is not None:
+                    self._metrics.tasks_dispatched(type, task_list)
+                if worker_name is not None and \
+                   self._lease_timeout is not None:
+                    self._grant_leases(worker_name, type, task_list)
                 ret.setdefault(type, []).extend(task_list)
 
         return ret
 
+    def _bulk_fetch_limit(self, task_queue, max_tasks):
+        # Note: called after the first task has been removed from the
+        # queue, so that task counts towards the share
+        limit = max_tasks
+        if self._fair_bulk_fetch:
+            num_workers = max(1, len(self._registered_workers))
+            share = (task_queue.qsize() + num_workers) // num_workers
+            if limit is None or share < limit:
+                limit = share
+        return limit
+
     def get_result(self, type=None, block=True, timeout=5):
         if self._verbose:
             print("Received request to get a result from "
@@ -299,6 +485,51 @@ class Dispatcher(base):
                   "queue with type=" + str(type))
         return self._result_queue[type].qsize()
 
+    def num_in_flight(self):
+        if self._verbose:
+            print("Received request for number of leased tasks")
+        with self._lease_lock:
+            return len(self._lease_owner)
+
+    def lease_statistics(self):
+        """
+        Return counters describing the task lease activity
+        """
+        with self._lease_lock:
+            stats = dict(self._lease_stats)
+            stats['in_flight_tasks'] = len(self._lease_owner)
+            stats['leasing_workers'] = sum(
+                1 for entry in self._leases.values() if entry[1])
+        return stats
+
+    def get_metrics(self):
+        """
+        Return a dict with the number of queued tasks and results for
+        each queue type and, if metrics are enabled, the counters and
+        timing histograms described in pyutilib.pyro.metrics.
+        """
+        if self._metrics is not None:
+            metrics = self._metrics.snapshot()
+        else:
+            metrics = {'time': time.time(), 'queues': {}}
+        queues = metrics['queues']
+        for type, task_queue in list(self._task_queue.items()):
+            queues.setdefault(str(type), {})['queued'] = task_queue.qsize()
+        for type, result_queue in list(self._result_queue.items()):
+            queues.setdefault(str(type), {})['results_queued'] = \
+                result_queue.qsize()
+        if self._lease_timeout is not None:
+            metrics['leases'] = self.lease_statistics()
+        return metrics
+
+    def _stop_metrics_reporter(self):
+        if self._metrics_reporter is not None:
+            self._metrics_reporter.stop()
+            self._metrics_reporter = None
+        if self._metrics_stream is not None:
+            self._metrics_stream.close()
+            self._metrics_stream = None
+
     def queues_with_results(self):
         if self._verbose:
             print("Received request for the set of queues with results")
@@ -334,6 +565,87 @@ class Dispatcher(base):
         return results
 
 
+    #
+    # Task lease management
+    #
+
+    def _grant_leases(self, worker_name, type, tasks):
+        with self._lease_lock:
+            entry = self._leases.get(worker_name)
+            if entry is None:
+                entry = self._leases[worker_name] = [None, {}]
+            entry[0] = time.time() + self._lease_timeout
+            for task in tasks:
+                if not task.get('generateResponse', True):
+                    continue
+                lease = next(self._lease_counter)
+                task['lease'] = lease
+                # Keep a copy of the task as it was handed out
+                entry[1][lease] = (type, dict(task))
+                self._lease_owner[lease] = worker_name
+
+    def _release_leases(self, results):
+        # Return the list of results that should be posted to the
+        # result queues (i.e., excluding results for requeued tasks)
+        accepted = []
+        with self._lease_lock:
+            for result in results:
+                lease = result.pop('lease', None)
+                if lease is None:
+                    accepted.append(result)
+                    continue
+                worker_name = self._lease_owner.pop(lease, None)
+                if worker_name is None:
+                    self._lease_stats['late_results'] += 1
+                    continue
+                del self._leases[worker_name][1][lease]
+                accepted.append(result)
+        return accepted
+
+    def _requeue_worker_tasks(self, worker_name, expired_before=None):
+        # Requeue the tasks leased by a worker (only if its lease expired
+        # before the given time, if specified)
+        with self._lease_lock:
+            entry = self._leases.get(worker_name)
+            if entry is None or not entry[1]:
+                return 0
+            if expired_before is not None:
+                if entry[0] >= expired_before:
+                    return 0
+                self._lease_stats['expired_workers'] += 1
+            del self._leases[worker_name]
+            for lease, (type, task) in sorted(entry[1].items()):
+                del task['lease']
+                del self._lease_owner[lease]
+                if self._metrics is not None:
+                    self._metrics.tasks_added(type, (task,), requeued=True)
+                self._task_queue[type].put(task)
+            self._lease_stats['requeued_tasks'] += len(entry[1])
+            return len(entry[1])
+
+    def _forget_leases(self, types=None):
+        with self._lease_lock:
+            for entry in self._leases.values():
+                for lease, (type, task) in list(entry[1].items()):
+                    if types is None or type in types:
+                        del entry[1][lease]
+                        del self._lease_owner[lease]
+
+    def _lease_monitor(self):
+        interval = min(self._lease_timeout / 4.0, 1.0)
+        while not self._lease_monitor_stop.wait(interval):
+            now = time.time()
+            with self._lease_lock:
+                expired = [name for name, entry in self._leases.items()
+                           if entry[1] and entry[0] < now]
+            for name in expired:
+                num = self._requeue_worker_tasks(name, expired_before=now)
+                if num:
+                    if self._verbose:
+                        print("Lease expired for worker %s - requeued %d "
+                              "task(s)" % (name, num))
+
+
 Dispatcher = expose(Dispatcher)
 
 
@@ -345,7 +657,13 @@ def DispatcherServer(group=":PyUtilibServer",
                      verbose=False,
                      max_allowed_connections=None,
                      worker_limit=None,
-                     clear_group=True):
+                     clear_group=True,
+                     policy=None,
+                     fair_bulk_fetch=False,
+                     lease_timeout=None,
+                     metrics=False,
+                     metrics_file=None,
+                     metrics_interval=60.0):
 
     set_maxconnections(max_allowed_connections=max_allowed_connections)
 
@@ -388,7 +706,14 @@ def DispatcherServer(group=":PyUtilibServer",
             except _pyro.errors.NamingError:
                 pass
 
-    disp = Dispatcher(verbose=verbose, worker_limit=worker_limit)
+    disp = Dispatcher(verbose=verbose,
+                      worker_limit=worker_limit,
+                      policy=policy,
+                      fair_bulk_fetch=fair_bulk_fetch,
+                      lease_timeout=lease_timeout,
+                      metrics=metrics,
+                      metrics_file=metrics_file,
+                      metrics_interval=metrics_interval)
     proxy_name = group + ".dispatcher." + str(uuid.uuid4())
     if using_pyro3:
         uri = daemon.connect(disp, proxy_name)
@@ -0,0 +1,347 @@
+#  _________________________________________________________________________
+#
+#  PyUtilib: A Python utility library.
+#  Copyright (c) 2008 Sandia Corporation.
+#  This software is distributed under the BSD License.
+#  Under the terms of Contract DE-AC04-94AL85000 with Sandia Corporation,
+#  the U.S. Government retains certain rights in this software.
+#  _________________________________________________________________________
+#
+# A local (single machine) replacement for a Pyro dispatcher.  The
+# LocalDispatcher starts a set of worker processes that run the same
+# TaskWorker / MultiTaskWorker classes used with a Pyro dispatcher, but
+# tasks and results are exchanged through multiprocessing queues, so
+# no name server, Pyro daemon or proxy is needed.
+#
+
+__all__ = ['LocalDispatcher']
+
+import sys
+import time
+import threading
+import multiprocessing
+from collections import defaultdict
+
+if sys.version_info >= (3, 0):
+    import queue as Queue
+else:
+    import Queue
+
+from six import iteritems
+
+
+#
+# Each task queue receives one None entry per worker when the
+# LocalDispatcher is shut down.  Tasks are dicts, so this cannot be
+# confused with a task.
+#
+_shutdown_request = None
+
+
+class _LocalShutdown(Exception):
+    """Raised in a worker process when the LocalDispatcher shuts down"""
+
+
+class _WorkerDispatcher(object):
+    """
+    The dispatcher object seen by a worker process.  This implements
+    the subset of the Dispatcher API used by the task workers.
+    """
+
+    def __init__(self, task_queues, result_queue):
+        self._task_queues = task_queues
+        self._result_queue = result_queue
+
+    def _get(self, type, block, timeout):
+        try:
+            task_queue = self._task_queues[type]
+        except KeyError:
+            raise ValueError("LocalDispatcher has no task queue with "
+                             "type=%s" % (type,))
+        task = task_queue.get(block=block, timeout=timeout)
+        if task is _shutdown_request:
+            raise _LocalShutdown()
+        return task
+
+    def register_worker(self, name):
+        return True
+
+    def unregister_worker(self, name):
+        pass
+
+    def heartbeat(self, name):
+        pass
+
+    def get_task(self, type=None, block=True, timeout=5, worker_name=None):
+        try:
+            return self._get(type, block, timeout)
+        except Queue.Empty:
+            return None
+
+    def get_tasks(self,
+                  type_block_timeout_list,
+                  max_tasks=None,
+                  worker_name=None):
+        ret = {}
+        for type, block, timeout in type_block_timeout_list:
+            try:
+                task_list = [self._get(type, block, timeout)]
+            except Queue.Empty:
+                continue
+            task_queue = self._task_queues[type]
+            while max_tasks is None or len(task_list) < max_tasks:
+                try:
+                    task = task_queue.get(block=False)
+                except Queue.Empty:
+                    break
+                if task is _shutdown_request:
+                    # Process this batch first
+                    task_queue.put(task)
+                    break
+                task_list.append(task)
+            ret[type] = task_list
+        return ret
+
+    def add_task(self, task, type=None):
+        self._task_queues[type].put(task)
+
+    def add_tasks(self, tasks):
+        for type, task_list in iteritems(tasks):
+            for task in task_list:
+                self._task_queues[type].put(task)
+
+    def add_result(self, result, type=None):
+        self._result_queue.put({type: [result]})
+
+    def add_results(self, results):
+        self._result_queue.put(results)
+
+
+def _worker_main(worker_class, args, kwds, dispatcher):
+    worker = worker_class(*args, dispatcher=dispatcher, **kwds)
+    try:
+        worker.run()
+    except _LocalShutdown:
+        worker.close()
+
+
+class LocalDispatcher(object):
+    """
+    A dispatcher that runs its workers in local processes.
+
+    The LocalDispatcher starts num_workers processes, each of which
+    runs worker_class(*worker_args, dispatcher=..., **worker_kwds).run().
+    It supports the Dispatcher methods used by a Client, so it can be
+    passed as the dispatcher of a Client:
+
+        dispatcher = LocalDispatcher(MyWorker, num_workers=4)
+        client = Client(dispatcher=dispatcher)
+        client.add_tasks({None: [Task(id=i, data=i) for i in range(10)]})
+        ...
+        dispatcher.shutdown()
+
+    The task queue types must be declared when the LocalDispatcher is
+    created.  Tasks are taken by the workers in FIFO order (scheduling
+    policies and task leases are not supported), and the task dicts and
+    their results must be picklable.
+    """
+
+    def __init__(self,
+                 worker_class,
+                 num_workers=None,
+                 types=(None,),
+                 worker_args=(),
+                 worker_kwds=None,
+                 context=None,
+                 verbose=False):
+        if num_workers is None:
+            num_workers = multiprocessing.cpu_count()
+        if num_workers < 1:
+            raise ValueError("num_workers must be a positive integer")
+        if context is None:
+            context = multiprocessing
+        elif not hasattr(context, 'Process'):
+            context = multiprocessing.get_context(context)
+        self._verbose = verbose
+        self._types = tuple(types)
+        self._task_queue = dict((type, context.Queue()) for type in types)
+        self._worker_result_queue = context.Queue()
+        # Results are collected by the calling process, and sorted
+        # into these queues by type
+        self._result_queue = defaultdict(Queue.Queue)
+        self._result_lock = threading.Lock()
+        dispatcher = _WorkerDispatcher(self._task_queue,
+                                       self._worker_result_queue)
+        if worker_kwds is None:
+            worker_kwds = {}
+        self._workers = []
+        for i in range(num_workers):
+            worker = context.Process(
+                target=_worker_main,
+                args=(worker_class, tuple(worker_args), worker_kwds,
+                      dispatcher))
+            worker.daemon = True
+            worker.start()
+            self._workers.append(worker)
+        self.URI = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, t, v, tb):
+        self.shutdown()
+
+    def _task_queue_for(self, type):
+        try:
+            return self._task_queue[type]
+        except KeyError:
+            raise ValueError("LocalDispatcher has no task queue with type=%s "
+                             "(declared types: %s)" % (type, self._types))
+
+    def _collect_results(self, block=False, timeout=None):
+        # Move results sent by the workers into the local result
+        # queues.  Returns False if no results were available.
+        try:
+            results = self._worker_result_queue.get(block=block,
+                                                    timeout=timeout)
+        except Queue.Empty:
+            return False
+        while True:
+            for type, result_list in iteritems(results):
+                result_queue = self._result_queue[type]
+                for result in result_list:
+                    result_queue.put(result)
+            try:
+                results = self._worker_result_queue.get(block=False)
+            except Queue.Empty:
+                return True
+
+    def _wait_for_result(self, type, block, timeout):
+        with self._result_lock:
+            self._collect_results()
+            if not block:
+                return
+            deadline = None if timeout is None else time.time() + timeout
+            while self._result_queue[type].qsize() == 0:
+                if deadline is None:
+                    remaining = None
+                else:
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        return
+                self._collect_results(True, remaining)
+
+    def num_workers(self):
+        """The number of worker processes that are still running"""
+        return sum(1 for worker in self._workers if worker.is_alive())
+
+    def shutdown(self, timeout=None):
+        """
+        Stop the worker processes after they finish the queued tasks.
+        Results that have not been collected are discarded.
+        """
+        for task_queue in self._task_queue.values():
+            for worker in self._workers:
+                task_queue.put(_shutdown_request)
+        # The workers cannot exit while the results they sent are
+        # still waiting in the result queue pipe
+        deadline = None if timeout is None else time.time() + timeout
+        for worker in self._workers:
+            while worker.is_alive():
+                with self._result_lock:
+                    self._collect_results(True, 0.05)
+                if deadline is not None and time.time() > deadline:
+                    worker.terminate()
+                worker.join(0.01)
+        del self._workers[:]
+
+    def add_task(self, task, type=None):
+        if self._verbose:
+            print("Received request to add task=<Task id=" + str(task['id']) +
+                  ">; queue type=" + str(type))
+        self._task_queue_for(type).put(task)
+
+    def add_tasks(self, tasks):
+        if self._verbose:
+            print("Received request to add bulk task set. Task ids=%s" % (dict(
+                (task_type, [task['id'] for task in tasks[task_type]])
+                for task_type in tasks)))
+        for task_type in tasks:
+            task_queue = self._task_queue_for(task_type)
+            for task in tasks[task_type]:
+                task_queue.put(task)
+
+    def get_result(self, type=None, block=True, timeout=5):
+        self._wait_for_result(type, block, timeout)
+        try:
+            return self._result_queue[type].get(block=False)
+        except Queue.Empty:
+            return None
+
+    def get_results(self, type_block_timeout_list):
+        ret = {}
+        for type, block, timeout in type_block_timeout_list:
+            self._wait_for_result(type, block, timeout)
+            result_queue = self._result_queue[type]
+            result_list = []
+            while result_queue.qsize():
+                try:
+                    result_list.append(result_queue.get(block=False))
+                except Queue.Empty:
+                    break
+            if len(result_list) > 0:
+                ret.setdefault(type, []).extend(result_list)
+        return ret
+
+    def get_results_all_queues(self):
+        with self._result_lock:
+            self._collect_results()
+        results = []
+        for result_queue in list(self._result_queue.values()):
+            while result_queue.qsize() > 0:
+                try:
+                    results.append(result_queue.get(block=False))
+                except Queue.Empty:
+                    pass
+        return results
+
+    def num_tasks(self, type=None):
+        # Note: multiprocessing queues do not implement qsize() on all
+        # platforms (e.g., OS X)
+        return self._task_queue_for(type).qsize()
+
+    def num_results(self, type=None):
+        with self._result_lock:
+            self._collect_results()
+        return self._result_queue[type].qsize()
+
+    def queues_with_results(self):
+        with self._result_lock:
+            self._collect_results()
+        return [type for type, result_queue
+                in list(self._result_queue.items())
+                if result_queue.qsize() > 0]
+
+    def clear_task_queue(self, type=None):
+        task_queue = self._task_queue_for(type)
+        while True:
+            try:
+                task_queue.get(block=False)
+            except Queue.Empty:
+                break
+
+    def clear_result_queue(self, type=None):
+        with self._result_lock:
+            self._collect_results()
+            self._result_queue[type] = Queue.Queue()
+
+    def clear_queue(self, type=None):
+        self.clear_task_queue(type=type)
+        self.clear_result_queue(type=type)
+
+    def clear_all_queues(self):
+        for type in self._types:
+            self.clear_task_queue(type=type)
+        with self._result_lock:
+            self._collect_results()
+            self._result_queue = defaultdict(Queue.Queue)
@@ -0,0 +1,268 @@
+#  _________________________________________________________________________
+#
+#  PyUtilib: A Python utility library.
+#  Copyright (c) 2008 Sandia Corporation.
+#  This software is distributed under the BSD License.
+#  Under the terms of Contract DE-AC04-94AL85000 with Sandia Corporation,
+#  the U.S. Government retains certain rights in this software.
+#  _________________________________________________________________________
+#
+# Activity metrics collected by a Dispatcher (see the 'metrics' option
+# of pyutilib.pyro.Dispatcher).
+#
+
+__all__ = ('DispatcherMetrics', 'Histogram', 'MetricsReporter')
+
+import bisect
+import json
+import threading
+import time
+from collections import defaultdict
+
+from six import iteritems
+
+
+class Histogram(object):
+    """
+    A histogram of durations (in seconds) with logarithmically spaced
+    buckets, from 0.1 milliseconds to about 1.8 hours.
+    """
+
+    bounds = tuple(1e-4 * 2**i for i in range(27))
+
+    def __init__(self):
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q):
+        """
+        Return an upper bound on the q-quantile (the upper bound of
+        the bucket that contains it)
+        """
+        if not self.count:
+            return None
+        rank = q * self.count
+        cumulative = 0
+        for i, n in enumerate(self.counts):
+            cumulative += n
+            if cumulative >= rank and n:
+                if i < len(self.bounds):
+                    return min(self.bounds[i], self.max)
+                return self.max
+        return self.max                         #pragma:nocover
+
+    def to_dict(self):
+        buckets = []
+        for i, n in enumerate(self.counts):
+            if n:
+                upper = self.bounds[i] if i < len(self.bounds) else None
+                buckets.append([upper, n])
+        return {'count': self.count,
+                'mean': self.total / self.count if self.count else None,
+                'max': self.max,
+                'p50': self.quantile(0.5),
+                'p90': self.quantile(0.9),
+                'p99': self.quantile(0.99),
+                'buckets': buckets}
+
+
+class _QueueMetrics(object):
+    __slots__ = ('enqueued', 'dequeued', 'requeued', 'results', 'wait',
+                 'enqueue_time')
+
+    def __init__(self):
+        self.enqueued = 0
+        self.dequeued = 0
+        self.requeued = 0
+        self.results = 0
+        self.wait = Histogram()
+        # id(task) -> the time the task was queued
+        self.enqueue_time = {}
+
+
+class _WorkerMetrics(object):
+    __slots__ = ('results', 'first_seen', 'last_seen', 'latency')
+
+    def __init__(self, now):
+        self.results = 0
+        self.first_seen = now
+        self.last_seen = now
+        self.latency = Histogram()
+
+
+def _queue_name(type):
+    # JSON object keys must be strings
+    return str(type)
+
+
+class DispatcherMetrics(object):
+    """
+    Counters and timing histograms for the task and result queues of a
+    Dispatcher, and for the workers that return results.
+
+    The queue wait time of a task is the time from when it is added to
+    a task queue until it is handed to a worker.  The processing latency
+    of a task is the time from when it is handed to a worker until its
+    result is added to a result queue; it is attributed to the worker
+    named in the result's 'processedBy' entry.  Tasks without an 'id',
+    and tasks that do not generate a response, are not tracked after
+    they are handed out.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._start = time.time()
+        self._queues = defaultdict(_QueueMetrics)
+        self._workers = {}
+        # (client, id) -> (type, dispatch time)
+        self._dispatched = {}
+
+    def tasks_added(self, type, tasks, requeued=False):
+        now = time.time()
+        with self._lock:
+            queue = self._queues[type]
+            for task in tasks:
+                queue.enqueue_time[id(task)] = now
+            queue.enqueued += len(tasks)
+            if requeued:
+                queue.requeued += len(tasks)
+                for task in tasks:
+                    self._dispatched.pop((task.get('client'), task['id']),
+                                         None)
+
+    def tasks_dispatched(self, type, tasks):
+        now = time.time()
+        with self._lock:
+            queue = self._queues[type]
+            queue.dequeued += len(tasks)
+            for task in tasks:
+                start = queue.enqueue_time.pop(id(task), None)
+                if start is not None:
+                    queue.wait.add(now - start)
+                if task['id'] is not None and \
+                   task.get('generateResponse', True):
+                    self._dispatched[(task.get('client'), task['id'])] = \
+                        (type, now)
+
+    def results_added(self, type, results):
+        now = time.time()
+        with self._lock:
+            self._queues[type].results += len(results)
+            for result in results:
+                dispatched = self._dispatched.pop(
+                    (result.get('client'), result.get('id')), None)
+                name = result.get('processedBy')
+                if name is None:
+                    continue
+                worker = self._workers.get(name)
+                if worker is None:
+                    # The worker is active from when it was handed its
+                    # first task (if known)
+                    worker = self._workers[name] = _WorkerMetrics(
+                        now if dispatched is None else dispatched[1])
+                worker.results += 1
+                worker.last_seen = now
+                if dispatched is not None:
+                    worker.latency.add(now - dispatched[1])
+
+    def queues_cleared(self, types=None):
+        with self._lock:
+            for type, queue in iteritems(self._queues):
+                if types is None or type in types:
+                    queue.enqueue_time.clear()
+            for key, (type, start) in list(self._dispatched.items()):
+                if types is None or type in types:
+                    del self._dispatched[key]
+
+    def snapshot(self):
+        """
+        Return the metrics as a dict of JSON-compatible values
+        """
+        now = time.time()
+        uptime = max(now - self._start, 1e-9)
+        with self._lock:
+            in_flight = defaultdict(int)
+            for type, start in self._dispatched.values():
+                in_flight[type] += 1
+            queues = {}
+            for type, queue in iteritems(self._queues):
+                queues[_queue_name(type)] = {
+                    'enqueued': queue.enqueued,
+                    'dequeued': queue.dequeued,
+                    'requeued': queue.requeued,
+                    'results': queue.results,
+                    'in_flight': in_flight[type],
+                    'enqueue_rate': queue.enqueued / uptime,
+                    'dequeue_rate': queue.dequeued / uptime,
+                    'result_rate': queue.results / uptime,
+                    'wait_time': queue.wait.to_dict()}
+            workers = {}
+            for name, worker in iteritems(self._workers):
+                active = worker.last_seen - worker.first_seen
+                workers[str(name)] = {
+                    'results': worker.results,
+                    'throughput': worker.results / active if active > 0
+                                  else None,
+                    'last_seen': worker.last_seen,
+                    'latency': worker.latency.to_dict()}
+            return {'time': now,
+                    'uptime': uptime,
+                    'in_flight': len(self._dispatched),
+                    'queues': queues,
+                    'workers': workers}
+
+
+class MetricsReporter(object):
+    """
+    A thread that writes the metrics of a dispatcher to a stream as
+    JSON lines.  Each line also contains the rates over the interval
+    since the previous line ('interval_rates').
+    """
+
+    def __init__(self, get_metrics, ostream, interval):
+        if interval <= 0:
+            raise ValueError("The metrics interval must be a positive number")
+        self._get_metrics = get_metrics
+        self._ostream = ostream
+        self._interval = interval
+        self._previous = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self._interval):
+            self.write()
+
+    def write(self):
+        metrics = self._get_metrics()
+        previous = self._previous
+        self._previous = metrics
+        if previous is not None:
+            dt = max(metrics['time'] - previous['time'], 1e-9)
+            rates = {}
+            for name, queue in iteritems(metrics['queues']):
+                last = previous['queues'].get(name, {})
+                rates[name] = dict(
+                    (key + '_rate',
+                     (queue.get(key, 0) - last.get(key, 0)) / dt)
+                    for key in ('enqueued', 'dequeued', 'results'))
+            metrics = dict(metrics, interval_rates=rates)
+        self._ostream.write(json.dumps(metrics, sort_keys=True) + "\n")
+        self._ostream.flush()
+
+    def stop(self):
+        """Stop the thread, and write a final line"""
+        self._stop.set()
+        self._thread.join()
+        self.write()
@@ -0,0 +1,199 @@
+#  _________________________________________________________________________
+#
+#  PyUtilib: A Python utility library.
+#  Copyright (c) 2008 Sandia Corporation.
+#  This software is distributed under the BSD License.
+#  Under the terms of Contract DE-AC04-94AL85000 with Sandia Corporation,
+#  the U.S. Government retains certain rights in this software.
+#  _________________________________________________________________________
+#
+# Binary serialization of task payloads.
+#
+# By default the task dicts (including the 'data' and 'result'
+# payloads) are serialized by Pyro with its configured serializer
+# (serpent for Pyro4).  When a Client is created with a serializer, the
+# 'data' payload of each task is encoded into a single bytes object
+# before the task is sent, and the worker encodes the 'result' in the
+# same way.  Pyro then only has to transmit a small dict with a bytes
+# entry.  Tasks with encoded payloads are marked with
+# task['serialized'] = True.
+#
+# An encoded payload is self-describing: it starts with a 2 byte header
+# that records how it was encoded, so workers decode (and encode their
+# results) without being configured with the client's serializer.
+#
+
+__all__ = ('PayloadSerializer', 'get_serializer', 'compressors')
+
+import struct
+import zlib
+
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+#
+# Compression methods, by name: (id, compress(data, level),
+# decompress(data)).  The id is stored in the payload header.
+#
+compressors = {'zlib': (1, zlib.compress, zlib.decompress)}
+try:
+    import bz2
+    compressors['bz2'] = (2, bz2.compress, bz2.decompress)
+except ImportError:                             #pragma:nocover
+    pass
+try:
+    import lzma
+    compressors['lzma'] = (3,
+                           lambda data, level: lzma.compress(data,
+                                                             preset=level),
+                           lzma.decompress)
+except ImportError:                             #pragma:nocover
+    pass
+_decompressors = dict((id_, decompress)
+                      for id_, compress, decompress in compressors.values())
+
+# Pickle protocol 5 (PEP 574) supports out-of-band buffers
+out_of_band_available = getattr(pickle, 'HIGHEST_PROTOCOL', 0) >= 5 \
+                        and hasattr(pickle, 'PickleBuffer')
+
+_MAGIC = 0xB5
+_OUT_OF_BAND = 0x01
+_COMPRESSION_SHIFT = 4
+
+
+def _as_bytes(data):
+    # Pyro4's serpent serializer transmits bytes as a base64 encoded
+    # dict
+    if isinstance(data, dict):
+        import serpent
+        return serpent.tobytes(data)
+    return data
+
+
+class PayloadSerializer(object):
+    """
+    Encode Python objects as bytes with pickle.
+
+    protocol      The pickle protocol (default: the highest available).
+    out_of_band   Use pickle protocol 5 out-of-band buffers.  Large
+                  buffers (e.g., NumPy arrays) are stored after the
+                  pickle stream instead of being copied into it, and are
+                  decoded as views into the received payload.
+    compression   The name of a compression method in 'compressors'.
+    level         The compression level.
+    threshold     Payloads smaller than this (in bytes) are not
+                  compressed.
+    """
+
+    def __init__(self,
+                 protocol=None,
+                 out_of_band=False,
+                 compression=None,
+                 level=6,
+                 threshold=1024):
+        if protocol is None:
+            protocol = pickle.HIGHEST_PROTOCOL
+        if out_of_band:
+            if not out_of_band_available:
+                raise ValueError("Out-of-band buffers require pickle "
+                                 "protocol 5 (Python 3.8 or newer)")
+            protocol = max(protocol, 5)
+        if compression is not None and compression not in compressors:
+            raise ValueError("Unknown compression method '%s'; expected "
+                             "one of %s" % (compression, sorted(compressors)))
+        self.protocol = protocol
+        self.out_of_band = out_of_band
+        self.compression = compression
+        self.level = level
+        self.threshold = threshold
+
+    def __repr__(self):
+        return "PayloadSerializer(protocol=%s, out_of_band=%s, " \
+            "compression=%s)" % (self.protocol, self.out_of_band,
+                                 self.compression)
+
+    @classmethod
+    def for_payload(cls, data):
+        """
+        Return a serializer that encodes objects the same way as the
+        given payload was encoded.
+        """
+        data = _as_bytes(data)
+        magic, flags = struct.unpack('BB', data[:2])
+        if magic != _MAGIC:
+            raise ValueError("Not an encoded task payload")
+        compression = None
+        compression_id = flags >> _COMPRESSION_SHIFT
+        for name, (id_, compress, decompress) in compressors.items():
+            if id_ == compression_id:
+                compression = name
+        return cls(out_of_band=bool(flags & _OUT_OF_BAND)
+                   and out_of_band_available,
+                   compression=compression)
+
+    def dumps(self, obj):
+        flags = 0
+        if self.out_of_band:
+            buffers = []
+            data = pickle.dumps(obj, protocol=self.protocol,
+                                buffer_callback=buffers.append)
+            if buffers:
+                flags |= _OUT_OF_BAND
+                buffers = [buf.raw() for buf in buffers]
+                data = b''.join(
+                    [struct.pack('<I', len(buffers)),
+                     struct.pack('<%dQ' % (len(buffers) + 1),
+                                 len(data), *[buf.nbytes for buf in buffers]),
+                     data] + buffers)
+        else:
+            data = pickle.dumps(obj, protocol=self.protocol)
+        if self.compression is not None and len(data) >= self.threshold:
+            id_, compress, decompress = compressors[self.compression]
+            compressed = compress(data, self.level)
+            if len(compressed) < len(data):
+                data = compressed
+                flags |= id_ << _COMPRESSION_SHIFT
+        return struct.pack('BB', _MAGIC, flags) + data
+
+    def loads(self, data):
+        data = memoryview(_as_bytes(data))
+        magic, flags = struct.unpack('BB', data[:2].tobytes())
+        if magic != _MAGIC:
+            raise ValueError("Not an encoded task payload")
+        data = data[2:]
+        compression_id = flags >> _COMPRESSION_SHIFT
+        if compression_id:
+            data = memoryview(_decompressors[compression_id](data))
+        if not flags & _OUT_OF_BAND:
+            return pickle.loads(data)
+        nbuffers, = struct.unpack('<I', data[:4].tobytes())
+        lengths = struct.unpack('<%dQ' % (nbuffers + 1),
+                                data[4:12 + 8 * nbuffers].tobytes())
+        offset = 12 + 8 * nbuffers
+        chunks = []
+        for length in lengths:
+            chunks.append(data[offset:offset + length])
+            offset += length
+        return pickle.loads(chunks[0], buffers=chunks[1:])
+
+
+def get_serializer(spec):
+    """
+    Return a PayloadSerializer.  The spec is either a PayloadSerializer
+    (or any object with dumps/loads methods), or a string of the form
+    'pickle' or 'pickle5' (out-of-band buffers), optionally followed by
+    '+<compression method>', e.g. 'pickle5+zlib'.
+    """
+    if hasattr(spec, 'dumps') and hasattr(spec, 'loads'):
+        return spec
+    name, sep, compression = spec.partition('+')
+    if name == 'pickle':
+        out_of_band = False
+    elif name == 'pickle5':
+        out_of_band = True
+    else:
+        raise ValueError("Unknown task serializer '%s'" % (spec,))
+    return PayloadSerializer(out_of_band=out_of_band,
+                             compression=compression or None)
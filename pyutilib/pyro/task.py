@@ -21,14 +21,33 @@ from pyutilib.pyro.util import using_pyro4
 #
 
 
-def Task(id=None, data=None, generateResponse=True):
-    return {'id': id,
+#
+# The optional 'priority' and 'expected_duration' entries are only
+# used by dispatchers with a non-FIFO scheduling policy (see
+# pyutilib.pyro.dispatcher), so they are only stored when specified.
+# When return_data is False, the worker removes the 'data' payload
+# from the task before it is returned as a result.
+#
+def Task(id=None,
+         data=None,
+         generateResponse=True,
+         priority=None,
+         expected_duration=None,
+         return_data=True):
+    task = {'id': id,
             'data': data,
             'result': None,
             'generateResponse': generateResponse,
             'processedBy': None,
             'client': None,
             'type': None}
+    if priority is not None:
+        task['priority'] = priority
+    if expected_duration is not None:
+        task['expected_duration'] = expected_duration
+    if not return_data:
+        task['return_data'] = False
+    return task
 
 
 #
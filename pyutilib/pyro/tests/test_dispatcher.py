@@ -0,0 +1,294 @@
+import json
+import os
+import tempfile
+import time
+
+import pyutilib.th as unittest
+from pyutilib.pyro import Task, using_pyro3, using_pyro4
+if using_pyro3 or using_pyro4:
+    from pyutilib.pyro import Dispatcher
+
+
+def _ids(tasks):
+    return [task['id'] for task in tasks]
+
+
+@unittest.skipIf(not (using_pyro3 or using_pyro4),
+                 "Pyro or Pyro4 is not available")
+class TestDispatcher(unittest.TestCase):
+
+    def test_fifo(self):
+        disp = Dispatcher()
+        for i in range(5):
+            disp.add_task(Task(id=i, priority=-i))
+        tasks = disp.get_tasks(((None, False, 0),))
+        self.assertEqual(_ids(tasks[None]), [0, 1, 2, 3, 4])
+
+    def test_priority(self):
+        disp = Dispatcher(policy='priority')
+        disp.add_tasks({None: [Task(id=0, priority=2),
+                               Task(id=1),
+                               Task(id=2, priority=-1),
+                               Task(id=3, priority=2),
+                               Task(id=4, priority=0)]})
+        self.assertEqual(disp.num_tasks(), 5)
+        self.assertEqual(disp.get_task(block=False)['id'], 2)
+        tasks = disp.get_tasks(((None, False, 0),))
+        self.assertEqual(_ids(tasks[None]), [1, 4, 0, 3])
+
+    def test_shortest_expected_first(self):
+        disp = Dispatcher(policy='shortest_expected_first')
+        disp.add_tasks({'a': [Task(id=0, expected_duration=5.0),
+                              Task(id=1),
+                              Task(id=2, expected_duration=0.5),
+                              Task(id=3, expected_duration=1)]})
+        tasks = disp.get_tasks((('a', False, 0),))
+        self.assertEqual(_ids(tasks['a']), [2, 3, 0, 1])
+
+    def test_custom_policy(self):
+        disp = Dispatcher(policy=lambda task: -task['id'])
+        for i in range(4):
+            disp.add_task(Task(id=i))
+        self.assertEqual(_ids(disp.get_tasks(((None, False, 0),))[None]),
+                         [3, 2, 1, 0])
+        # The policy survives clearing the queues
+        disp.clear_all_task_queues()
+        for i in range(4):
+            disp.add_task(Task(id=i))
+        self.assertEqual(disp.get_task(block=False)['id'], 3)
+
+    def test_bad_policy(self):
+        self.assertRaises(ValueError, Dispatcher, policy='lifo')
+
+    def test_max_tasks(self):
+        disp = Dispatcher()
+        for i in range(10):
+            disp.add_task(Task(id=i), type='a')
+            disp.add_task(Task(id=i), type='b')
+        tasks = disp.get_tasks((('a', False, 0), ('b', False, 0)),
+                               max_tasks=3)
+        self.assertEqual(_ids(tasks['a']), [0, 1, 2])
+        self.assertEqual(_ids(tasks['b']), [0, 1, 2])
+        self.assertEqual(disp.num_tasks('a'), 7)
+        tasks = disp.get_tasks((('a', False, 0),))
+        self.assertEqual(len(tasks['a']), 7)
+        self.assertEqual(disp.get_tasks((('a', False, 0),)), {})
+
+    def test_fair_bulk_fetch(self):
+        disp = Dispatcher(fair_bulk_fetch=True)
+        for name in ('w1', 'w2', 'w3'):
+            disp.register_worker(name)
+        for i in range(10):
+            disp.add_task(Task(id=i))
+        sizes = []
+        while disp.num_tasks():
+            sizes.append(len(disp.get_tasks(((None, False, 0),))[None]))
+        self.assertEqual(sizes, [4, 2, 2, 1, 1])
+        # max_tasks further limits the share
+        for i in range(10):
+            disp.add_task(Task(id=i))
+        tasks = disp.get_tasks(((None, False, 0),), max_tasks=2)
+        self.assertEqual(_ids(tasks[None]), [0, 1])
+
+
+
+@unittest.skipIf(not (using_pyro3 or using_pyro4),
+                 "Pyro or Pyro4 is not available")
+class TestLeases(unittest.TestCase):
+
+    def _dispatcher(self, **kwds):
+        disp = Dispatcher(**kwds)
+        self.addCleanup(disp._lease_monitor_stop.set)
+        return disp
+
+    def _wait_for(self, condition, timeout=5):
+        endtime = time.time() + timeout
+        while not condition():
+            if time.time() > endtime:
+                self.fail("Timed out waiting for condition")
+            time.sleep(0.01)
+
+    def test_no_leases(self):
+        disp = Dispatcher()
+        disp.add_task(Task(id=1))
+        task = disp.get_task(block=False, worker_name='w1')
+        self.assertNotIn('lease', task)
+        self.assertEqual(disp.num_in_flight(), 0)
+
+    def test_result_releases_lease(self):
+        disp = self._dispatcher(lease_timeout=10)
+        disp.register_worker('w1')
+        disp.add_tasks({None: [Task(id=1), Task(id=2)], 'a': [Task(id=3)]})
+        tasks = disp.get_tasks(((None, False, 0), ('a', False, 0)),
+                               worker_name='w1')
+        self.assertEqual(disp.num_in_flight(), 3)
+        for task in tasks[None]:
+            self.assertIn('lease', task)
+        disp.add_results({None: tasks[None]})
+        disp.add_result(tasks['a'][0], type='a')
+        self.assertEqual(disp.num_in_flight(), 0)
+        results = disp.get_results(((None, False, 0), ('a', False, 0)))
+        self.assertEqual(sorted(t['id'] for t in results[None]), [1, 2])
+        for task in results[None]:
+            self.assertNotIn('lease', task)
+        self.assertEqual(disp.lease_statistics()['requeued_tasks'], 0)
+
+    def test_anonymous_and_no_response_tasks(self):
+        disp = self._dispatcher(lease_timeout=10)
+        disp.add_task(Task(id=1))
+        disp.add_task(Task(id=2, generateResponse=False))
+        self.assertNotIn('lease', disp.get_task(block=False))
+        self.assertNotIn('lease', disp.get_task(block=False,
+                                                worker_name='w1'))
+        self.assertEqual(disp.num_in_flight(), 0)
+
+    def test_expired_lease_requeues(self):
+        disp = self._dispatcher(lease_timeout=0.2)
+        disp.register_worker('dead')
+        for i in range(3):
+            disp.add_task(Task(id=i))
+        tasks = disp.get_tasks(((None, False, 0),), worker_name='dead')
+        self.assertEqual(disp.num_tasks(), 0)
+        self._wait_for(lambda: disp.num_tasks() == 3)
+        stats = disp.lease_statistics()
+        self.assertEqual(stats['requeued_tasks'], 3)
+        self.assertEqual(stats['expired_workers'], 1)
+        self.assertEqual(stats['in_flight_tasks'], 0)
+        # Another worker processes the requeued tasks
+        retry = disp.get_tasks(((None, False, 0),), worker_name='alive')
+        self.assertEqual([t['id'] for t in retry[None]], [0, 1, 2])
+        disp.add_results({None: retry[None]})
+        # The late results from the dead worker are discarded
+        disp.add_results({None: tasks[None]})
+        self.assertEqual(disp.num_results(), 3)
+        self.assertEqual(disp.lease_statistics()['late_results'], 3)
+
+    def test_forgotten_leases(self):
+        # No state is kept for the leases of cleared tasks
+        disp = self._dispatcher(lease_timeout=5)
+        for i in range(3):
+            disp.add_task(Task(id=i))
+        tasks = disp.get_tasks(((None, False, 0),), worker_name='w1')
+        disp.clear_all_task_queues()
+        self.assertEqual(disp._lease_owner, {})
+        self.assertEqual(disp.num_in_flight(), 0)
+        # The late results are discarded
+        disp.add_results({None: tasks[None]})
+        self.assertEqual(disp.num_results(), 0)
+        self.assertEqual(disp.lease_statistics()['late_results'], 3)
+
+    def test_heartbeat_renews_lease(self):
+        disp = self._dispatcher(lease_timeout=0.3)
+        disp.add_task(Task(id=1))
+        task = disp.get_task(block=False, worker_name='w1')
+        for i in range(6):
+            time.sleep(0.1)
+            disp.heartbeat('w1')
+        self.assertEqual(disp.num_tasks(), 0)
+        self.assertEqual(disp.num_in_flight(), 1)
+        self._wait_for(lambda: disp.num_tasks() == 1)
+
+    def test_unregister_requeues(self):
+        disp = self._dispatcher(lease_timeout=10)
+        disp.register_worker('w1')
+        disp.add_task(Task(id=1))
+        disp.get_task(block=False, worker_name='w1')
+        disp.unregister_worker('w1')
+        self.assertEqual(disp.num_tasks(), 1)
+        self.assertEqual(disp.lease_statistics()['requeued_tasks'], 1)
+
+    def test_clear_forgets_leases(self):
+        disp = self._dispatcher(lease_timeout=0.2)
+        disp.add_task(Task(id=1))
+        disp.get_task(block=False, worker_name='w1')
+        disp.clear_task_queue()
+        self.assertEqual(disp.num_in_flight(), 0)
+        time.sleep(0.4)
+        self.assertEqual(disp.num_tasks(), 0)
+
+
+@unittest.skipIf(not (using_pyro3 or using_pyro4),
+                 "Pyro or Pyro4 is not available")
+class TestMetrics(unittest.TestCase):
+
+    def _process(self, tasks, name):
+        for task in tasks:
+            task['processedBy'] = name
+        return tasks
+
+    def test_disabled(self):
+        disp = Dispatcher()
+        disp.add_tasks({None: [Task(id=1), Task(id=2)]})
+        metrics = disp.get_metrics()
+        self.assertEqual(metrics['queues'], {'None': {'queued': 2}})
+        self.assertNotIn('workers', metrics)
+
+    def test_metrics(self):
+        disp = Dispatcher(metrics=True)
+        disp.add_tasks({None: [Task(id=i) for i in range(4)],
+                        'a': [Task(id=4)]})
+        disp.add_task(Task(id=5, generateResponse=False), type='a')
+        time.sleep(0.01)
+        tasks = disp.get_tasks(((None, False, 0),), max_tasks=3)[None]
+        disp.get_task(type='a', block=False)
+        disp.get_task(type='a', block=False)
+        metrics = disp.get_metrics()
+        self.assertEqual(metrics['in_flight'], 4)
+        queue = metrics['queues']['None']
+        self.assertEqual(queue['enqueued'], 4)
+        self.assertEqual(queue['dequeued'], 3)
+        self.assertEqual(queue['queued'], 1)
+        self.assertEqual(queue['in_flight'], 3)
+        self.assertEqual(queue['wait_time']['count'], 3)
+        self.assertGreaterEqual(queue['wait_time']['p50'], 0.01)
+        self.assertEqual(metrics['queues']['a']['dequeued'], 2)
+        self.assertEqual(metrics['queues']['a']['in_flight'], 1)
+
+        disp.add_results({None: self._process(tasks[:2], 'w1')})
+        disp.add_result(self._process(tasks[2:], 'w2')[0])
+        metrics = disp.get_metrics()
+        self.assertEqual(metrics['in_flight'], 1)
+        self.assertEqual(metrics['queues']['None']['results'], 3)
+        self.assertEqual(metrics['queues']['None']['results_queued'], 3)
+        self.assertEqual(sorted(metrics['workers']), ['w1', 'w2'])
+        self.assertEqual(metrics['workers']['w1']['results'], 2)
+        self.assertEqual(metrics['workers']['w1']['latency']['count'], 2)
+        # The metrics can be serialized
+        json.dumps(metrics)
+
+        disp.clear_all_queues()
+        self.assertEqual(disp.get_metrics()['in_flight'], 0)
+
+    def test_requeue(self):
+        disp = Dispatcher(metrics=True, lease_timeout=10)
+        self.addCleanup(disp._lease_monitor_stop.set)
+        disp.register_worker('w1')
+        disp.add_task(Task(id=1))
+        disp.get_task(block=False, worker_name='w1')
+        disp.unregister_worker('w1')
+        metrics = disp.get_metrics()
+        self.assertEqual(metrics['queues']['None']['requeued'], 1)
+        self.assertEqual(metrics['queues']['None']['enqueued'], 2)
+        self.assertEqual(metrics['in_flight'], 0)
+        self.assertEqual(metrics['leases']['requeued_tasks'], 1)
+
+    def test_metrics_file(self):
+        fd, fname = tempfile.mkstemp(suffix='.jsonl')
+        os.close(fd)
+        self.addCleanup(os.remove, fname)
+        disp = Dispatcher(metrics_file=fname, metrics_interval=0.05)
+        for i in range(3):
+            disp.add_task(Task(id=i))
+            time.sleep(0.06)
+        disp._stop_metrics_reporter()
+        with open(fname) as f:
+            lines = [json.loads(line) for line in f]
+        self.assertGreaterEqual(len(lines), 2)
+        self.assertEqual(lines[-1]['queues']['None']['enqueued'], 3)
+        self.assertIn('interval_rates', lines[-1])
+        self.assertRaises(ValueError, Dispatcher, metrics_file=fname,
+                          metrics_interval=0)
+
+
+if __name__ == "__main__":
+    unittest.main()
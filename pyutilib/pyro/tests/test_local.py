@@ -0,0 +1,100 @@
+import os
+
+import pyutilib.th as unittest
+from pyutilib.pyro import (Client, Task, TaskWorker, MultiTaskWorker,
+                           LocalDispatcher)
+
+
+class _Worker(TaskWorker):
+
+    def process(self, data):
+        if data == 'error':
+            self._worker_error = True
+            return None
+        return (2 * data, os.getpid())
+
+
+class _MultiWorker(MultiTaskWorker):
+
+    def __init__(self, *args, **kwds):
+        MultiTaskWorker.__init__(self, *args, **kwds)
+        self.push_request_type('b', False, 0.01)
+
+    def process(self, data):
+        return -data
+
+
+class TestLocalDispatcher(unittest.TestCase):
+
+    def test_client(self):
+        with LocalDispatcher(_Worker, num_workers=2) as dispatcher:
+            client = Client(dispatcher=dispatcher)
+            client.add_tasks({None: [Task(id=i, data=i) for i in range(50)]})
+            results = []
+            while len(results) < 50:
+                results.extend(client.get_results(timeout=10))
+            client.close()
+        self.assertEqual(sorted((r['id'], r['result'][0]) for r in results),
+                         [(i, 2 * i) for i in range(50)])
+        self.assertNotIn(os.getpid(), set(r['result'][1] for r in results))
+        self.assertEqual(set(r['client'] for r in results),
+                         set([client.CLIENTNAME]))
+
+    def test_get_result(self):
+        dispatcher = LocalDispatcher(_Worker, num_workers=1)
+        try:
+            self.assertIsNone(dispatcher.get_result(block=False))
+            dispatcher.add_task(Task(id=0, data=3))
+            result = dispatcher.get_result(timeout=10)
+            self.assertEqual(result['id'], 0)
+            self.assertEqual(result['result'][0], 6)
+            self.assertEqual(dispatcher.num_results(), 0)
+            dispatcher.add_task(Task(id=1, data='error'))
+            result = dispatcher.get_result(timeout=10)
+            self.assertEqual(result['id'], 1)
+            self.assertIsNone(result['result'])
+        finally:
+            dispatcher.shutdown()
+        self.assertEqual(dispatcher.num_workers(), 0)
+
+    def test_bulk_prefetch(self):
+        dispatcher = LocalDispatcher(
+            _Worker, num_workers=2,
+            worker_kwds={'prefetch_depth': 2})
+        dispatcher.add_tasks({None: [Task(id=i, data=i) for i in range(20)]})
+        results = []
+        while len(results) < 20:
+            results.extend(dispatcher.get_results(((None, True, 10),))[None])
+        dispatcher.shutdown()
+        self.assertEqual(sorted(r['id'] for r in results), list(range(20)))
+
+    def test_multiple_types(self):
+        dispatcher = LocalDispatcher(_MultiWorker, num_workers=2,
+                                     types=('a', 'b'),
+                                     worker_kwds={'type_default': 'a',
+                                                  'timeout_default': 0.01})
+        dispatcher.add_tasks({'a': [Task(id=i, data=i) for i in range(5)],
+                              'b': [Task(id=i, data=i) for i in range(5, 8)]})
+        results = {'a': [], 'b': []}
+        for type in results:
+            while len(results[type]) < (5 if type == 'a' else 3):
+                results[type].extend(dispatcher.get_results(
+                    ((type, True, 10),)).get(type, []))
+        dispatcher.shutdown()
+        self.assertEqual(sorted(r['result'] for r in results['a']),
+                         [-4, -3, -2, -1, 0])
+        self.assertEqual(sorted(r['result'] for r in results['b']),
+                         [-7, -6, -5])
+
+    def test_unknown_type(self):
+        with LocalDispatcher(_Worker, num_workers=1) as dispatcher:
+            self.assertRaises(ValueError, dispatcher.add_task, Task(id=0),
+                              type='x')
+
+    def test_bad_num_workers(self):
+        self.assertRaises(ValueError, LocalDispatcher, _Worker,
+                          num_workers=0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,146 @@
+import pyutilib.th as unittest
+from pyutilib.pyro import (Client, Task, TaskWorker, LocalDispatcher,
+                           PayloadSerializer, get_serializer, using_pyro4)
+from pyutilib.pyro.serialization import out_of_band_available, compressors
+if using_pyro4:
+    from Pyro4.util import get_serializer as get_pyro_serializer
+    from pyutilib.pyro import Dispatcher
+
+
+class _Blob(bytearray):
+    # A bytearray that is pickled out-of-band with protocol 5 (like a
+    # NumPy array)
+
+    def __reduce_ex__(self, protocol):
+        if protocol >= 5:
+            import pickle
+            return type(self)._reconstruct, (pickle.PickleBuffer(self),)
+        return type(self), (bytes(self),)
+
+    @classmethod
+    def _reconstruct(cls, obj):
+        with memoryview(obj) as m:
+            return cls(m)
+
+
+class _Worker(TaskWorker):
+
+    def process(self, data):
+        return {'sum': sum(data['values']), 'blob': data['blob'][:4]}
+
+
+def _payload():
+    return {'values': list(range(1000)), 'blob': bytearray(b'x' * 100000)}
+
+
+class TestPayloadSerializer(unittest.TestCase):
+
+    def _check(self, serializer):
+        data = _payload()
+        encoded = serializer.dumps(data)
+        self.assertIsInstance(encoded, bytes)
+        self.assertEqual(serializer.loads(encoded), data)
+        # The payload is self-describing
+        self.assertEqual(PayloadSerializer().loads(encoded), data)
+        return encoded
+
+    def test_pickle(self):
+        self._check(PayloadSerializer())
+
+    @unittest.skipIf(not out_of_band_available,
+                     "pickle protocol 5 is not available")
+    def test_out_of_band(self):
+        serializer = get_serializer('pickle5')
+        self.assertTrue(serializer.out_of_band)
+        data = {'blob': _Blob(b'y' * 100000), 'n': 1}
+        encoded = serializer.dumps(data)
+        self.assertEqual(serializer.loads(encoded), data)
+        self.assertEqual(PayloadSerializer().loads(encoded), data)
+        self.assertTrue(PayloadSerializer.for_payload(encoded).out_of_band)
+        # The buffer is not copied into the pickle stream
+        self.assertLess(len(encoded), 100300)
+        self.assertEqual(
+            get_serializer('pickle5+zlib').loads(
+                get_serializer('pickle5+zlib').dumps(data)), data)
+        # Without out-of-band buffers, pickle5 is plain pickle
+        encoded = serializer.dumps(_payload())
+        self.assertFalse(PayloadSerializer.for_payload(encoded).out_of_band)
+        self.assertEqual(serializer.loads(encoded), _payload())
+
+    def test_compression(self):
+        plain = self._check(PayloadSerializer())
+        for name in compressors:
+            serializer = PayloadSerializer(compression=name)
+            encoded = self._check(serializer)
+            self.assertLess(len(encoded), len(plain))
+            self.assertEqual(PayloadSerializer.for_payload(encoded).compression,
+                             name)
+        # Small payloads are not compressed
+        serializer = get_serializer('pickle+zlib')
+        self.assertEqual(serializer.dumps(1), PayloadSerializer().dumps(1))
+
+    def test_errors(self):
+        self.assertRaises(ValueError, get_serializer, 'json')
+        self.assertRaises(ValueError, PayloadSerializer, compression='x')
+        self.assertRaises(ValueError, PayloadSerializer().loads, b'abc')
+
+    @unittest.skipIf(not using_pyro4, "Pyro4 is not available")
+    def test_serpent(self):
+        # serpent transmits bytes as a base64 encoded dict
+        serpent = get_pyro_serializer('serpent')
+        serializer = PayloadSerializer(compression='zlib')
+        task = Task(id=0, data=serializer.dumps(_payload()))
+        wire, compressed = serpent.serializeData(task)
+        task = serpent.deserializeData(wire, compressed)
+        self.assertIsInstance(task['data'], dict)
+        self.assertEqual(serializer.loads(task['data']), _payload())
+
+
+class TestSerializedTasks(unittest.TestCase):
+
+    @unittest.skipIf(not using_pyro4, "Pyro4 is not available")
+    def test_worker(self):
+        dispatcher = Dispatcher()
+        client = Client(dispatcher=dispatcher, serializer='pickle+zlib',
+                        return_data=False)
+        original = Task(id=0, data=_payload())
+        client.add_task(original)
+        # The task of the client is not modified
+        self.assertEqual(original['data'], _payload())
+        self.assertNotIn('serialized', original)
+        self.assertNotIn('return_data', original)
+        task = dispatcher.get_task(block=False)
+        self.assertTrue(task['serialized'])
+        self.assertFalse(task['return_data'])
+        self.assertIsInstance(task['data'], bytes)
+        dispatcher.add_task(task)
+
+        worker = _Worker(dispatcher=dispatcher, name='w', block=False,
+                         timeout=0)
+        worker._process_task(task)
+        self.assertIsNone(task['data'])
+        self.assertIsInstance(task['result'], bytes)
+        dispatcher.add_result(task)
+
+        result = client.get_result(block=False)
+        self.assertEqual(result['result'], {'sum': 499500, 'blob': b'xxxx'})
+        self.assertIsNone(result['data'])
+        self.assertNotIn('serialized', result)
+
+    def test_local(self):
+        with LocalDispatcher(_Worker, num_workers=2) as dispatcher:
+            client = Client(dispatcher=dispatcher, serializer='pickle')
+            tasks = [Task(id=i, data=_payload()) for i in range(4)]
+            client.add_tasks({None: tasks})
+            for task in tasks:
+                self.assertEqual(task['data'], _payload())
+            results = []
+            while len(results) < 4:
+                results.extend(client.get_results(timeout=10))
+        for result in results:
+            self.assertEqual(result['result']['sum'], 499500)
+            self.assertEqual(result['data'], _payload())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,149 @@
+import threading
+
+import pyutilib.th as unittest
+from pyutilib.pyro import Task, using_pyro3, using_pyro4
+if using_pyro3 or using_pyro4:
+    from pyutilib.pyro import Dispatcher, TaskWorker
+
+    class _Worker(TaskWorker):
+        # Doubles its input; a task with data=None shuts the worker down
+
+        def __init__(self, *args, **kwds):
+            self.processed = []
+            self.threads = set()
+            TaskWorker.__init__(self, *args, **kwds)
+
+        def process(self, data):
+            self.threads.add(threading.current_thread())
+            if data is None:
+                self._worker_shutdown = True
+                return None
+            if data == 'error':
+                self._worker_error = True
+                return None
+            if data == 'raise':
+                raise ValueError("process() failed")
+            self.processed.append(data)
+            return 2 * data
+
+
+def _results(disp, type=None):
+    results = disp.get_results(((type, False, 0),))
+    return sorted((r['id'], r['result']) for r in results.get(type, []))
+
+
+@unittest.skipIf(not (using_pyro3 or using_pyro4),
+                 "Pyro or Pyro4 is not available")
+class TestTaskWorker(unittest.TestCase):
+
+    def _run(self, prefetch_depth, bulk=False, **kwds):
+        disp = Dispatcher()
+        # The shutdown task arrives in a batch of its own
+        for i in range(21):
+            disp.add_task(Task(id=i, data=i))
+        disp.add_task(Task(id=21, data=None))
+        worker = _Worker(dispatcher=disp, name='w',
+                         prefetch_depth=prefetch_depth, **kwds)
+        worker._bulk_task_collection = bulk
+        worker._bulk_task_limit = 3
+        worker.run()
+        return disp, worker
+
+    def test_serial(self):
+        for bulk in (False, True):
+            disp, worker = self._run(0, bulk=bulk)
+            self.assertEqual(_results(disp), [(i, 2 * i) for i in range(21)])
+            self.assertEqual(worker.threads,
+                             set([threading.current_thread()]))
+            self.assertEqual(disp._registered_workers, set())
+
+    def test_prefetch(self):
+        for bulk in (False, True):
+            for depth in (1, 3):
+                disp, worker = self._run(depth, bulk=bulk)
+                self.assertEqual(_results(disp),
+                                 [(i, 2 * i) for i in range(21)])
+                self.assertEqual(worker.processed, list(range(21)))
+                # process() is only ever called from the run() thread
+                self.assertEqual(worker.threads,
+                                 set([threading.current_thread()]))
+                self.assertEqual(disp._registered_workers, set())
+
+    def test_prefetch_returns_unprocessed_tasks(self):
+        disp = Dispatcher()
+        disp.add_task(Task(id=0, data=None))
+        for i in range(1, 6):
+            disp.add_task(Task(id=i, data=i))
+        worker = _Worker(dispatcher=disp, name='w', prefetch_depth=2,
+                         block=False, timeout=0)
+        worker.run()
+        self.assertEqual(worker.processed, [])
+        self.assertEqual(_results(disp), [])
+        # Any tasks that were prefetched are back in the queue
+        self.assertEqual(disp.num_tasks(), 5)
+        tasks = disp.get_tasks(((None, False, 0),))
+        self.assertEqual(sorted(t['id'] for t in tasks[None]),
+                         [1, 2, 3, 4, 5])
+
+    def test_prefetch_error(self):
+        disp = Dispatcher()
+        disp.add_tasks({None: [Task(id=0, data=1),
+                               Task(id=1, data='error'),
+                               Task(id=2, data=2),
+                               Task(id=3, data=None)]})
+        worker = _Worker(dispatcher=disp, name='w', prefetch_depth=1)
+        worker._bulk_task_collection = True
+        worker._bulk_task_limit = 2
+        worker.run()
+        # The remainder of a batch with an error is not processed, and
+        # the batch with the shutdown request is not posted
+        self.assertEqual(_results(disp), [(0, 2), (1, None)])
+        self.assertEqual(worker.processed, [1, 2])
+
+    def test_prefetch_exception(self):
+        # Prefetched tasks are returned if process() raises an exception
+        disp = Dispatcher()
+        disp.add_task(Task(id=0, data='raise'))
+        for i in range(1, 6):
+            disp.add_task(Task(id=i, data=i))
+        worker = _Worker(dispatcher=disp, name='w', prefetch_depth=2,
+                         block=False, timeout=0)
+        self.assertRaises(ValueError, worker.run)
+        self.assertEqual(worker.processed, [])
+        self.assertEqual(disp._registered_workers, set())
+        tasks = disp.get_tasks(((None, False, 0),))
+        self.assertEqual(sorted(t['id'] for t in tasks[None]),
+                         [1, 2, 3, 4, 5])
+
+    def test_prefetch_exception_closed_again(self):
+        # The error of process() is raised if the worker is closed again
+        # after run() fails (as in TaskWorkerServer)
+        disp = Dispatcher()
+        disp.add_task(Task(id=0, data='raise'))
+        worker = _Worker(dispatcher=disp, name='w', prefetch_depth=1,
+                         block=False, timeout=0)
+        try:
+            try:
+                worker.run()
+            except:
+                worker.close()
+                raise
+            self.fail("Expected ValueError")
+        except ValueError as e:
+            self.assertEqual(str(e), "process() failed")
+        self.assertEqual(disp._registered_workers, set())
+
+    def test_bad_prefetch_depth(self):
+        disp = Dispatcher()
+        self.assertRaises(ValueError, _Worker, dispatcher=disp,
+                          prefetch_depth=-1)
+
+    def test_register_refused(self):
+        disp = Dispatcher(worker_limit=1)
+        _Worker(dispatcher=disp, name='w1')
+        self.assertRaises(RuntimeError, _Worker, dispatcher=disp,
+                          name='w2')
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -15,10 +15,17 @@ import socket
 import time
 import itertools
 import random
+import threading
 
 from pyutilib.pyro.util import get_nameserver, using_pyro3, using_pyro4
 from pyutilib.pyro.util import Pyro as _pyro
 from pyutilib.pyro.util import get_dispatchers, _connection_problem
+from pyutilib.pyro.serialization import PayloadSerializer, get_serializer
+
+if sys.version_info >= (3, 0):
+    import queue as Queue
+else:
+    import Queue
 
 from six import advance_iterator, iteritems, itervalues
 from six.moves import xrange
@@ -28,7 +35,7 @@ from six.moves import xrange
 # in the run loop so that we don't ignore shutdown
 # requests from the dispatcher
 #
-_worker_connection_problem = None
+_worker_connection_problem = ()
 if using_pyro3:
     _worker_connection_problem = (_pyro.errors.TimeoutError,
                                   _pyro.errors.ConnectionDeniedError)
@@ -47,7 +54,10 @@ class TaskWorkerBase(object):
                  num_dispatcher_tries=30,
                  caller_name="Task Worker",
                  verbose=False,
-                 name=None):
+                 name=None,
+                 heartbeat_interval=None,
+                 dispatcher=None,
+                 serializer=None):
 
         self._verbose = verbose
         # A worker can set this flag
@@ -59,8 +69,20 @@ class TaskWorkerBase(object):
         # be gathered from the worker queue during
         # each request for work
         self._bulk_task_collection = False
-
-        if _pyro is None:
+        # the maximum number of tasks (per queue type) to
+        # gather during each bulk request for work (None
+        # means no limit)
+        self._bulk_task_limit = None
+        # the serializer used to decode task payloads (and encode
+        # results) for tasks sent by a Client with a serializer (None
+        # means the PayloadSerializer that matches the task payload)
+        self._serializer = None
+        if serializer is not None:
+            self._serializer = get_serializer(serializer)
+
+        # A dispatcher object (e.g., from a LocalDispatcher) can be
+        # used without Pyro
+        if _pyro is None and dispatcher is None:
             raise ImportError("Pyro or Pyro4 is not available")
 
         # Deprecated in Pyro3
@@ -74,6 +96,38 @@ class TaskWorkerBase(object):
         else:
             self.WORKERNAME = name
 
+        self.ns = None
+        if dispatcher is None:
+            self._dispatcher_uri = self._find_dispatcher(
+                group, host, port, num_dispatcher_tries, caller_name)
+        else:
+            assert port is None
+            assert host is None
+            self.dispatcher = dispatcher
+            if not self.dispatcher.register_worker(self.WORKERNAME):
+                raise RuntimeError("Worker %s could not register with the "
+                                   "assigned dispatcher" % (self.WORKERNAME,))
+            # A local (in-process) Dispatcher object has no URI
+            if using_pyro4 and hasattr(dispatcher, '_pyroUri'):
+                self._dispatcher_uri = dispatcher._pyroUri
+            else:
+                self._dispatcher_uri = getattr(dispatcher, 'URI', None)
+            print("Worker %s assigned dispatcher with URI=%s" %
+                  (self.WORKERNAME, self._dispatcher_uri))
+
+        # When heartbeats are enabled, the worker identifies itself when
+        # requesting tasks (so a dispatcher with a lease_timeout can
+        # requeue them if this worker dies) and a background thread
+        # periodically renews the leases.
+        self._heartbeat_interval = heartbeat_interval
+        self._heartbeat_stop = threading.Event()
+        if heartbeat_interval is not None:
+            th = threading.Thread(target=self._heartbeat)
+            th.daemon = True
+            th.start()
+
+    def _find_dispatcher(self, group, host, port, num_dispatcher_tries,
+                         caller_name):
         self.ns = get_nameserver(host=host, port=port, caller_name=caller_name)
         if self.ns is None:
             raise RuntimeError("TaskWorkerBase failed to locate "
@@ -135,15 +189,87 @@ class TaskWorkerBase(object):
         # Do not release the connection to the dispatcher
         # We use this functionality to distribute workers across
         # multiple dispatchers based off of denied connections
+        return URI
+
+    def _thread_dispatcher(self):
+        """
+        Return a dispatcher proxy for use by a background thread (Pyro
+        proxies may not be shared across threads).  Release it with
+        _release_thread_dispatcher().
+        """
+        if self._dispatcher_uri is None:
+            return self.dispatcher
+        if using_pyro3:
+            return _pyro.core.getProxyForURI(self._dispatcher_uri)
+        else:
+            return _pyro.Proxy(self._dispatcher_uri)
+
+    def _release_thread_dispatcher(self, dispatcher):
+        if dispatcher is self.dispatcher:
+            return
+        if using_pyro4:
+            dispatcher._pyroRelease()
+        else:
+            dispatcher._release()
+
+    def _heartbeat(self):
+        dispatcher = self._thread_dispatcher()
+        try:
+            while not self._heartbeat_stop.wait(self._heartbeat_interval):
+                try:
+                    dispatcher.heartbeat(self.WORKERNAME)
+                except _worker_connection_problem:
+                    pass
+        finally:
+            self._release_thread_dispatcher(dispatcher)
 
     def close(self):
-        if self.dispatcher is not None:
-            self.dispatcher.unregister_worker(self.WORKERNAME)
+        # The worker may be closed more than once (e.g., by run() and by
+        # TaskWorkerServer after an error), but it is only unregistered
+        # once
+        self._heartbeat_stop.set()
+        dispatcher = self.dispatcher
+        if dispatcher is None:
+            return
+        self.dispatcher = None
+        dispatcher.unregister_worker(self.WORKERNAME)
+        if self._dispatcher_uri is not None:
             if using_pyro4:
-                self.dispatcher._pyroRelease()
+                dispatcher._pyroRelease()
             else:
-                self.dispatcher._release()
-        self.dispather = None
+                dispatcher._release()
+
+    def _get_tasks(self, type_block_timeout_list, dispatcher=None):
+        if dispatcher is None:
+            dispatcher = self.dispatcher
+        kwds = {}
+        if self._bulk_task_limit is not None:
+            kwds['max_tasks'] = self._bulk_task_limit
+        if self._heartbeat_interval is not None:
+            kwds['worker_name'] = self.WORKERNAME
+        return dispatcher.get_tasks(type_block_timeout_list, **kwds)
+
+    def _get_task(self, type, block, timeout, dispatcher=None):
+        if dispatcher is None:
+            dispatcher = self.dispatcher
+        if self._heartbeat_interval is None:
+            return dispatcher.get_task(
+                type=type, block=block, timeout=timeout)
+        return dispatcher.get_task(
+            type=type, block=block, timeout=timeout,
+            worker_name=self.WORKERNAME)
+
+    def _process_task(self, task):
+        if task.get('serialized', False):
+            serializer = self._serializer
+            if serializer is None:
+                serializer = PayloadSerializer.for_payload(task['data'])
+            task['result'] = serializer.dumps(
+                self.process(serializer.loads(task['data'])))
+        else:
+            task['result'] = self.process(task['data'])
+        if not task.get('return_data', True):
+            task['data'] = None
 
     def run(self):
         raise NotImplementedError       #pragma:nocover
@@ -159,91 +285,232 @@ class TaskWorker(TaskWorkerBase):
         # ids are contiguous and process them as such
         self._contiguous_task_processing = False
         self._next_processing_id = None
+        # The number of task batches that a background thread may
+        # collect from the dispatcher ahead of the batch currently
+        # being processed.  When this is positive, results are also
+        # posted to the dispatcher by a background thread, so the
+        # worker does not wait on the dispatcher between batches.
+        self._prefetch_depth = kwds.pop('prefetch_depth', 0)
+        if self._prefetch_depth < 0:
+            raise ValueError("prefetch_depth must be a nonnegative integer")
         TaskWorkerBase.__init__(self, *args, **kwds)
 
+    def _collect_tasks(self, dispatcher):
+        if self._bulk_task_collection:
+            tasks_ = self._get_tasks(((self.type, self.block, self.timeout),),
+                                     dispatcher=dispatcher)
+            assert len(tasks_) == 1
+            assert self.type in tasks_
+            tasks = tasks_[self.type]
+        else:
+            task = self._get_task(self.type, self.block, self.timeout,
+                                  dispatcher=dispatcher)
+            tasks = () if task is None else (task,)
+        assert tasks is not None
+        return tasks
+
+    def _report_connection_problem(self, e):
+        # this can happen if the dispatcher is overloaded
+        print("***WARNING: Connection to dispatcher server "
+              "denied\n - exception type: " + str(type(e)) +
+              "\n - message: " + str(e))
+        print("A potential remedy may be to increase "
+              "PYUTILIB_PYRO_MAXCONNECTIONS in your shell "
+              "environment.")
+        # sleep for a bit longer than normal, for obvious reasons
+        sleep_interval = random.uniform(0.05, 0.15)
+        time.sleep(sleep_interval)
+
+    def _process_tasks(self, tasks):
+        """
+        Process a batch of tasks and return the results that should be
+        sent to the dispatcher, or None if the worker was shut down.
+        """
+        self._worker_error = False
+        self._worker_shutdown = False
+        if self._verbose:
+            print("Collected %s task(s) from queue %s" %
+                  (len(tasks), self.type))
+        results = {}
+        # process tasks in order of increasing id
+        for task in sorted(tasks, key=lambda x: x['id']):
+            if self._verbose:
+                print("Processing task with id=%s from queue %s" %
+                      (task['id'], self.type))
+            if self._contiguous_task_processing:
+                # TODO: add code to skip tasks until the next contiguous
+                #       task arrives
+                if self._next_processing_id is None:
+                    self._next_processing_id = task['id']
+                if self._next_processing_id != task['id']:
+                    raise RuntimeError("Got task with id=%s, expected id=%s"
+                                       % (task['id'], self._next_processing_id))
+                self._next_processing_id += 1
+            self._worker_task_return_queue = \
+                _worker_task_return_queue_unset
+            self._current_task_client = task['client']
+            self._process_task(task)
+            task['processedBy'] = self.WORKERNAME
+            return_type_name = self._worker_task_return_queue
+            if return_type_name is _worker_task_return_queue_unset:
+                return_type_name = self.type
+            if self._worker_error:
+                if return_type_name not in results:
+                    results[return_type_name] = []
+                task['processedBy'] = self.WORKERNAME
+                results[return_type_name].append(task)
+                print(
+                    "Task worker reported error during processing "
+                    "of task with id=%s. Any remaining tasks in "
+                    "local queue will be ignored." %
+                    (task['id']))
+                break
+            if self._worker_shutdown:
+                return None
+            if task['generateResponse']:
+                if return_type_name not in results:
+                    results[return_type_name] = []
+                results[return_type_name].append(task)
+
+            if self._worker_error:
+                break
+        return results
+
     def run(self):
 
         print("Listening for work from dispatcher...")
 
+        if self._prefetch_depth:
+            return self._run_pipelined()
+
         while 1:
-            self._worker_error = False
-            self._worker_shutdown = False
             try:
-                tasks = None
-                if self._bulk_task_collection:
-                    tasks_ = self.dispatcher.get_tasks(
-                        ((self.type, self.block, self.timeout),))
-                    assert len(tasks_) == 1
-                    assert self.type in tasks_
-                    tasks = tasks_[self.type]
-                else:
-                    tasks = (self.dispatcher.get_task(
-                        type=self.type, block=self.block, timeout=self.timeout),)
-                assert tasks is not None
+                tasks = self._collect_tasks(self.dispatcher)
             except _worker_connection_problem as e:
-                x = sys.exc_info()[1]
-                # this can happen if the dispatcher is overloaded
-                print("***WARNING: Connection to dispatcher server "
-                      "denied\n - exception type: " + str(type(e)) +
-                      "\n - message: " + str(x))
-                print("A potential remedy may be to increase "
-                      "PYUTILIB_PYRO_MAXCONNECTIONS in your shell "
-                      "environment.")
-                # sleep for a bit longer than normal, for obvious reasons
-                sleep_interval = random.uniform(0.05, 0.15)
-                time.sleep(sleep_interval)
+                self._report_connection_problem(e)
             else:
                 if len(tasks) > 0:
-                    if self._verbose:
-                        print("Collected %s task(s) from queue %s" %
-                              (len(tasks), self.type))
-                    results = {}
-                    # process tasks in order of increasing id
-                    for task in sorted(tasks, key=lambda x: x['id']):
-                        if self._verbose:
-                            print("Processing task with id=%s from queue %s" %
-                                  (task['id'], self.type))
-                        if self._contiguous_task_processing:
-                            # TODO: add code to skip tasks until the next contiguous
-                            #       task arrives
-                            if self._next_processing_id is None:
-                                self._next_processing_id = task['id']
-                            if self._next_processing_id != task['id']:
-                                raise RuntimeError("Got task with id=%s, expected id=%s"
-                                                   % (task['id'], self._next_processing_id))
-                            self._next_processing_id += 1
-                        self._worker_task_return_queue = \
-                            _worker_task_return_queue_unset
-                        self._current_task_client = task['client']
-                        task['result'] = self.process(task['data'])
-                        task['processedBy'] = self.WORKERNAME
-                        return_type_name = self._worker_task_return_queue
-                        if return_type_name is _worker_task_return_queue_unset:
-                            return_type_name = self.type
-                        if self._worker_error:
-                            if return_type_name not in results:
-                                results[return_type_name] = []
-                            task['processedBy'] = self.WORKERNAME
-                            results[return_type_name].append(task)
-                            print(
-                                "Task worker reported error during processing "
-                                "of task with id=%s. Any remaining tasks in "
-                                "local queue will be ignored." %
-                                (task['id']))
-                            break
-                        if self._worker_shutdown:
-                            self.close()
-                            return
-                        if task['generateResponse']:
-                            if return_type_name not in results:
-                                results[return_type_name] = []
-                            results[return_type_name].append(task)
+                    results = self._process_tasks(tasks)
+                    if results is None:
+                        self.close()
+                        return
+                    if len(results):
+                        self.dispatcher.add_results(results)
 
-                        if self._worker_error:
-                            break
+    def _run_pipelined(self):
+        #
+        # A fetcher thread keeps up to _prefetch_depth batches of tasks
+        # waiting in the inbox, and a poster thread sends results from
+        # the outbox to the dispatcher.  Each thread uses its own
+        # dispatcher proxy.  The main thread only processes tasks.
+        #
+        inbox = Queue.Queue()
+        outbox = Queue.Queue()
+        slots = threading.Semaphore(self._prefetch_depth)
+        stop = threading.Event()
+        inbox_lock = threading.Lock()
+        post_errors = []
+
+        def fetch():
+            dispatcher = self._thread_dispatcher()
+            unprocessed = []
+            try:
+                while not stop.is_set():
+                    slots.acquire()
+                    if stop.is_set():
+                        break
+                    try:
+                        tasks = self._collect_tasks(dispatcher)
+                    except _worker_connection_problem as e:
+                        slots.release()
+                        self._report_connection_problem(e)
+                        continue
+                    if len(tasks) == 0:
+                        slots.release()
+                        continue
+                    with inbox_lock:
+                        if stop.is_set():
+                            unprocessed.extend(tasks)
+                        else:
+                            inbox.put((tasks, None))
+                if unprocessed:
+                    self._return_tasks(dispatcher, unprocessed)
+            except Exception as e:
+                inbox.put((None, e))
+            finally:
+                self._release_thread_dispatcher(dispatcher)
+
+        def post():
+            dispatcher = self._thread_dispatcher()
+            try:
+                while 1:
+                    results = outbox.get()
+                    if results is None:
+                        break
+                    try:
+                        dispatcher.add_results(results)
+                    except Exception as e:
+                        post_errors.append(e)
+                        break
+            finally:
+                self._release_thread_dispatcher(dispatcher)
 
+        fetcher = threading.Thread(target=fetch)
+        fetcher.daemon = True
+        poster = threading.Thread(target=post)
+        poster.daemon = True
+        fetcher.start()
+        poster.start()
+
+        try:
+            try:
+                while 1:
+                    tasks, error = inbox.get()
+                    if error is not None:
+                        raise error
+                    # Let the fetcher start on the next batch before
+                    # this one is processed
+                    slots.release()
+                    results = self._process_tasks(tasks)
+                    if results is None:
+                        break
                     if len(results):
-                        self.dispatcher.add_results(results)
+                        outbox.put(results)
+                    if post_errors:
+                        raise post_errors[0]
+            finally:
+                with inbox_lock:
+                    stop.set()
+                slots.release()
+                outbox.put(None)
+                poster.join()
+            if post_errors:
+                raise post_errors[0]
+        finally:
+            #
+            # Tasks collected by the fetcher that will not be processed
+            # are returned to the dispatcher (a batch that the fetcher
+            # receives after this point is returned by the fetcher
+            # itself).  This is also done if process() raised an
+            # exception.
+            #
+            unprocessed = []
+            while not inbox.empty():
+                tasks, error = inbox.get()
+                if tasks is not None:
+                    unprocessed.extend(tasks)
+            try:
+                if unprocessed:
+                    self._return_tasks(self.dispatcher, unprocessed)
+            finally:
+                self.close()
+
+    def _return_tasks(self, dispatcher, tasks):
+        # If heartbeats are enabled, the tasks are leased to this worker
+        # and are requeued by the dispatcher when the worker unregisters.
+        if self._heartbeat_interval is None:
+            dispatcher.add_tasks({self.type: list(tasks)})
+
 
 class MultiTaskWorker(TaskWorkerBase):
 
@@ -324,7 +591,7 @@ class MultiTaskWorker(TaskWorkerBase):
             self._worker_error = False
             self._worker_shutdown = False
             try:
-                tasks = self.dispatcher.get_tasks(self.current_type_order())
+                tasks = self._get_tasks(self.current_type_order())
             except _worker_connection_problem as e:
                 x = sys.exc_info()[1]
                 # this can happen if the dispatcher is overloaded
@@ -354,7 +621,7 @@ class MultiTaskWorker(TaskWorkerBase):
                             self._worker_task_return_queue = \
                                 _worker_task_return_queue_unset
                             self._current_task_client = task['client']
-                            task['result'] = self.process(task['data'])
+                            self._process_task(task)
                             task['processedBy'] = self.WORKERNAME
                             return_type_name = self._worker_task_return_queue
                             if return_type_name is _worker_task_return_queue_unset:
@@ -11,4 +11,5 @@ debug = False
 current_process = None
 signal_handler_busy = None
 DEFINE_SIGNAL_HANDLERS_DEFAULT = True
+READ_CHUNKSIZE_DEFAULT = 65536
 original_signal_handlers = {}
@@ -8,9 +8,14 @@
 #  _________________________________________________________________________
 #
 
+import sys
+
 from pyutilib.component.core import PluginGlobals
 PluginGlobals.add_env("pyutilib")
 
-from pyutilib.subprocess.processmngr import subprocess, SubprocessMngr, run_command, timer, signal_handler, run, PIPE, STDOUT
+from pyutilib.subprocess.processmngr import subprocess, SubprocessMngr, run_command, timer, signal_handler, run, PIPE, STDOUT, CommandResult
+from pyutilib.subprocess.processpool import ProcessPool, run_commands
+if sys.version_info[0:2] >= (3, 5):
+    from pyutilib.subprocess.async_processmngr import run_command_async, run_async
 
 PluginGlobals.pop_env()
@@ -0,0 +1,202 @@
+#  _________________________________________________________________________
+#
+#  PyUtilib: A Python utility library.
+#  Copyright (c) 2008 Sandia Corporation.
+#  This software is distributed under the BSD License.
+#  Under the terms of Contract DE-AC04-94AL85000 with Sandia Corporation,
+#  the U.S. Government retains certain rights in this software.
+#  _________________________________________________________________________
+#
+# An asyncio front-end to run_command().  This module uses the
+# async/await syntax, and is only imported on Python 3.5+.
+#
+
+__all__ = ['run_command_async', 'run_async']
+
+import asyncio
+import io
+import os
+import sys
+
+from pyutilib.subprocess import GlobalData
+from pyutilib.subprocess.processmngr import (
+    _build_command, _reader_encoding, _StreamData, _report_unwritten_output,
+    _mswindows, kill_process, bytes_cast, timer, CommandResult, PIPE, STDOUT)
+
+
+async def _pump(stream, data):
+    # Forward the output of one subprocess pipe to its target streams
+    chunksize = GlobalData.READ_CHUNKSIZE_DEFAULT
+    while True:
+        new_data = await stream.read(chunksize)
+        if not new_data:
+            break
+        data.process(new_data)
+    return data.finish()
+
+
+def _kill(process):
+    try:
+        kill_process(process)
+    except OSError:
+        # The process terminated before we could kill it
+        pass
+
+
+async def _feed(stream, stdin):
+    try:
+        stream.write(bytes_cast(stdin))
+        await stream.drain()
+    except (BrokenPipeError, ConnectionResetError):
+        # The child exited without reading all of its input
+        pass
+    stream.close()
+
+
+async def run_command_async(cmd,
+                            outfile=None,
+                            cwd=None,
+                            ostream=None,
+                            stdin=None,
+                            valgrind=False,
+                            valgrind_log=None,
+                            valgrind_options=None,
+                            memmon=False,
+                            env=None,
+                            debug=False,
+                            timelimit=None,
+                            tee=None,
+                            ignore_output=False,
+                            shell=False):
+    """
+    A coroutine that executes a command and returns a [returncode,
+    output] CommandResult.
+
+    This accepts the same options as run_command(), except for those
+    that manage threads or signal handlers.  The subprocess output is
+    read through the event loop's subprocess transport, so no reader
+    threads are created.  If the timelimit expires, the subprocess (and
+    its children) are killed and the returncode is -1.  If the
+    coroutine is cancelled, the subprocess is killed before the
+    CancelledError is propagated.
+    """
+    _cmd = _build_command(cmd, memmon, valgrind, valgrind_log,
+                          valgrind_options)
+    if timelimit is not None and timelimit <= 0:
+        raise ValueError("'timeout' must be a positive number")
+    #
+    # Set up the output targets
+    #
+    tmpbuf = None
+    close_ostream = False
+    if ostream is not None:
+        if outfile is not None:
+            raise ValueError("subprocess.run_command_async(): ostream and "
+                             "outfile options are mutually exclusive")
+        output = "Output printed to specified ostream"
+    elif outfile is not None:
+        ostream = open(outfile, "w")
+        close_ostream = True
+        output = "Output printed to file '%s'" % outfile
+    else:
+        ostream = tmpbuf = io.StringIO()
+        output = ""
+
+    tee_fid = []
+    for fid in (0, 1):
+        try:
+            tee_fid.append(tee[fid])
+        except:
+            tee_fid.append(tee)
+    #
+    # If there is no tee and the target is a real file, the child can
+    # write to it directly.
+    #
+    direct = None
+    if not any(tee_fid) and tmpbuf is None:
+        try:
+            ostream.fileno()
+            ostream.flush()
+            direct = ostream
+        except:
+            pass
+
+    if env is None:
+        env = os.environ.copy()
+    kwds = {
+        'stdin': None if stdin is None else PIPE,
+        'stdout': PIPE if direct is None else direct,
+        'stderr': PIPE if direct is None else STDOUT,
+        'cwd': cwd,
+        'env': env,
+    }
+    if not _mswindows:
+        # Equivalent to the preexec_fn=os.setsid used by SubprocessMngr
+        kwds['start_new_session'] = True
+    if debug:
+        print("Executing command %s" % (_cmd,))
+
+    rc = -1
+    start_time = timer()
+    try:
+        if shell:
+            if _mswindows:
+                import subprocess
+                process = await asyncio.create_subprocess_shell(
+                    subprocess.list2cmdline(_cmd), **kwds)
+            else:
+                process = await asyncio.create_subprocess_exec(
+                    '/bin/sh', '-c', *_cmd, **kwds)
+        else:
+            process = await asyncio.create_subprocess_exec(*_cmd, **kwds)
+
+        tasks = []
+        if direct is None:
+            raw_stderr, encoding = _reader_encoding()
+            for fid, stream, raw in ((0, process.stdout, sys.stdout),
+                                     (1, process.stderr, sys.stderr)):
+                targets = (raw if tee_fid[fid] else None, ostream)
+                tasks.append(asyncio.ensure_future(_pump(
+                    stream, _StreamData(fid, stream, targets, encoding))))
+        if stdin is not None:
+            tasks.append(asyncio.ensure_future(_feed(process.stdin, stdin)))
+
+        try:
+            if timelimit is None:
+                rc = await process.wait()
+            else:
+                try:
+                    rc = await asyncio.wait_for(
+                        asyncio.shield(process.wait()), timelimit)
+                except asyncio.TimeoutError:
+                    if process.returncode is None:
+                        _kill(process)
+                        await process.wait()
+                        rc = -1
+                    else:
+                        rc = process.returncode
+            results = await asyncio.gather(*tasks)
+        except asyncio.CancelledError:
+            if process.returncode is None:
+                _kill(process)
+            for task in tasks:
+                task.cancel()
+            raise
+
+        if direct is None:
+            for writeOK, buf, data in results[:2]:
+                if not writeOK:
+                    _report_unwritten_output(raw_stderr, buf, data)
+    finally:
+        walltime = timer() - start_time
+        if close_ostream:
+            ostream.close()
+
+    if tmpbuf is not None and not ignore_output:
+        output = tmpbuf.getvalue()
+    # The event loop reaps the child, so only the walltime is recorded
+    return CommandResult(rc, output, walltime=walltime)
+
+
+# Create an alias for run_command_async
+run_async = run_command_async
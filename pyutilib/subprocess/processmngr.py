@@ -8,7 +8,7 @@
 #  _________________________________________________________________________
 
 __all__ = ['subprocess', 'SubprocessMngr', 'run_command', 'timer',
-           'signal_handler', 'run', 'PIPE', 'STDOUT']
+           'signal_handler', 'run', 'PIPE', 'STDOUT', 'CommandResult']
 
 from pyutilib.subprocess import GlobalData
 import time
@@ -17,8 +17,10 @@ import os
 import sys
 import tempfile
 import subprocess
+import codecs
+import errno
 from six import itervalues
-from threading import Thread
+from threading import Thread, Event
 
 _mswindows = sys.platform.startswith('win')
 
@@ -49,6 +51,18 @@ try:
 except:
     _peek_available = False
 
+try:
+    import resource
+    _wait4_available = hasattr(os, 'wait4')
+    # ru_maxrss is reported in bytes on OSX and in kilobytes elsewhere
+    _maxrss_units = 1 if sys.platform == 'darwin' else 1024
+except ImportError:
+    _wait4_available = False
+
+_proc_available = sys.platform.startswith('linux') and os.path.isdir('/proc')
+if _proc_available:
+    _page_size = os.sysconf('SC_PAGE_SIZE')
+
 import pyutilib.services
 from pyutilib.common import ApplicationError
 from pyutilib.misc import quote_split
@@ -128,6 +142,139 @@ def kill_process(process, sig=signal.SIGTERM, verbose=False):
             GlobalData.current_process._child_created = False
 
 
+def _returncode(sts):
+    """
+    Convert a wait() status into a returncode (as done by subprocess.Popen)
+    """
+    if os.WIFSIGNALED(sts):
+        return -os.WTERMSIG(sts)
+    elif os.WIFEXITED(sts):
+        return os.WEXITSTATUS(sts)
+    return sts
+
+
+def _reap(process, block=True):
+    """
+    Wait for a subprocess.Popen process to terminate and return the
+    tuple (returncode, rusage).  The returncode is None if block is
+    False and the process is still running.  When os.wait4() is
+    available, the process is reaped here so that its resource usage
+    (including that of its terminated children) can be recorded;
+    otherwise rusage is None.
+    """
+    if process.returncode is not None or not _wait4_available:
+        if block:
+            return process.wait(), None
+        return process.poll(), None
+    try:
+        pid, sts, rusage = os.wait4(process.pid, 0 if block else os.WNOHANG)
+    except OSError:
+        if sys.exc_info()[1].errno != errno.ECHILD:
+            raise
+        # Someone else (e.g., the signal handler) reaped the process
+        return process.poll(), None
+    if pid == 0:
+        return None, None
+    process.returncode = _returncode(sts)
+    return process.returncode, rusage
+
+
+def _group_rss(pgid):
+    """
+    Return the total resident set size (in bytes) of all processes in
+    the process group pgid, as reported by /proc.
+    """
+    rss = 0
+    for pid in os.listdir('/proc'):
+        if not pid.isdigit():
+            continue
+        try:
+            with open('/proc/%s/stat' % pid, 'rb') as STAT:
+                stat = STAT.read()
+        except (IOError, OSError):
+            # The process terminated
+            continue
+        # The command name may contain spaces; skip past it
+        fields = stat[stat.rfind(b')') + 2:].split()
+        if int(fields[2]) == pgid:
+            rss += int(fields[21]) * _page_size
+    return rss
+
+
+class _MemorySampler(object):
+    """
+    Periodically record the resident set size of a subprocess and its
+    children (i.e., its process group) in a background thread.
+    """
+
+    def __init__(self, pid, interval):
+        self.pid = pid
+        self.interval = interval
+        self.samples = []
+        self._stop = Event()
+        self._start = timer()
+        self._thread = Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            self.samples.append((timer() - self._start,
+                                 _group_rss(self.pid)))
+            if self._stop.wait(self.interval):
+                break
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        return self.samples
+
+
+class CommandResult(list):
+    """
+    The [returncode, output] list returned by run_command(), annotated
+    with the resources used by the subprocess:
+
+        walltime        elapsed time (seconds)
+        user_time       user CPU time (seconds)
+        system_time     system CPU time (seconds)
+        max_rss         peak resident set size (bytes)
+        memory_samples  list of (time, rss) tuples sampled during the run
+
+    The CPU times and peak RSS are None on platforms without os.wait4();
+    the peak RSS accounts for the largest process in the subprocess tree,
+    or the largest sampled total of the tree, whichever is greater.
+    """
+
+    def __init__(self,
+                 returncode,
+                 output,
+                 walltime=None,
+                 rusage=None,
+                 memory_samples=None):
+        super(CommandResult, self).__init__((returncode, output))
+        self.walltime = walltime
+        if rusage is None:
+            self.user_time = self.system_time = self.max_rss = None
+        else:
+            self.user_time = rusage.ru_utime
+            self.system_time = rusage.ru_stime
+            self.max_rss = rusage.ru_maxrss * _maxrss_units
+        self.memory_samples = memory_samples if memory_samples else []
+        if self.memory_samples:
+            peak = max(x[1] for x in self.memory_samples)
+            if self.max_rss is None or peak > self.max_rss:
+                self.max_rss = peak
+
+    @property
+    def returncode(self):
+        return self[0]
+
+    @property
+    def output(self):
+        return self[1]
+
+
 GlobalData.current_process = None
 GlobalData.pid = None
 GlobalData.signal_handler_busy = False
@@ -191,32 +338,15 @@ def signal_handler(signum, frame, verbose=False):
     raise OSError("Interrupted by signal " + repr(signum))
 
 
-#
-# A function used to read in data from a shell command, and push it into a pipe.
-#
-def _stream_reader(args):
-    unbuffer = args[0]
-    stream = args[1]
-    output = tuple(x for x in args[2:] if x is not None)
-
-    def write(x):
-        success = True
-        for s in output:
-            try:
-                s.write(x)
-            except ValueError:
-                success = False
-        return success
-
-    def flush():
-        for s in output:
-            try:
-                s.flush()
-            except ValueError:
-                pass
-
+def _reader_encoding(stream=None):
+    """
+    Determine the encoding used to decode subprocess output
+    """
     raw_stderr = sys.__stderr__
     if raw_stderr is None:
+        # There are cases, e.g., in Anaconda, where there is no stdout
+        # for the original process because, for example, it was started
+        # in a windowing environment.
         raw_stderr = sys.stderr
     try:
         encoding = stream.encoding
@@ -229,54 +359,131 @@ def _stream_reader(args):
             pass
     if encoding is None:
         encoding = 'utf-8'
+    return raw_stderr, encoding
 
-    buf = ""
-    data = None
 
-    while True:
-        new_data = os.read(stream, 1)
-        if not new_data:
-            break
-        if data:
-            data += new_data
-        else:
-            data = new_data
-        char = data.decode(encoding)
-        if char.encode(encoding) != data:
-            continue
-        data = ""
-        if unbuffer == 1:
-            writeOK = write(char)
-        buf += char
-        if char[-1] != "\n":
-            continue
-        if unbuffer:
-            if unbuffer != 1:
-                writeOK = write(buf)
-            flush()
+#
+# The state for a single subprocess output stream.  Raw data is read
+# from the stream in chunks and passed through an incremental decoder,
+# so multi-byte characters that straddle a chunk boundary are handled
+# without re-decoding the accumulated data.  Decoded text is forwarded
+# to the output streams according to the 'unbuffer' flag:
+#
+#   0: only complete lines are written
+#   1: text is written as soon as it is read, and the output streams
+#      are flushed after every newline
+#   2: only complete lines are written, and the output streams are
+#      flushed after every write
+#
+# When a chunk contains several lines, all complete lines are sent to
+# the output streams in a single write() call.  This preserves line
+# integrity (no partial lines are interleaved with output from another
+# stream), while avoiding a write per character.
+#
+class _StreamData(object):
+    __slots__ = ('read', 'output', 'unbuffer', 'buf', 'encoding', 'decoder')
+
+    def __init__(self, unbuffer, read, output, encoding):
+        self.read = read
+        self.unbuffer = unbuffer
+        self.output = tuple(x for x in output if x is not None)
+        self.buf = []
+        self.encoding = encoding
+        self.decoder = codecs.getincrementaldecoder(encoding)()
+
+    def write(self, x):
+        success = True
+        for s in self.output:
+            try:
+                s.write(x)
+            except ValueError:
+                success = False
+        return success
+
+    def flush(self):
+        for s in self.output:
+            try:
+                s.flush()
+            except ValueError:
+                pass
+
+    def process(self, data):
+        text = self.decoder.decode(data)
+        if not text:
+            return
+        if self.unbuffer == 1:
+            writeOK = self.write(text)
+        eol = text.rfind("\n")
+        if eol < 0:
+            self.buf.append(text)
+            return
+        if self.unbuffer == 1:
+            self.flush()
         else:
-            writeOK = write(buf)
+            self.buf.append(text[:eol + 1])
+            writeOK = self.write("".join(self.buf))
+            if self.unbuffer:
+                self.flush()
         if writeOK:
-            buf = ""
-    writeOK = True
-    if buf:
-        writeOK &= write(buf)
-    if data:
-        writeOK &= write(data.decode(encoding))
-    flush()
-    if not writeOK and raw_stderr is not None:
-        raw_stderr.write("""
+            self.buf = [text[eol + 1:]] if eol + 1 < len(text) else []
+        else:
+            if self.unbuffer == 1:
+                self.buf.append(text)
+            else:
+                self.buf.append(text[eol + 1:])
+
+    def finish(self):
+        """
+        Write any remaining (partial line) output and return the tuple
+        (success, unwritten_text, undecoded_bytes).  Note that when
+        unbuffer == 1, the partial line has already been written.
+        """
+        data = self.decoder.getstate()[0]
+        self.decoder.reset()
+        buf = "".join(self.buf)
+        writeOK = True
+        if buf and self.unbuffer != 1:
+            writeOK &= self.write(buf)
+        if data:
+            writeOK &= self.write(data.decode(self.encoding, 'replace'))
+        self.flush()
+        return writeOK, buf, data
+
+
+def _report_unwritten_output(raw_stderr, buf, data):
+    if raw_stderr is None:
+        return
+    raw_stderr.write("""
 ERROR: pyutilib.subprocess: output stream closed before all subprocess output
        was written to it.  The following was left in the subprocess buffer:
             '%s'
 """ % (buf,))
-        if data:
-            raw_stderr.write(
-                """The following undecoded unicode output was also present:
+    if data:
+        raw_stderr.write(
+            """The following undecoded unicode output was also present:
             '%s'
 """ % (data,))
 
 
+#
+# A function used to read in data from a shell command, and push it into a pipe.
+#
+def _stream_reader(args, chunksize=None):
+    if chunksize is None:
+        chunksize = GlobalData.READ_CHUNKSIZE_DEFAULT
+    raw_stderr, encoding = _reader_encoding(args[1])
+    s = _StreamData(args[0], args[1], args[2:], encoding)
+
+    while True:
+        new_data = os.read(s.read, chunksize)
+        if not new_data:
+            break
+        s.process(new_data)
+    writeOK, buf, data = s.finish()
+    if not writeOK:
+        _report_unwritten_output(raw_stderr, buf, data)
+
+
 #
 # A function used to read in data from two independent streams and push
 # each to 1+ output pipes.  Managing this in a single thread allows our
@@ -288,58 +495,22 @@ ERROR: pyutilib.subprocess: output stream closed before all subprocess output
 # For platforms that do not support select / peek, see the
 # _pseudo_merged_reader.
 #
-def _merged_reader(*args):
-
-    class StreamData(object):
-        __slots__ = ('read', 'output', 'unbuffer', 'buf', 'data')
-
-        def __init__(self, *args):
-            if _mswindows:
-                self.read = get_osfhandle(args[1])
-            else:
-                self.read = args[1]
-            self.unbuffer = args[0]
-            self.output = tuple(x for x in args[2:] if x is not None)
-            self.buf = ""
-            self.data = None
-
-        def write(self, x):
-            success = True
-            for s in self.output:
-                try:
-                    s.write(x)
-                except ValueError:
-                    success = False
-            return success
-
-        def flush(self):
-            for s in self.output:
-                try:
-                    s.flush()
-                except ValueError:
-                    pass
-
-    raw_stderr = sys.__stderr__
-    if raw_stderr is None:
-        # There are cases, e.g., in Anaconda, where there is no stdout
-        # for the original process because, for example, it was started
-        # in a windowing environment.
-        raw_stderr = sys.stderr
-    try:
-        encoding = stream.encoding
-    except:
-        encoding = None
-    if encoding is None:
-        try:
-            encoding = raw_stderr.encoding
-        except:
-            pass
-    if encoding is None:
-        encoding = 'utf-8'
+def _merged_reader(*args, **kwds):
+    chunksize = kwds.pop('chunksize', None)
+    if kwds:
+        raise ValueError("Unexpected keyword arguments: %s"
+                         % (', '.join(sorted(kwds)),))
+    if chunksize is None:
+        chunksize = GlobalData.READ_CHUNKSIZE_DEFAULT
+    raw_stderr, encoding = _reader_encoding()
 
     streams = {}
     for s in args:
-        tmp = StreamData(*s)
+        if _mswindows:
+            read = get_osfhandle(s[1])
+        else:
+            read = s[1]
+        tmp = _StreamData(s[0], read, s[2:], encoding)
         streams[tmp.read] = tmp
 
     handles = sorted(streams.keys(), key=lambda x: -1 * streams[x].unbuffer)
@@ -353,10 +524,12 @@ def _merged_reader(*args):
                     numAvail = PeekNamedPipe(h, 0)[1]
                     if numAvail == 0:
                         continue
-                    result, new_data = ReadFile(h, 1, None)
+                    result, new_data = ReadFile(
+                        h, min(numAvail, chunksize), None)
                 except:
                     handles.remove(h)
                     new_data = None
+                break
             if new_data is None:
                 continue
         else:
@@ -364,48 +537,21 @@ def _merged_reader(*args):
             if not h:
                 break
             h = h[0]
-            new_data = os.read(h, 1)
+            new_data = os.read(h, chunksize)
             if not new_data:
                 handles.remove(h)
                 continue
-        s = streams[h]
-        if s.data is None:
-            s.data = new_data
-        else:
-            s.data += new_data
-        char = s.data.decode(encoding)
-        if char.encode(encoding) != s.data:
-            continue
-        s.data = None
-        if s.unbuffer:
-            writeOK = s.write(char)
-        s.buf += char
-        if char[-1] != "\n":
-            continue
-        if s.unbuffer:
-            s.flush()
-        else:
-            writeOK = s.write(s.buf)
-        if writeOK:
-            s.buf = ""
+        streams[h].process(new_data)
     writeOK = True
+    unwritten = []
     for s in itervalues(streams):
-        if s.buf:
-            writeOK &= s.write(s.buf)
-        if s.data:
-            writeOK &= s.write(s.data.decode(encoding))
-        s.flush()
-    if not writeOK and raw_stderr is not None:
-        raw_stderr.write("""
-ERROR: pyutilib.subprocess: output stream closed before all subprocess output
-       was written to it.  The following was left in the subprocess buffer:
-            '%s'
-""" % (buf,))
-        if data:
-            raw_stderr.write(
-                """The following undecoded unicode output was also present:
-            '%s'
-""" % (data,))
+        _ok, buf, data = s.finish()
+        if not _ok:
+            writeOK = False
+            unwritten.append((buf, data))
+    if not writeOK:
+        for buf, data in unwritten:
+            _report_unwritten_output(raw_stderr, buf, data)
 
 
 #
@@ -415,10 +561,12 @@ ERROR: pyutilib.subprocess: output stream closed before all subprocess output
 # nondeterministic).  However, it does change the flushing rules to
 # better maintain output line integrity (at the cost of performance).
 #
-def _pseudo_merged_reader(*args):
+def _pseudo_merged_reader(*args, **kwds):
     _threads = []
     for arg in args:
-        _threads.append(Thread(target=_stream_reader, args=((2,) + arg[1:],)))
+        _threads.append(Thread(target=_stream_reader,
+                               args=((2,) + arg[1:],),
+                               kwargs=kwds))
         _threads[-1].daemon = True
         _threads[-1].start()
     for th in _threads:
@@ -426,42 +574,14 @@ def _pseudo_merged_reader(*args):
 
 
 #
-# Execute the command as a subprocess that we can send signals to.
-# After this is finished, we can get the output from this command from
-# the process.stdout file descriptor.
+# Convert a command into execve form, prefixing it with the memmon
+# and/or valgrind commands if requested.
 #
-def run_command(cmd,
-                outfile=None,
-                cwd=None,
-                ostream=None,
-                stdin=None,
-                stdout=None,
-                stderr=None,
-                valgrind=False,
-                valgrind_log=None,
-                valgrind_options=None,
-                memmon=False,
-                env=None,
-                define_signal_handlers=None,
-                debug=False,
-                verbose=True,
-                timelimit=None,
-                tee=None,
-                ignore_output=False,
-                shell=False,
-                thread_reader=None):
-    #
-    # Set the define_signal_handlers based on the global default flag.
-    #
-    if define_signal_handlers is None:
-        define_signal_handlers = GlobalData.DEFINE_SIGNAL_HANDLERS_DEFAULT
-    #
-    # Move to the specified working directory
-    #
-    if cwd is not None:
-        oldpwd = os.getcwd()
-        os.chdir(cwd)
-
+def _build_command(cmd,
+                   memmon=False,
+                   valgrind=False,
+                   valgrind_log=None,
+                   valgrind_options=None):
     cmd_type = type(cmd)
     if cmd_type is list:
         # make a private copy of the list
@@ -501,6 +621,60 @@ def run_command(cmd,
         if valgrind_log is not None:
             valgrind_cmd.append("--log-file-exactly=" + valgrind_log.strip())
         _cmd = valgrind_cmd + _cmd
+    return _cmd
+
+
+#
+# Execute the command as a subprocess that we can send signals to.
+# After this is finished, we can get the output from this command from
+# the process.stdout file descriptor.
+#
+def run_command(cmd,
+                outfile=None,
+                cwd=None,
+                ostream=None,
+                stdin=None,
+                stdout=None,
+                stderr=None,
+                valgrind=False,
+                valgrind_log=None,
+                valgrind_options=None,
+                memmon=False,
+                env=None,
+                define_signal_handlers=None,
+                debug=False,
+                verbose=True,
+                timelimit=None,
+                tee=None,
+                ignore_output=False,
+                shell=False,
+                thread_reader=None,
+                read_chunksize=None,
+                sample_interval=None):
+    #
+    # Set the define_signal_handlers based on the global default flag.
+    #
+    if define_signal_handlers is None:
+        define_signal_handlers = GlobalData.DEFINE_SIGNAL_HANDLERS_DEFAULT
+    #
+    # Set the maximum number of bytes read from the subprocess output
+    # pipes by each read() call.  A value of 1 recovers the historical
+    # byte-at-a-time behavior.
+    #
+    if read_chunksize is None:
+        read_chunksize = GlobalData.READ_CHUNKSIZE_DEFAULT
+    elif read_chunksize < 1:
+        raise ValueError("subprocess.run_command(): read_chunksize must be "
+                         "a positive integer")
+    #
+    # Move to the specified working directory
+    #
+    if cwd is not None:
+        oldpwd = os.getcwd()
+        os.chdir(cwd)
+
+    _cmd = _build_command(cmd, memmon, valgrind, valgrind_log,
+                          valgrind_options)
     #
     # Redirect stdout and stderr
     #
@@ -555,8 +729,11 @@ def run_command(cmd,
         GlobalData.original_signal_handlers[signal.SIGTERM] \
             = signal.signal(signal.SIGTERM, handler)
     rc = -1
+    process = None
+    sampler = None
     if debug:
         print("Executing command %s" % (_cmd,))
+    start_time = timer()
     try:
         try:
             simpleCase = not tee
@@ -582,6 +759,7 @@ def run_command(cmd,
                 env=env,
                 shell=shell)
             GlobalData.current_process = process.process
+            sampler = _start_sampler(process.process, sample_interval)
             rc = process.wait(timelimit)
             GlobalData.current_process = None
         else:
@@ -641,19 +819,25 @@ def run_command(cmd,
                 shell=shell)
             GlobalData.current_process = process.process
             GlobalData.signal_handler_busy = False
+            sampler = _start_sampler(process.process, sample_interval)
             #
             # Create a thread to read in stdout and stderr data
             #
             if out_th:
+                reader_kwds = {}
                 if thread_reader is not None:
                     reader = thread_reader
-                elif len(out_th) == 1:
-                    reader = _stream_reader
-                elif _peek_available:
-                    reader = _merged_reader
                 else:
-                    reader = _pseudo_merged_reader
-                th = Thread(target=reader, args=[x[0] for x in out_th])
+                    if len(out_th) == 1:
+                        reader = _stream_reader
+                    elif _peek_available:
+                        reader = _merged_reader
+                    else:
+                        reader = _pseudo_merged_reader
+                    reader_kwds['chunksize'] = read_chunksize
+                th = Thread(target=reader,
+                            args=[x[0] for x in out_th],
+                            kwargs=reader_kwds)
                 th.daemon = True
                 th.start()
             #
@@ -674,6 +858,9 @@ def run_command(cmd,
         #
         pass
     finally:
+        walltime = timer() - start_time
+        if sampler is not None:
+            sampler.stop()
         # restore the previous signal handlers, if necessary
         for _sig in list(GlobalData.original_signal_handlers):
             signal.signal(_sig, GlobalData.original_signal_handlers.pop(_sig))
@@ -722,12 +909,23 @@ def run_command(cmd,
     #
     # Return the output
     #
-    return [rc, output]
+    return CommandResult(
+        rc,
+        output,
+        walltime=walltime,
+        rusage=None if process is None else process.rusage,
+        memory_samples=None if sampler is None else sampler.samples)
 
 # Create an alias for run_command
 run = run_command
 
 
+def _start_sampler(process, interval):
+    if not interval or not _proc_available:
+        return None
+    return _MemorySampler(process.pid, interval)
+
+
 class SubprocessMngr(object):
 
     def __init__(self,
@@ -737,11 +935,13 @@ class SubprocessMngr(object):
                  stderr=None,
                  env=None,
                  bufsize=0,
-                 shell=False):
+                 shell=False,
+                 cwd=None):
         """
         Setup and launch a subprocess
         """
         self.process = None
+        self.rusage = None
         #
         # By default, stderr is mapped to stdout
         #
@@ -775,7 +975,8 @@ class SubprocessMngr(object):
                 startupinfo=startupinfo,
                 env=env,
                 bufsize=bufsize,
-                shell=shell)
+                shell=shell,
+                cwd=cwd)
         elif getattr(subprocess, 'jython', False):
             #
             # Launch from Jython
@@ -787,7 +988,8 @@ class SubprocessMngr(object):
                 stderr=stderr,
                 env=env,
                 bufsize=bufsize,
-                shell=shell)
+                shell=shell,
+                cwd=cwd)
         else:
             #
             # Launch on *nix
@@ -800,7 +1002,8 @@ class SubprocessMngr(object):
                 preexec_fn=os.setsid,
                 env=env,
                 bufsize=bufsize,
-                shell=shell)
+                shell=shell,
+                cwd=cwd)
 
     def X__del__(self):
         """
@@ -829,12 +1032,24 @@ class SubprocessMngr(object):
     def wait(self, timelimit=None):
         """
         Wait for the subprocess to terminate.  Terminate if a specified
-        timelimit has passed.
+        timelimit has passed.  The resource usage of the subprocess is
+        recorded in the 'rusage' attribute (if available).
         """
         if timelimit is None:
-            # *Py3k: bytes_cast does no conversion for python 2.*, casts to bytes for 3.*
-            self.process.communicate(input=bytes_cast(self.stdin))
-            return self.process.returncode
+            if self.process.stdout is not None \
+               or self.process.stderr is not None:
+                # *Py3k: bytes_cast does no conversion for python 2.*, casts to bytes for 3.*
+                self.process.communicate(input=bytes_cast(self.stdin))
+                return self.process.returncode
+            if self.stdin is not None:
+                try:
+                    # *Py3k: bytes_cast does no conversion for python 2.*, casts to bytes for 3.*
+                    self.process.stdin.write(bytes_cast(self.stdin))
+                    self.process.stdin.close()
+                except IOError:
+                    # The subprocess did not read all of its input
+                    pass
+            return self._reap(True)
         else:
             #
             # Wait timelimit seconds and then force a termination
@@ -852,14 +1067,14 @@ class SubprocessMngr(object):
                 self.process.stdin.write(bytes_cast(self.stdin))
 
             while timer() < endtime:
-                status = self.process.poll()
+                status = self._reap(False)
                 if status is not None:
                     return status
                 time.sleep(0.1)
             #
             # Check one last time before killing the process
             #
-            status = self.process.poll()
+            status = self._reap(False)
             if status is not None:
                 return status
             #
@@ -874,13 +1089,19 @@ class SubprocessMngr(object):
                 # The process may have stopped before we called 'kill()'
                 # so check the status one last time.
                 #
-                status = self.process.poll()
+                status = self._reap(False)
                 if status is not None:
                     return status
                 else:
                     raise OSError("Could not kill process " + repr(
                         self.process.pid))
 
+    def _reap(self, block):
+        status, rusage = _reap(self.process, block)
+        if rusage is not None:
+            self.rusage = rusage
+        return status
+
     def stdout(self):
         return self.process.stdout
 
@@ -896,7 +1117,7 @@ class SubprocessMngr(object):
         """
         kill_process(self.process, sig)
         self.process.terminate()
-        self.process.wait()
+        self._reap(True)
         del self.process
         self.process = None
 
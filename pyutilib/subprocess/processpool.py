@@ -0,0 +1,477 @@
+#  _________________________________________________________________________
+#
+#  PyUtilib: A Python utility library.
+#  Copyright (c) 2008 Sandia Corporation.
+#  This software is distributed under the BSD License.
+#  Under the terms of Contract DE-AC04-94AL85000 with Sandia Corporation,
+#  the U.S. Government retains certain rights in this software.
+#  _________________________________________________________________________
+
+__all__ = ['ProcessPool', 'run_commands']
+
+import codecs
+import collections
+import os
+import signal
+import sys
+import threading
+
+try:
+    import selectors
+    selectors_available = True
+except ImportError:
+    selectors_available = False
+try:
+    from concurrent import futures
+    futures_available = True
+except ImportError:
+    futures_available = False
+try:
+    from multiprocessing import cpu_count
+except ImportError:
+    def cpu_count():
+        return 1
+
+from pyutilib.subprocess import GlobalData
+from pyutilib.subprocess.processmngr import (
+    SubprocessMngr, CommandResult, kill_process, timer, _reap,
+    _reader_encoding, _mswindows, PIPE, STDOUT)
+from pyutilib.misc import quote_split
+
+try:
+    from select import PIPE_BUF
+except ImportError:
+    PIPE_BUF = 512
+
+#
+# The ProcessPool multiplexes all child pipes through a single selector,
+# which requires select() to work on pipes (i.e., not MS Windows).
+#
+pool_available = selectors_available and futures_available \
+                 and not _mswindows
+
+#
+# How often (in seconds) the I/O loop polls children that have closed
+# their output pipes but have not yet terminated.
+#
+_POLL_INTERVAL = 0.1
+
+
+class _PoolJob(object):
+    """
+    The bookkeeping for a single command submitted to a ProcessPool
+    """
+    __slots__ = ('future', 'cmd', 'timelimit', 'stdin', 'outfile', 'env',
+                 'cwd', 'shell', 'process', 'endtime', 'output', 'decoder',
+                 'ostream', 'stdout_fd', 'stdin_fd', 'stdin_offset', 'rc',
+                 'start_time', 'rusage')
+
+    def __init__(self, future, cmd, timelimit, stdin, outfile, env, cwd,
+                 shell):
+        self.future = future
+        self.cmd = cmd
+        self.timelimit = timelimit
+        self.stdin = stdin
+        self.outfile = outfile
+        self.env = env
+        self.cwd = cwd
+        self.shell = shell
+        self.process = None
+        self.endtime = None
+        self.output = []
+        self.decoder = None
+        self.ostream = None
+        self.stdout_fd = None
+        self.stdin_fd = None
+        self.stdin_offset = 0
+        self.rc = None
+        self.start_time = None
+        self.rusage = None
+
+    def close(self):
+        if self.ostream is not None:
+            self.ostream.close()
+            self.ostream = None
+
+    def result(self):
+        if self.outfile is not None:
+            output = "Output printed to file '%s'" % self.outfile
+        else:
+            self.output.append(self.decoder.decode(b'', True))
+            output = "".join(self.output)
+        return CommandResult(self.rc, output,
+                             walltime=timer() - self.start_time,
+                             rusage=self.rusage)
+
+
+class ProcessPool(object):
+    """
+    Run external commands concurrently.
+
+    At most max_workers children run at any time; additional commands
+    are queued and launched as running children terminate.  All child
+    pipes are serviced by a single background thread that waits on a
+    selector, so the pool does not need a reader thread per child.
+
+    Each call to submit() returns a concurrent.futures.Future whose
+    result is the [returncode, output] CommandResult returned by
+    run_command().
+    As with run_command(), stderr is merged into stdout, and children
+    that exceed their timelimit are killed and report a return code of
+    -1.
+    """
+
+    def __init__(self,
+                 max_workers=None,
+                 timelimit=None,
+                 env=None,
+                 cwd=None,
+                 shell=False):
+        if not pool_available:
+            raise RuntimeError(
+                "ProcessPool requires the selectors and concurrent.futures "
+                "modules, and is not supported on this platform")
+        if max_workers is None:
+            max_workers = cpu_count()
+        if max_workers < 1:
+            raise ValueError("ProcessPool: max_workers must be a positive "
+                             "integer")
+        self.max_workers = max_workers
+        self.timelimit = timelimit
+        self.env = env
+        self.cwd = cwd
+        self.shell = shell
+        self._lock = threading.Lock()
+        self._pending = collections.deque()
+        self._shutdown = False
+        self._kill = False
+        self._thread = None
+        self._wakeup = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, t, v, tb):
+        self.shutdown(wait=True, kill=t is not None)
+
+    def submit(self,
+               cmd,
+               timelimit=None,
+               stdin=None,
+               outfile=None,
+               env=None,
+               cwd=None,
+               shell=None):
+        """
+        Queue a command for execution and return a Future for its
+        [returncode, output] result.  Options that are not specified
+        default to the values given to the pool.
+        """
+        if timelimit is None:
+            timelimit = self.timelimit
+        if timelimit is not None and timelimit <= 0:
+            raise ValueError("'timeout' must be a positive number")
+        if type(cmd) is list:
+            cmd = cmd[:]
+        elif type(cmd) is tuple:
+            cmd = list(cmd)
+        else:
+            cmd = quote_split(cmd.strip())
+        future = futures.Future()
+        job = _PoolJob(future, cmd, timelimit, stdin, outfile,
+                       self.env if env is None else env,
+                       self.cwd if cwd is None else cwd,
+                       self.shell if shell is None else shell)
+        with self._lock:
+            if self._shutdown:
+                raise RuntimeError("cannot submit commands after shutdown")
+            self._pending.append(job)
+            if self._thread is None:
+                self._wakeup = os.pipe()
+                # A full wakeup pipe already guarantees a pending wakeup
+                os.set_blocking(self._wakeup[1], False)
+                self._thread = threading.Thread(target=self._run)
+                self._thread.daemon = True
+                self._thread.start()
+            else:
+                self._notify()
+        return future
+
+    def map(self, cmds, **kwds):
+        """
+        Submit a sequence of commands and return the list of futures
+        """
+        return [self.submit(cmd, **kwds) for cmd in cmds]
+
+    @staticmethod
+    def as_completed(fs, timeout=None):
+        """
+        Iterate over the futures in fs in the order that they complete
+        """
+        return futures.as_completed(fs, timeout)
+
+    def shutdown(self, wait=True, kill=False):
+        """
+        Stop accepting new commands.  If kill is True, cancel all queued
+        commands and kill all running children.  If wait is True, block
+        until all children have terminated.
+        """
+        with self._lock:
+            thread = self._thread
+            self._abort(kill)
+        if wait and thread is not None:
+            thread.join()
+
+    def _abort(self, kill=True):
+        # Flag the pool for shutdown and wake up the I/O loop.  This
+        # does not acquire the lock, so it is safe to call from a
+        # signal handler.
+        self._shutdown = True
+        if kill:
+            self._kill = True
+        self._notify()
+
+    def _notify(self):
+        # Wake up the I/O loop
+        wakeup = self._wakeup
+        if wakeup is None:
+            return
+        try:
+            os.write(wakeup[1], b'x')
+        except OSError:
+            pass
+
+    def _launch(self, job, selector):
+        if job.outfile is not None:
+            job.ostream = open(job.outfile, "w")
+            stdout_arg = job.ostream
+        else:
+            stdout_arg = PIPE
+            job.decoder = codecs.getincrementaldecoder(
+                _reader_encoding()[1])('replace')
+        try:
+            job.process = SubprocessMngr(
+                job.cmd,
+                stdin=job.stdin,
+                stdout=stdout_arg,
+                stderr=STDOUT,
+                env=os.environ.copy() if job.env is None else job.env,
+                shell=job.shell,
+                cwd=job.cwd).process
+        except:
+            job.close()
+            raise
+        job.start_time = timer()
+        if job.timelimit is not None:
+            job.endtime = timer() + job.timelimit
+        if job.outfile is None:
+            job.stdout_fd = job.process.stdout.fileno()
+            selector.register(job.stdout_fd, selectors.EVENT_READ,
+                              (job, True))
+        if job.stdin is not None:
+            if not isinstance(job.stdin, bytes):
+                job.stdin = job.stdin.encode()
+            job.stdin_fd = job.process.stdin.fileno()
+            selector.register(job.stdin_fd, selectors.EVENT_WRITE,
+                              (job, False))
+
+    def _close_stdin(self, job, selector):
+        selector.unregister(job.stdin_fd)
+        job.process.stdin.close()
+        job.stdin_fd = None
+
+    def _close_stdout(self, job, selector):
+        selector.unregister(job.stdout_fd)
+        job.process.stdout.close()
+        job.stdout_fd = None
+
+    def _kill_job(self, job, selector):
+        if job.stdin_fd is not None:
+            self._close_stdin(job, selector)
+        if job.process.returncode is None:
+            try:
+                kill_process(job.process)
+            except OSError:
+                pass
+        job.rc = -1
+
+    def _run(self):
+        selector = selectors.DefaultSelector()
+        wakeup_r = self._wakeup[0]
+        selector.register(wakeup_r, selectors.EVENT_READ, None)
+        chunksize = GlobalData.READ_CHUNKSIZE_DEFAULT
+        running = set()
+        try:
+            while True:
+                with self._lock:
+                    if self._kill:
+                        while self._pending:
+                            self._pending.popleft().future.cancel()
+                        for job in running:
+                            if job.rc is None:
+                                self._kill_job(job, selector)
+                    while self._pending and len(running) < self.max_workers:
+                        job = self._pending.popleft()
+                        if not job.future.set_running_or_notify_cancel():
+                            continue
+                        try:
+                            self._launch(job, selector)
+                        except Exception:
+                            job.future.set_exception(sys.exc_info()[1])
+                            continue
+                        running.add(job)
+                    if not running and self._shutdown \
+                       and not self._pending:
+                        break
+                #
+                # Wait until a pipe is ready, a timelimit expires, or
+                # (for children that closed their pipes) the next poll.
+                #
+                timeout = None
+                now = timer()
+                for job in running:
+                    if job.stdout_fd is None and job.stdin_fd is None:
+                        timeout = _POLL_INTERVAL
+                        break
+                    if job.endtime is not None and job.rc is None:
+                        delay = max(0, job.endtime - now)
+                        if timeout is None or delay < timeout:
+                            timeout = delay
+                for key, mask in selector.select(timeout):
+                    job = key.data
+                    if job is None:
+                        os.read(wakeup_r, 4096)
+                        continue
+                    job, is_stdout = job
+                    if is_stdout:
+                        data = os.read(job.stdout_fd, chunksize)
+                        if data:
+                            job.output.append(job.decoder.decode(data))
+                        else:
+                            self._close_stdout(job, selector)
+                    else:
+                        try:
+                            job.stdin_offset += os.write(
+                                job.stdin_fd,
+                                job.stdin[job.stdin_offset:
+                                          job.stdin_offset + PIPE_BUF])
+                        except OSError:
+                            # The child closed its stdin
+                            job.stdin_offset = len(job.stdin)
+                        if job.stdin_offset >= len(job.stdin):
+                            self._close_stdin(job, selector)
+                #
+                # Enforce timelimits and collect terminated children
+                #
+                now = timer()
+                for job in list(running):
+                    if job.rc is None and job.endtime is not None \
+                       and now >= job.endtime:
+                        self._kill_job(job, selector)
+                    if job.stdout_fd is not None:
+                        continue
+                    status, job.rusage = _reap(job.process, False)
+                    if status is None:
+                        continue
+                    if job.stdin_fd is not None:
+                        self._close_stdin(job, selector)
+                    if job.rc is None:
+                        job.rc = status
+                    job.close()
+                    running.discard(job)
+                    job.future.set_result(job.result())
+        except Exception:
+            # Something is seriously wrong: do not leave orphaned
+            # children or futures that will never complete.
+            err = sys.exc_info()[1]
+            with self._lock:
+                self._shutdown = True
+                pending = list(self._pending)
+                self._pending.clear()
+            for job in running:
+                if job.rc is None:
+                    try:
+                        self._kill_job(job, selector)
+                    except Exception:
+                        pass
+                job.close()
+                job.future.set_exception(err)
+            for job in pending:
+                if job.future.set_running_or_notify_cancel():
+                    job.future.set_exception(err)
+            raise
+        finally:
+            selector.close()
+            with self._lock:
+                wakeup, self._wakeup = self._wakeup, None
+            os.close(wakeup[0])
+            os.close(wakeup[1])
+
+
+def run_commands(cmds,
+                 max_workers=None,
+                 timelimit=None,
+                 env=None,
+                 cwd=None,
+                 shell=False,
+                 define_signal_handlers=None):
+    """
+    Run a sequence of commands concurrently, and generate (index,
+    [returncode, output]) tuples in the order that the commands
+    complete, where index is the position of the command in cmds.
+
+    The timelimit may be a single value that applies to every command,
+    or a sequence with a timelimit for each command.  If the generator
+    is closed before all results are consumed, the remaining commands
+    are cancelled and any running children are killed.
+    """
+    if define_signal_handlers is None:
+        define_signal_handlers = GlobalData.DEFINE_SIGNAL_HANDLERS_DEFAULT
+    cmds = list(cmds)
+    if type(timelimit) in (list, tuple):
+        if len(timelimit) != len(cmds):
+            raise ValueError("run_commands(): the number of timelimits "
+                             "does not match the number of commands")
+        timelimits = timelimit
+    else:
+        timelimits = [timelimit] * len(cmds)
+
+    pool = ProcessPool(max_workers=max_workers, env=env, cwd=cwd,
+                       shell=shell)
+    original_handlers = {}
+
+    def handler(signum, frame):
+        # Kill all children, restore the original handlers, and pass
+        # the signal on (mirrors processmngr.signal_handler)
+        pool._abort(kill=True)
+        for _sig in list(original_handlers):
+            signal.signal(_sig, original_handlers.pop(_sig))
+        orig_handler = signal.getsignal(signum)
+        if hasattr(orig_handler, '__call__'):
+            orig_handler(signum, frame)
+        raise OSError("Interrupted by signal " + repr(signum))
+
+    if define_signal_handlers:
+        sigs = [signal.SIGINT, signal.SIGTERM]
+        if sys.platform[0:3] != "win" and sys.platform[0:4] != 'java':
+            sigs.append(signal.SIGHUP)
+        try:
+            for _sig in sigs:
+                original_handlers[_sig] = signal.signal(_sig, handler)
+        except ValueError:
+            # Signal handlers can only be set from the main thread
+            for _sig in list(original_handlers):
+                signal.signal(_sig, original_handlers.pop(_sig))
+
+    completed = False
+    try:
+        fs = {}
+        for i, cmd in enumerate(cmds):
+            fs[pool.submit(cmd, timelimit=timelimits[i])] = i
+        for f in futures.as_completed(fs):
+            yield fs[f], f.result()
+        completed = True
+    finally:
+        pool.shutdown(wait=True, kill=not completed)
+        for _sig in list(original_handlers):
+            signal.signal(_sig, original_handlers.pop(_sig))
@@ -0,0 +1,131 @@
+import sys
+import os
+from os.path import abspath, dirname
+currdir = dirname(abspath(__file__)) + os.sep
+
+import pyutilib.th as unittest
+import pyutilib.misc
+import pyutilib.subprocess
+from pyutilib.subprocess import timer
+
+import six
+
+try:
+    import asyncio
+    asyncio_available = sys.version_info[0:2] >= (3, 5)
+except ImportError:
+    asyncio_available = False
+
+try:
+    import __pypy__
+    is_pypy = True
+except:
+    is_pypy = False
+
+_mswindows = (sys.platform == 'win32')
+
+
+def _run(coro):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        loop.close()
+
+
+def _run_all(coros):
+    # Run coroutines concurrently.  (This module does not use the
+    # async/await syntax, so it can be imported by Python 2.)
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        return loop.run_until_complete(asyncio.gather(*coros))
+    finally:
+        asyncio.set_event_loop(None)
+        loop.close()
+
+
+@unittest.skipIf(not asyncio_available, "asyncio is not available")
+@unittest.skipIf(is_pypy, "Cannot launch python in this test with pypy")
+class Test(unittest.TestCase):
+
+    def test_output(self):
+        rc, output = _run(pyutilib.subprocess.run_command_async(
+            [sys.executable, currdir + "tee_script.py"]))
+        self.assertEqual(rc, 0)
+        self.assertEqual(sorted(output.splitlines()),
+                         ["Tee Script: ERR", "Tee Script: OUT"])
+
+    def test_returncode(self):
+        rc, output = _run(pyutilib.subprocess.run_async(
+            [sys.executable, '-c', 'import sys; sys.exit(5)']))
+        self.assertEqual(rc, 5)
+        self.assertEqual(output, "")
+
+    def test_outputfile(self):
+        fname = currdir + 'async_tee.out'
+        rc, output = _run(pyutilib.subprocess.run_command_async(
+            [sys.executable, currdir + "tee_script.py"], outfile=fname))
+        self.assertEqual(output, "Output printed to file '%s'" % fname)
+        with open(fname) as INPUT:
+            self.assertEqual(sorted(INPUT.read().splitlines()),
+                             ["Tee Script: ERR", "Tee Script: OUT"])
+        os.remove(fname)
+
+    def test_ostream_stringio(self):
+        script_out = six.StringIO()
+        rc, output = _run(pyutilib.subprocess.run_command_async(
+            [sys.executable, currdir + "tee_script.py"], ostream=script_out))
+        self.assertEqual(output, "Output printed to specified ostream")
+        self.assertEqual(sorted(script_out.getvalue().splitlines()),
+                         ["Tee Script: ERR", "Tee Script: OUT"])
+
+    def test_tee_stdout(self):
+        stream_out = six.StringIO()
+        script_out = six.StringIO()
+        pyutilib.misc.setup_redirect(stream_out)
+        try:
+            _run(pyutilib.subprocess.run_command_async(
+                [sys.executable, currdir + "tee_script.py"],
+                ostream=script_out,
+                tee=(True, False)))
+        finally:
+            pyutilib.misc.reset_redirect()
+        self.assertEqual(stream_out.getvalue().splitlines(),
+                         ["Tee Script: OUT"])
+        self.assertEqual(sorted(script_out.getvalue().splitlines()),
+                         ["Tee Script: ERR", "Tee Script: OUT"])
+
+    def test_stdin(self):
+        script = "import sys; sys.stdout.write(sys.stdin.read().upper())"
+        rc, output = _run(pyutilib.subprocess.run_command_async(
+            [sys.executable, '-c', script], stdin="abc" * 100000))
+        self.assertEqual(output, "ABC" * 100000)
+
+    def test_timelimit(self):
+        stime = timer()
+        rc, output = _run(pyutilib.subprocess.run_command_async(
+            [sys.executable, '-q', '-c', 'while True: pass'], timelimit=1))
+        self.assertEqual(rc, -1)
+        self.assertLess(timer() - stime, 1 + 1)
+
+    def test_concurrent(self):
+        cmd = [sys.executable, '-c', 'import time; time.sleep(0.5)']
+        stime = timer()
+        results = _run_all([pyutilib.subprocess.run_command_async(cmd)
+                            for i in range(5)])
+        self.assertLess(timer() - stime, 2.5)
+        self.assertEqual([rc for rc, output in results], [0] * 5)
+
+    def test_bad_options(self):
+        with self.assertRaises(ValueError):
+            _run(pyutilib.subprocess.run_command_async(
+                [sys.executable, '-c', 'pass'],
+                ostream=six.StringIO(), outfile=currdir + 'bad.out'))
+        with self.assertRaises(ValueError):
+            _run(pyutilib.subprocess.run_command_async(
+                [sys.executable, '-c', 'pass'], timelimit=0))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,151 @@
+import sys
+import os
+import time
+from os.path import abspath, dirname
+currdir = dirname(abspath(__file__)) + os.sep
+
+import pyutilib.th as unittest
+from pyutilib.subprocess import ProcessPool, run_commands, timer
+from pyutilib.subprocess.processpool import pool_available
+from pyutilib.subprocess.processmngr import _wait4_available
+
+try:
+    import __pypy__
+    is_pypy = True
+except:
+    is_pypy = False
+
+
+def _python(script):
+    return [sys.executable, '-c', script]
+
+
+@unittest.skipIf(not pool_available,
+                 "ProcessPool is not supported on this platform")
+@unittest.skipIf(is_pypy, "Cannot launch python in this test with pypy")
+class Test(unittest.TestCase):
+
+    def test_output(self):
+        with ProcessPool(max_workers=2) as pool:
+            fs = [pool.submit(_python("print('job %d')" % i))
+                  for i in range(5)]
+            results = [f.result() for f in fs]
+        for i, (rc, output) in enumerate(results):
+            self.assertEqual(rc, 0)
+            self.assertEqual(output.strip(), 'job %d' % i)
+
+    def test_resource_usage(self):
+        with ProcessPool() as pool:
+            result = pool.submit(_python("sum(range(2000000))")).result()
+        self.assertEqual(result.returncode, 0)
+        self.assertGreater(result.walltime, 0)
+        if _wait4_available:
+            self.assertGreater(result.user_time, 0)
+            self.assertGreater(result.max_rss, 0)
+
+    def test_stderr_and_returncode(self):
+        script = "import sys\n" \
+                 "sys.stdout.write('OUT\\n')\n" \
+                 "sys.stdout.flush()\n" \
+                 "sys.stderr.write('ERR\\n')\n" \
+                 "sys.exit(3)\n"
+        with ProcessPool() as pool:
+            rc, output = pool.submit(_python(script)).result()
+        self.assertEqual(rc, 3)
+        self.assertEqual(sorted(output.split()), ['ERR', 'OUT'])
+
+    def test_large_output(self):
+        script = "import sys\n" \
+                 "sys.stdout.write('x' * 1000000)\n"
+        with ProcessPool(max_workers=4) as pool:
+            fs = pool.map([_python(script)] * 4)
+            for f in fs:
+                self.assertEqual(f.result(), [0, 'x' * 1000000])
+
+    def test_stdin(self):
+        script = "import sys\n" \
+                 "sys.stdout.write(str(len(sys.stdin.read())))\n"
+        with ProcessPool() as pool:
+            f = pool.submit(_python(script), stdin='y' * 200000)
+            self.assertEqual(f.result(), [0, '200000'])
+
+    def test_outfile(self):
+        fname = currdir + 'processpool.out'
+        with ProcessPool() as pool:
+            f = pool.submit(_python("print('to file')"), outfile=fname)
+            rc, output = f.result()
+        self.assertEqual(rc, 0)
+        self.assertEqual(output, "Output printed to file '%s'" % fname)
+        with open(fname) as INPUT:
+            self.assertEqual(INPUT.read().strip(), 'to file')
+        os.remove(fname)
+
+    def test_cwd(self):
+        with ProcessPool(cwd=currdir) as pool:
+            f = pool.submit(_python("import os; print(os.getcwd())"))
+            self.assertEqual(os.path.realpath(f.result()[1].strip()),
+                             os.path.realpath(currdir))
+
+    def test_bounded_workers(self):
+        # 6 jobs of 0.5s on 3 workers should take two "rounds"
+        stime = timer()
+        with ProcessPool(max_workers=3) as pool:
+            fs = pool.map([_python("import time; time.sleep(0.5)")] * 6)
+            for f in fs:
+                f.result()
+        runtime = timer() - stime
+        self.assertGreaterEqual(runtime, 1.0)
+        self.assertLess(runtime, 1.5 + 1)
+
+    def test_timelimit(self):
+        stime = timer()
+        with ProcessPool(max_workers=2) as pool:
+            slow = pool.submit(_python("while True: pass"), timelimit=0.5)
+            fast = pool.submit(_python("print('done')"))
+            self.assertEqual(fast.result()[0], 0)
+            self.assertEqual(slow.result()[0], -1)
+        self.assertLess(timer() - stime, 0.5 + 1)
+
+    def test_bad_command(self):
+        with ProcessPool() as pool:
+            f = pool.submit([currdir + 'no_such_executable'])
+            self.assertRaises(OSError, f.result)
+            self.assertEqual(pool.submit(_python("pass")).result()[0], 0)
+
+    def test_submit_after_shutdown(self):
+        pool = ProcessPool()
+        pool.shutdown()
+        self.assertRaises(RuntimeError, pool.submit, _python("pass"))
+
+    def test_shutdown_kill(self):
+        pool = ProcessPool(max_workers=1)
+        running = pool.submit(_python("import time; time.sleep(10)"))
+        queued = pool.submit(_python("pass"))
+        while not running.running():
+            time.sleep(0.01)
+        stime = timer()
+        pool.shutdown(wait=True, kill=True)
+        self.assertLess(timer() - stime, 5)
+        self.assertTrue(queued.cancelled())
+        self.assertEqual(running.result()[0], -1)
+
+    def test_run_commands(self):
+        cmds = [_python("import time; time.sleep(%s); print(%d)" % (t, i))
+                for i, t in enumerate((0.6, 0.0, 0.3))]
+        results = list(run_commands(cmds, max_workers=3))
+        self.assertEqual([i for i, r in results], [1, 2, 0])
+        for i, (rc, output) in results:
+            self.assertEqual(rc, 0)
+            self.assertEqual(output.strip(), str(i))
+
+    def test_run_commands_timelimits(self):
+        cmds = [_python("while True: pass"), _python("pass")]
+        results = dict(run_commands(cmds, timelimit=[0.5, None]))
+        self.assertEqual(results[0][0], -1)
+        self.assertEqual(results[1][0], 0)
+        self.assertRaises(ValueError, list,
+                          run_commands(cmds, timelimit=[1]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -6,7 +6,8 @@ currdir = dirname(abspath(__file__)) + os.sep
 import pyutilib.th as unittest
 import pyutilib.services
 from pyutilib.subprocess import subprocess, SubprocessMngr, timer
-from pyutilib.subprocess.processmngr import _peek_available
+from pyutilib.subprocess.processmngr import (
+    _peek_available, _reader_encoding, _wait4_available, _proc_available)
 
 import six
 
@@ -221,6 +222,125 @@ class Test(unittest.TestCase):
                             (["Tee Script: ERR", "Tee Script: OUT"],
                              ["Tee Script: OUT", "Tee Script: ERR"]))
 
+    def test_chunked_output(self):
+        script = "import sys\n" \
+                 "for i in range(20000):\n" \
+                 "    sys.stdout.write('line %d: ' % i + 'x'*(i % 97) + '\\n')\n"
+        ref = "".join('line %d: ' % i + 'x' * (i % 97) + '\n'
+                      for i in range(20000))
+        for chunksize in (None, 1, 7, 4096):
+            script_out = six.StringIO()
+            rc, output = pyutilib.subprocess.run(
+                [sys.executable, '-c', script],
+                ostream=script_out,
+                read_chunksize=chunksize)
+            self.assertEqual(rc, 0)
+            self.assertEqual(script_out.getvalue(), ref)
+
+    @unittest.skipIf(six.PY2, "Test requires Python 3 bytes output")
+    def test_chunked_multibyte_output(self):
+        encoding = _reader_encoding()[1]
+        text = u"caf\u00e9 \u00fcber na\u00efve\n" * 5
+        try:
+            text.encode(encoding)
+        except UnicodeError:
+            self.skipTest("Encoding %s cannot represent the test text"
+                          % (encoding,))
+        script = "import sys\n" \
+                 "sys.stdout.buffer.write(%r.encode(%r))\n" % (text, encoding)
+        for chunksize in (1, 2, 3, 5):
+            script_out = six.StringIO()
+            pyutilib.subprocess.run(
+                [sys.executable, '-c', script],
+                ostream=script_out,
+                read_chunksize=chunksize)
+            self.assertEqual(script_out.getvalue(), text)
+
+    def test_partial_line_not_duplicated(self):
+        stream_out = six.StringIO()
+        script_out = six.StringIO()
+        script = "import sys\n" \
+                 "sys.stdout.write('OUT')\n" \
+                 "sys.stdout.flush()\n" \
+                 "sys.stderr.write('ERR')\n"
+        pyutilib.misc.setup_redirect(stream_out)
+        pyutilib.subprocess.run(
+            [sys.executable, '-c', script],
+            ostream=script_out,
+            tee=(False, True))
+        pyutilib.misc.reset_redirect()
+        self.assertEqual(sorted(script_out.getvalue().replace(
+            'ERR', ' ERR ').split()), ['ERR', 'OUT'])
+
+    def test_bad_read_chunksize(self):
+        with self.assertRaises(ValueError):
+            pyutilib.subprocess.run(
+                [sys.executable, '-c', 'pass'], read_chunksize=0)
+
+    def test_result_backwards_compatible(self):
+        result = pyutilib.subprocess.run(
+            [sys.executable, '-c', 'print("hello")'])
+        rc, output = result
+        self.assertEqual(rc, 0)
+        self.assertEqual(output.strip(), "hello")
+        self.assertEqual(result, [0, output])
+        self.assertEqual(result.returncode, 0)
+        self.assertEqual(result.output, output)
+        self.assertGreater(result.walltime, 0)
+
+    @unittest.skipIf(not _wait4_available, "os.wait4 is not available")
+    def test_result_resource_usage(self):
+        # Allocate ~50 MB and burn a little CPU
+        script = "x = bytearray(50 * 2**20)\n" \
+                 "for i in range(0, len(x), 4096): x[i] = 1\n" \
+                 "sum(range(2000000))\n"
+        for kwds in ({}, {'timelimit': 60}, {'tee': True}):
+            stream_out = six.StringIO()
+            pyutilib.misc.setup_redirect(stream_out)
+            try:
+                result = pyutilib.subprocess.run(
+                    [sys.executable, '-c', script], **kwds)
+            finally:
+                pyutilib.misc.reset_redirect()
+            self.assertEqual(result.returncode, 0)
+            self.assertGreater(result.user_time + result.system_time, 0)
+            self.assertGreater(result.max_rss, 50 * 2**20)
+            self.assertLessEqual(result.user_time + result.system_time,
+                                 result.walltime + 1)
+            self.assertEqual(result.memory_samples, [])
+
+    @unittest.skipIf(not _proc_available, "/proc is not available")
+    def test_result_memory_samples(self):
+        script = "import time\n" \
+                 "x = bytearray(30 * 2**20)\n" \
+                 "for i in range(0, len(x), 4096): x[i] = 1\n" \
+                 "time.sleep(0.5)\n"
+        result = pyutilib.subprocess.run(
+            [sys.executable, '-c', script], sample_interval=0.05)
+        self.assertEqual(result.returncode, 0)
+        self.assertGreater(len(result.memory_samples), 2)
+        times = [t for t, rss in result.memory_samples]
+        self.assertEqual(times, sorted(times))
+        self.assertGreater(max(rss for t, rss in result.memory_samples),
+                           30 * 2**20)
+
+    def test_result_timelimit_kill(self):
+        result = pyutilib.subprocess.run(
+            [sys.executable, '-q', '-c', 'while True: pass'], timelimit=0.5)
+        self.assertEqual(result.returncode, -1)
+        self.assertGreaterEqual(result.walltime, 0.5)
+        if _wait4_available:
+            self.assertGreater(result.user_time, 0)
+
+    def test_subprocessmngr_stdin(self):
+        foo = SubprocessMngr(
+            [sys.executable, '-c',
+             'import sys; sys.exit(len(sys.stdin.read()))'],
+            stdin="x" * 17)
+        self.assertEqual(foo.wait(), 17)
+        if _wait4_available:
+            self.assertIsNotNone(foo.rusage)
+
 
 if __name__ == "__main__":
     unittest.main()
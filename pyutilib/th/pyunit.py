@@ -318,11 +318,16 @@ class TestCase(unittest.TestCase):
                                   baseline,
                                   delete=True,
                                   tolerance=0.0,
-                                  exact=False):
+                                  exact=False,
+                                  max_differences=1):
         try:
             import pyutilib.misc
             pyutilib.misc.compare_yaml_files(
-                baseline, testfile, tolerance=tolerance, exact=exact)
+                baseline,
+                testfile,
+                tolerance=tolerance,
+                exact=exact,
+                max_differences=max_differences)
             if delete:
                 os.remove(testfile)
         except Exception:
@@ -336,11 +341,16 @@ class TestCase(unittest.TestCase):
                                   baseline,
                                   delete=True,
                                   tolerance=0.0,
-                                  exact=False):
+                                  exact=False,
+                                  max_differences=1):
         try:
             import pyutilib.misc
             pyutilib.misc.compare_json_files(
-                baseline, testfile, tolerance=tolerance, exact=exact)
+                baseline,
+                testfile,
+                tolerance=tolerance,
+                exact=exact,
+                max_differences=max_differences)
             if delete:
                 os.remove(testfile)
         except Exception:
@@ -369,13 +379,15 @@ class TestCase(unittest.TestCase):
 
     def assertFileEqualsLargeBaseline(self, testfile, baseline, delete=True):
         import pyutilib.misc
-        flag = pyutilib.misc.compare_large_file(testfile, baseline)
+        diff = pyutilib.misc.find_large_file_difference(testfile, baseline)
+        flag = diff is not None
         if not flag:
             if delete:
                 os.remove(testfile)
         else:  #pragma:nocover
-            self.fail("Unexpected output difference:\n   testfile=" + testfile +
-                      "\n   baseline=" + baseline)
+            self.fail("Unexpected output difference at line %d (offset %d):"
+                      "\n   testfile=%s\n   baseline=%s" %
+                      (diff[1], diff[0], testfile, baseline))
         return flag
 
     def assertFileEqualsBinaryFile(self, testfile, baseline, delete=True):
@@ -11,8 +11,11 @@ import pyutilib.component.core
 pyutilib.component.core.PluginGlobals.add_env("pyutilib.workflow")
 
 from pyutilib.workflow.resource import Resource
+from pyutilib.workflow.stream import Stream
 from pyutilib.workflow.task import Task, EmptyTask, Component, Port, Ports, InputPorts, OutputPorts, Connector
 from pyutilib.workflow.workflow import Workflow
+from pyutilib.workflow.cache import TaskCache
+from pyutilib.workflow.profiler import WorkflowProfiler
 from pyutilib.workflow.file import FileResource
 from pyutilib.workflow.executable import ExecutableResource
 from pyutilib.workflow.tasks import TaskPlugin, TaskFactory, WorkflowPlugin
@@ -0,0 +1,285 @@
+#  _________________________________________________________________________
+#
+#  PyUtilib: A Python utility library.
+#  Copyright (c) 2008 Sandia Corporation.
+#  This software is distributed under the BSD License.
+#  Under the terms of Contract DE-AC04-94AL85000 with Sandia Corporation,
+#  the U.S. Government retains certain rights in this software.
+#  _________________________________________________________________________
+#
+# An on-disk cache of task outputs (see Task.set_cache and
+# Workflow.set_cache).
+#
+
+__all__ = ['TaskCache']
+
+import hashlib
+import os
+import struct
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+import six
+
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+_replace = getattr(os, 'replace', os.rename)
+
+
+def _update(h, tag, data):
+    # Length-prefix each item, so that different sequences of items
+    # cannot produce the same hash input
+    h.update(tag + struct.pack('<Q', len(data)) + data)
+
+
+def _touch(path):
+    # File modification times are set from a coarse clock, so the
+    # current time is set explicitly
+    now = time.time()
+    os.utime(path, (now, now))
+
+
+def _code_digest(h, code):
+    _update(h, b'c', code.co_code)
+    _update(h, b'n', repr(code.co_names).encode('utf-8'))
+    for const in code.co_consts:
+        if hasattr(const, 'co_code'):
+            # Nested functions, lambdas and comprehensions
+            _code_digest(h, const)
+        else:
+            # The repr() of frozenset constants depends on the hash seed
+            _update(h, b'k', b'')
+            _hash_value(h, const)
+
+
+def _value_digest(value):
+    h = hashlib.sha256()
+    _hash_value(h, value)
+    return h.digest()
+
+
+def _hash_value(h, value):
+    tag = type(value).__name__.encode('utf-8')
+    if value is None or isinstance(value, (bool, float, complex) +
+                                   six.integer_types):
+        _update(h, tag, repr(value).encode('utf-8'))
+    elif isinstance(value, six.text_type):
+        _update(h, tag, value.encode('utf-8'))
+    elif isinstance(value, six.binary_type):
+        _update(h, tag, value)
+    elif isinstance(value, (list, tuple)):
+        _update(h, tag, struct.pack('<Q', len(value)))
+        for item in value:
+            _hash_value(h, item)
+    elif isinstance(value, dict):
+        # Include the public attributes of dict subclasses like
+        # FunctorAPIData, which may not be stored as dict items
+        items = dict(value)
+        for key, val in six.iteritems(getattr(value, '__dict__', {})):
+            if not (isinstance(key, str) and key.startswith('_')):
+                items.setdefault(key, val)
+        # The hash does not depend on the order of the items
+        digests = sorted(_value_digest(key) + _value_digest(val)
+                         for key, val in six.iteritems(items))
+        _update(h, tag, b''.join(digests))
+    elif isinstance(value, (set, frozenset)):
+        _update(h, tag, b''.join(sorted(_value_digest(item)
+                                        for item in value)))
+    else:
+        # Other objects are identified by the pickled representation of
+        # their class and constructor arguments, and their state is
+        # hashed by value (the pickled state would depend on the hash
+        # seed if it contains sets)
+        reduced = None
+        if not isinstance(value, type):
+            try:
+                reduced = value.__reduce_ex__(2)
+            except TypeError:
+                pass
+        if not isinstance(reduced, tuple) or len(reduced) < 3:
+            _update(h, tag, pickle.dumps(value, 2))
+            return
+        _update(h, tag, pickle.dumps(reduced[:2], 2))
+        _hash_value(h, reduced[2])
+        for items in reduced[3:]:
+            _hash_value(h, None if items is None else list(items))
+
+
+class TaskCache(object):
+    """
+    An on-disk cache of task outputs.
+
+    An entry is keyed by a hash of the code of a task (the functor
+    function of a FunctorTask, or the execute() method of other tasks)
+    and of the values of its inputs.  When a task with a cache is
+    executed with the same inputs as a previous execution, its outputs
+    are loaded from the cache instead of executing the task.  The cached
+    outputs are copies of the original outputs, and side effects of
+    the task (e.g., changes made to its input objects) are not repeated.
+
+    Input values are hashed by value for None, numbers, strings, lists,
+    tuples, dicts and sets; other values are hashed by the pickled
+    representation of their class, and by the value of their state.
+    The keys do not depend on the hash seed of the interpreter.  Tasks
+    whose inputs cannot be pickled, or whose outputs cannot be pickled,
+    are executed without using the cache.
+    The hash does not cover functions called by the task code, so the
+    cache should be cleared when they change.
+
+    directory   The directory for the cache entries, which is created
+                if needed.  Entries in this directory are reused by
+                later TaskCache objects.
+    max_size    The maximum total size (in bytes) of the cache entries.
+                The least recently used entries are deleted when the
+                size is exceeded.  The default is no limit.
+    """
+
+    suffix = '.pkl'
+
+    def __init__(self, directory, max_size=None):
+        if max_size is not None and max_size < 0:
+            raise ValueError("The maximum cache size cannot be negative")
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+        self.directory = directory
+        self.max_size = max_size
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # key -> entry size, from least to most recently used
+        self._entries = OrderedDict()
+        entries = []
+        for name in os.listdir(directory):
+            if not name.endswith(self.suffix):
+                continue
+            st = os.stat(os.path.join(directory, name))
+            entries.append((st.st_mtime, name[:-len(self.suffix)],
+                            st.st_size))
+        for mtime, key, size in sorted(entries):
+            self._entries[key] = size
+            self.size += size
+        with self._lock:
+            self._evict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + self.suffix)
+
+    def _evict(self):
+        while self.max_size is not None and self.size > self.max_size:
+            key, size = self._entries.popitem(last=False)
+            self.size -= size
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+
+    def _discard(self, key):
+        size = self._entries.pop(key, None)
+        if size is not None:
+            self.size -= size
+
+    def key(self, task):
+        """
+        Return the cache key for the current inputs of a task, or None
+        if the inputs cannot be hashed.
+        """
+        h = hashlib.sha256()
+        fn = task._cache_code()
+        fn = getattr(fn, '__func__', fn)
+        _update(h, b'f', ('%s.%s' % (fn.__module__, getattr(
+            fn, '__qualname__', fn.__name__))).encode('utf-8'))
+        _code_digest(h, fn.__code__)
+        try:
+            for name in sorted(task.inputs):
+                _update(h, b'i', name.encode('utf-8'))
+                _hash_value(h, getattr(task, name))
+        except (pickle.PicklingError, TypeError, AttributeError,
+                RuntimeError):
+            # RuntimeError is raised for recursive input values
+            return None
+        return h.hexdigest()
+
+    def get(self, key):
+        """
+        Return a tuple (found, value) for a cache key
+        """
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return False, None
+            path = self._path(key)
+            try:
+                with open(path, 'rb') as INPUT:
+                    value = pickle.load(INPUT)
+                # Record the use, so that the LRU order is kept by
+                # later TaskCache objects
+                _touch(path)
+            except Exception:
+                # The entry was deleted or could not be read
+                self._discard(key)
+                self.misses += 1
+                return False, None
+            size = self._entries.pop(key)
+            self._entries[key] = size
+            self.hits += 1
+            return True, value
+
+    def put(self, key, value):
+        """
+        Store a value in the cache.  Returns False if the value cannot
+        be pickled.
+        """
+        try:
+            data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        except (pickle.PicklingError, TypeError, AttributeError):
+            return False
+        with self._lock:
+            fd, tmpname = tempfile.mkstemp(dir=self.directory,
+                                           suffix='.tmp')
+            with os.fdopen(fd, 'wb') as OUTPUT:
+                OUTPUT.write(data)
+            _replace(tmpname, self._path(key))
+            _touch(self._path(key))
+            self._discard(key)
+            self._entries[key] = len(data)
+            self.size += len(data)
+            self._evict()
+        return True
+
+    def execute(self, task):
+        """
+        Execute a task, unless its outputs for the current inputs are in
+        the cache.
+        """
+        key = self.key(task)
+        if key is not None:
+            found, state = self.get(key)
+            if found:
+                task._set_cache_state(state)
+                return
+        task.execute()
+        if key is not None:
+            self.put(key, task._get_cache_state())
+
+    def clear(self):
+        """Delete all cache entries"""
+        with self._lock:
+            for key in self._entries:
+                try:
+                    os.remove(self._path(key))
+                except OSError:
+                    pass
+            self._entries.clear()
+            self.size = 0
@@ -13,6 +13,12 @@ import pyutilib.misc
 
 logger = logging.getLogger('pyutilib.workflow')
 
+try:
+    _getargspec = inspect.getfullargspec
+except AttributeError:  #pragma:nocover
+    # Python 2
+    _getargspec = inspect.getargspec
+
 
 class FunctorAPIData(dict):
     """
@@ -68,6 +74,16 @@ class FunctorAPIData(dict):
                 raise AttributeError("Unknown attribute %s" % name)
         return None
 
+    def __reduce__(self):
+        # The default dict pickling calls __setitem__ before the
+        # object is initialized
+        return (self.__class__, (), (dict(self), self.__dict__.copy()))
+
+    def __setstate__(self, state):
+        items, attrs = state
+        dict.update(self, items)
+        self.__dict__.update(attrs)
+
     def __repr__(self):
         return dict.__repr__(self)
 
@@ -96,11 +112,22 @@ FunctorAPIFactory = pyutilib.component.core.CreatePluginFactory(IFunctorTask)
 
 class FunctorTask(TaskPlugin):
 
+    cacheable = True
+
     def __init__(self, *args, **kwargs):
         self._fn = kwargs.pop('fn', None)
         #
         TaskPlugin.__init__(self, *args, **kwargs)
 
+    def _cache_code(self):
+        return self._fn
+
+    def _get_cache_state(self):
+        return self._retval
+
+    def _set_cache_state(self, state):
+        self._retval = state
+
     def execute(self, debug=False):
         if self._fn is None:  #pragma:nocover
             raise RuntimeError(
@@ -175,11 +202,20 @@ class FunctorTask(TaskPlugin):
                         "A FunctorTask instance can only be executed with a single non-keyword argument")
                 kwds['data'] = options[0]
                 #options = options[1:]
-            elif not self.inputs.data.optional:
+            elif not self.inputs.data.optional and \
+                 len(self.inputs.data.input_connections) == 0:
                 raise RuntimeError(
                     "A FunctorTask instance must be executed with at 'data' argument")
         self._kwds = kwds
-        return TaskPlugin._call_init(self, **kwds)
+        ans = TaskPlugin._call_init(self, **kwds)
+        #
+        # Arguments that are not specified are taken from the inputs
+        # that are connected to other tasks (e.g., in a workflow)
+        #
+        for name in self.inputs:
+            if not name in kwds and len(self.inputs[name].input_connections) > 0:
+                self._kwds[name] = getattr(self, name)
+        return ans
 
     def _call_fini(self, *options, **kwds):
         for key in self._retval:
@@ -208,13 +244,14 @@ def functor_api(fn=None, implements=None, outputs=None, namespace=None):
             _alias = namespace + '.' + fn.__name__
         _name = _alias.replace('_', '.')
 
-        argspec = inspect.getargspec(fn)
+        argspec = _getargspec(fn)
         if not argspec.varargs is None:
             logger.error(
                 "Attempting to declare Functor task with function '%s' that contains variable arguments"
                 % _alias)
             return  #pragma:nocover
-        if not argspec.keywords is None:
+        if not getattr(argspec, 'varkw',
+                       getattr(argspec, 'keywords', None)) is None:
             logger.error(
                 "Attempting to declare Functor task with function '%s' that contains variable keyword arguments"
                 % _alias)
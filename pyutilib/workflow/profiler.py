@@ -0,0 +1,272 @@
+#  _________________________________________________________________________
+#
+#  PyUtilib: A Python utility library.
+#  Copyright (c) 2008 Sandia Corporation.
+#  This software is distributed under the BSD License.
+#  Under the terms of Contract DE-AC04-94AL85000 with Sandia Corporation,
+#  the U.S. Government retains certain rights in this software.
+#  _________________________________________________________________________
+#
+# Timing and memory instrumentation for workflow tasks (see
+# Task.set_profiler and Workflow.set_profiler).
+#
+
+__all__ = ['WorkflowProfiler']
+
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from pyutilib.misc.timing import HierarchicalTimer
+
+try:
+    import tracemalloc
+    memory_available = hasattr(tracemalloc, 'reset_peak')
+except ImportError:  #pragma:nocover
+    memory_available = False
+
+# The CPU time of the current thread
+_thread_time = getattr(time, 'thread_time', None)
+
+# Durations are measured with a monotonic clock (like the timers in
+# pyutilib.misc.timing), whose values are not related to the epoch
+_clock = getattr(time, 'perf_counter', time.time)
+
+
+class _Call(object):
+    """The measurements for one call of a task"""
+
+    __slots__ = ('path', 'thread', 'start', 'end', 'cpu', 'phases',
+                 'start_memory', 'peak_memory')
+
+    def __init__(self, path):
+        self.path = path
+        self.thread = threading.current_thread().ident
+        self.start = _clock()
+        self.end = None
+        self.cpu = None
+        # (name, start, end) for the inputs, execute and outputs phases,
+        # and for the input port transfers
+        self.phases = []
+        self.start_memory = None
+        self.peak_memory = None
+
+
+class WorkflowProfiler(object):
+    """
+    Records the wall time, CPU time and (optionally) the peak memory of
+    each call of the tasks in a workflow.
+
+    Each task call is divided into the phases 'inputs' (computing the
+    values of the input ports, which includes the transfer of each
+    input port value), 'execute' and 'outputs'.  The measurements can
+    be summarized with report() or timer(), which returns a
+    HierarchicalTimer whose timers are nested like the workflows, and
+    they can be exported as Chrome trace events (chrome://tracing, or
+    https://ui.perfetto.dev) with write_chrome_trace().
+
+    The CPU time is the time used by the thread that executed the task
+    (tasks of a workflow that is executed in a thread pool run in
+    different threads).  It is None if time.thread_time() is not
+    available.
+
+    If memory is True, then the memory allocations are traced with the
+    tracemalloc module (which slows down the execution), and the peak
+    memory of a task call is the maximum increase of the traced memory
+    while the task is running.  When tasks run concurrently, the
+    allocations of other tasks are included.
+    """
+
+    def __init__(self, memory=False):
+        if memory and not memory_available:
+            raise ValueError("Memory profiling requires tracemalloc.reset_peak "
+                             "(Python 3.9 or newer)")
+        self.memory = memory
+        self.calls = []
+        # The offset from the clock to the time since the epoch, for
+        # the timestamps of the trace events
+        self._epoch = time.time() - _clock()
+        self._lock = threading.Lock()
+        self._active = []
+        if memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def reset(self):
+        """Discard the measurements"""
+        with self._lock:
+            self.calls = []
+
+    def _update_peak(self):
+        # The memory peak since the last task started or finished is
+        # attributed to all of the running tasks
+        current, peak = tracemalloc.get_traced_memory()
+        for call in self._active:
+            call.peak_memory = max(call.peak_memory, peak - call.start_memory)
+        tracemalloc.reset_peak()
+        return current
+
+    def _begin(self, task):
+        call = _Call(task._profiler_path)
+        if _thread_time is not None:
+            call.cpu = _thread_time()
+        if self.memory:
+            with self._lock:
+                call.start_memory = self._update_peak()
+                call.peak_memory = 0
+                self._active.append(call)
+        return call
+
+    def _end(self, call):
+        if _thread_time is not None:
+            call.cpu = _thread_time() - call.cpu
+        call.end = _clock()
+        with self._lock:
+            if self.memory:
+                self._update_peak()
+                self._active.remove(call)
+            self.calls.append(call)
+
+    def call(self, task, options, kwds):
+        """Execute a task, and record its measurements"""
+        call = self._begin(task)
+        task._profiler_call = call
+        try:
+            start = _clock()
+            task._call_init(*options, **kwds)
+            inputs = _clock()
+            task._execute()
+            execute = _clock()
+            ans = task._call_fini(*options, **kwds)
+            call.phases[0:0] = [('inputs', start, inputs),
+                                ('execute', inputs, execute),
+                                ('outputs', execute, _clock())]
+        finally:
+            task._profiler_call = None
+            self._end(call)
+        return ans
+
+    def compute_value(self, task, port):
+        """Compute the value of an input port, and record the transfer time"""
+        start = _clock()
+        port.compute_value()
+        call = getattr(task, '_profiler_call', None)
+        if call is not None:
+            call.phases.append(('inputs.' + port.name, start, _clock()))
+
+    def timer(self):
+        """
+        Return a HierarchicalTimer with the total times of the task
+        calls and their phases.  The timers of the tasks in a workflow
+        are nested in the timer of the workflow's execute phase.
+        """
+        timer = HierarchicalTimer()
+        with self._lock:
+            calls = list(self.calls)
+        #
+        # Create the timers of the outer workflows before the timers of
+        # their tasks, so they are listed in the order that they
+        # started
+        #
+        for call in sorted(calls, key=lambda c: (c.start, len(c.path))):
+            identifier = _timer_identifier(call.path)
+            timer.add_time(identifier, call.end - call.start)
+            for name, start, end in call.phases:
+                # The port transfers are nested in the inputs phase
+                timer.add_time(identifier + tuple(name.split('.')),
+                               end - start)
+        return timer
+
+    def summary(self):
+        """
+        Return an OrderedDict that maps the path of each task (a tuple
+        of the workflow and task names) to a dict with its number of
+        calls, and its total wall time, CPU time and peak memory.
+        """
+        ans = OrderedDict()
+        with self._lock:
+            calls = list(self.calls)
+        for call in sorted(calls, key=lambda c: c.start):
+            info = ans.get(call.path)
+            if info is None:
+                info = ans[call.path] = {'calls': 0, 'wall': 0.0,
+                                         'cpu': 0.0, 'peak_memory': None}
+            info['calls'] += 1
+            info['wall'] += call.end - call.start
+            if call.cpu is None or info['cpu'] is None:
+                info['cpu'] = None
+            else:
+                info['cpu'] += call.cpu
+            if call.peak_memory is not None:
+                info['peak_memory'] = max(info['peak_memory'] or 0,
+                                          call.peak_memory)
+        return ans
+
+    def report(self):
+        """Return the timer and the per-task summary as a string"""
+        lines = [str(self.timer())]
+        summary = self.summary()
+        width = max([len('Task')] + [len('.'.join(path)) for path in summary])
+        fmt = '%-' + str(width) + 's %9s %9s %9s %12s'
+        lines.append(fmt % ('Task', 'ncalls', 'wall', 'cpu', 'peak memory'))
+        lines.append('-' * (width + 43))
+        for path, info in summary.items():
+            lines.append(fmt % (
+                '.'.join(path), info['calls'], '%.3f' % info['wall'],
+                'n/a' if info['cpu'] is None else '%.3f' % info['cpu'],
+                'n/a' if info['peak_memory'] is None else
+                '%.1f kB' % (info['peak_memory'] / 1024.0)))
+        return '\n'.join(lines) + '\n'
+
+    def chrome_trace(self):
+        """
+        Return the task calls as a dict in the Chrome trace event
+        format.  Each call is a complete ('X') event in the thread that
+        executed it, with nested events for its phases.
+        """
+        pid = os.getpid()
+        events = []
+        with self._lock:
+            calls = list(self.calls)
+        for call in calls:
+            args = {'path': '.'.join(call.path)}
+            if call.cpu is not None:
+                args['cpu'] = call.cpu
+            if call.peak_memory is not None:
+                args['peak_memory'] = call.peak_memory
+            events.append(_event(call.path[-1], 'task',
+                                 call.start + self._epoch,
+                                 call.end - call.start, pid, call.thread,
+                                 args))
+            for name, start, end in call.phases:
+                events.append(_event(name, 'phase', start + self._epoch,
+                                     end - start, pid, call.thread, {}))
+        events.sort(key=lambda e: (e['ts'], -e['dur']))
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def write_chrome_trace(self, filename):
+        """Write the Chrome trace events to a JSON file"""
+        with open(filename, 'w') as OUTPUT:
+            json.dump(self.chrome_trace(), OUTPUT)
+
+
+def _event(name, category, start, duration, pid, tid, args):
+    return {'name': name,
+            'cat': category,
+            'ph': 'X',
+            'ts': start * 1e6,
+            'dur': duration * 1e6,
+            'pid': pid,
+            'tid': tid,
+            'args': args}
+
+
+def _timer_identifier(path):
+    # Nested tasks are timed in the 'execute' phase of the enclosing
+    # workflow
+    identifier = [path[0]]
+    for name in path[1:]:
+        identifier.append('execute')
+        identifier.append(name)
+    return tuple(identifier)
@@ -0,0 +1,127 @@
+#  _________________________________________________________________________
+#
+#  PyUtilib: A Python utility library.
+#  Copyright (c) 2008 Sandia Corporation.
+#  This software is distributed under the BSD License.
+#  Under the terms of Contract DE-AC04-94AL85000 with Sandia Corporation,
+#  the U.S. Government retains certain rights in this software.
+#  _________________________________________________________________________
+#
+# Streaming values for task ports (see the 'stream' option of
+# Ports.declare).
+#
+
+__all__ = ['Stream']
+
+import sys
+import threading
+
+if sys.version_info >= (3, 0):
+    import queue as Queue
+else:
+    import Queue
+
+# The number of chunks that are buffered.  Items are passed between
+# threads in chunks, which is much faster than passing them one at a
+# time.
+_CHUNKS = 8
+
+
+class _StreamEnd(object):
+    """The last chunk in a stream queue"""
+
+    def __init__(self, error=None):
+        self.error = error
+
+
+def _put(queue, chunk, closed):
+    # Put a chunk into the queue, unless the consumer closes the stream
+    while not closed.is_set():
+        try:
+            queue.put(chunk, timeout=0.1)
+            return True
+        except Queue.Full:
+            pass
+    return False
+
+
+def _pump(iterable, queue, chunk_size, closed):
+    chunk = []
+    try:
+        for item in iterable:
+            chunk.append(item)
+            if len(chunk) == chunk_size:
+                if not _put(queue, chunk, closed):
+                    return
+                chunk = []
+    except Exception:
+        if len(chunk) == 0 or _put(queue, chunk, closed):
+            _put(queue, _StreamEnd(sys.exc_info()[1]), closed)
+        return
+    if len(chunk) == 0 or _put(queue, chunk, closed):
+        _put(queue, _StreamEnd(), closed)
+
+
+class Stream(object):
+    """
+    An iterator over the items of an iterable, which is iterated in a
+    background thread.
+
+    The items are passed to the consumer through a bounded buffer: when
+    about buffer_size items are waiting to be consumed, the background
+    thread waits (backpressure).  So a generator that produces a large
+    number of items runs concurrently with the consumer, and the
+    memory used is proportional to buffer_size.  An exception raised by
+    the iterable is raised by the consumer after the items that
+    preceded it.
+
+    If the consumer stops before the end of the stream, it should call
+    close() to stop the background thread.
+    """
+
+    def __init__(self, iterable, buffer_size=1024):
+        if buffer_size < 1:
+            raise ValueError("The stream buffer size must be positive")
+        self.buffer_size = buffer_size
+        chunk_size = max(1, buffer_size // _CHUNKS)
+        self._queue = Queue.Queue(maxsize=max(1, buffer_size // chunk_size))
+        self._closed = threading.Event()
+        self._chunk = iter(())
+        self._end = False
+        self._thread = threading.Thread(
+            target=_pump,
+            args=(iter(iterable), self._queue, chunk_size, self._closed))
+        self._thread.daemon = True
+        self._thread.start()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        while True:
+            for item in self._chunk:
+                return item
+            if self._end:
+                raise StopIteration
+            chunk = self._queue.get()
+            if isinstance(chunk, _StreamEnd):
+                self._end = True
+                self._chunk = iter(())
+                if chunk.error is not None:
+                    raise chunk.error
+                raise StopIteration
+            self._chunk = iter(chunk)
+
+    next = __next__
+
+    def close(self):
+        """Stop the background thread and discard the buffered items"""
+        self._closed.set()
+        self._end = True
+        self._chunk = iter(())
+
+    def __del__(self):
+        self.close()
+
+    def __repr__(self):
+        return "<Stream buffer_size=%d>" % self.buffer_size
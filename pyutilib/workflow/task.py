@@ -16,6 +16,7 @@ import pprint
 import weakref
 from pyutilib.misc import Options
 from pyutilib.workflow import globals
+from pyutilib.workflow.stream import Stream
 
 
 class Task(object):
@@ -23,6 +24,9 @@ class Task(object):
     A Task object represents a single action in a workflow.
     """
 
+    # If True, Workflow.set_cache() sets the cache of this task
+    cacheable = False
+
     def __init__(self, id=None, name=None, parser=None):
         """Constructor."""
         if not id is None:
@@ -45,6 +49,8 @@ class Task(object):
         self.output_controls = OutputPorts(self)
         self.output_controls.set_name(self.name + '-output-controls')
         self.debug = False
+        self._cache = None
+        self._profiler = None
 
     def add_resource(self, resource):
         """Add a resource that is required for this task to execute."""
@@ -54,6 +60,34 @@ class Task(object):
         """Return the specified resource object."""
         return self._resources[name]
 
+    def set_cache(self, cache):
+        """
+        Set the TaskCache that stores the outputs of this task (or None
+        to disable caching).  The outputs are loaded from the cache when
+        the task is executed with the same inputs as before.
+        """
+        self._cache = cache
+
+    def set_profiler(self, profiler, path=()):
+        """
+        Set the WorkflowProfiler that records the calls of this task
+        (or None to disable profiling).  The path is the sequence of
+        names of the workflows that contain this task.
+        """
+        self._profiler = profiler
+        self._profiler_path = tuple(path) + (self.name,)
+
+    def _cache_code(self):
+        """Return the function whose code identifies this task in a cache."""
+        return self.__class__.execute
+
+    def _get_cache_state(self):
+        return dict((i, getattr(self, i)) for i in self.outputs)
+
+    def _set_cache_state(self, state):
+        for i in state:
+            setattr(self, i, state[i])
+
     def next_tasks(self):
         """Return the set of tasks that succeed this task in the workflow."""
         return set(t.to_port.task()
@@ -97,6 +131,10 @@ class Task(object):
     def ready(self):
         if self.busy():
             return False
+        return self.inputs_ready()
+
+    def inputs_ready(self):
+        """Return True if the inputs and input controls of this task are ready."""
         for name in self.inputs:
             #print "XYZ",self.name, name, self.inputs[name].ready(),self.inputs[name]._ready
             #for connection in self.inputs[name].input_connections:
@@ -121,10 +159,18 @@ class Task(object):
         Copy the inputs into this Task's dictionary, then execute the task, then copy
         the outputs out of the dictionary.
         """
+        if self._profiler is not None:
+            return self._profiler.call(self, options, kwds)
         self._call_init(*options, **kwds)
-        self.execute()
+        self._execute()
         return self._call_fini(*options, **kwds)
 
+    def _execute(self):
+        if self._cache is None:
+            self.execute()
+        else:
+            self._cache.execute(self)
+
     def _call_init(self, *options, **kwds):
         self._call_start()
         busy = self.busy_resources()
@@ -144,14 +190,21 @@ class Task(object):
         for i in self.inputs:
             #print "OIUOX",i,self.inputs[i].get_value(),str(self.inputs[i])
             # TODO: validate that non-optional inputs have a value other than None
-            self.inputs[i].compute_value()
+            if self._profiler is None:
+                self.inputs[i].compute_value()
+            else:
+                self._profiler.compute_value(self, self.inputs[i])
             setattr(self, i, self.inputs[i].get_value())
 
     def _call_fini(self, *options, **kwds):
         for i in self.outputs:
             #print "Z",i,getattr(self.outputs,i).get_value()
             # TODO: validate that non-optional outputs have a value other than None
-            self.outputs[i].set_value(getattr(self, i))
+            value = getattr(self, i)
+            if self.outputs[i].stream is not None and value is not None and \
+               not isinstance(value, Stream):
+                value = Stream(value, self.outputs[i].stream)
+            self.outputs[i].set_value(value)
 
         for name, res in self._resources.items():
             res.unlock()
@@ -297,6 +350,11 @@ def define_connection(cls, from_port, to_port):
     #
     # Raise an exception if the port action is store and there already exists a connection.
     #
+    if from_port.stream is not None and len(from_port.output_connections) == 1:
+        raise ValueError(
+            "Cannot connect to task %s port %s from task %s port %s. This is a streaming port, which can only be connected to one port"
+            % (to_port.task().name, to_port.name, from_port.task().name,
+               from_port.name))
     if to_port.action == 'store' and len(to_port.input_connections) == 1:
         raise ValueError(
             "Cannot connect to task %s port %s from task %s port %s. This port is already connected from task %s port %s"
@@ -322,8 +380,15 @@ class Port(object):
                  action=None,
                  constant=False,
                  default=None,
-                 doc=None):
-        """Constructor."""
+                 doc=None,
+                 stream=None):
+        """Constructor.
+
+        If stream is not None, then the values of this output port are
+        iterated in a separate thread, and they are passed to the
+        connected task as a Stream with this buffer size.  A streaming
+        port can be connected to one input port.
+        """
         self.name = name
         # tasks are stored as weak refs, to prevent issues with cyclic dependencies and the garbage collector.
         self.task = weakref.ref(task)
@@ -339,6 +404,13 @@ class Port(object):
         self._ready = False
         self.default = default
         self.doc = doc
+        if stream is True:
+            stream = 1024
+        elif stream is False:
+            stream = None
+        if stream is not None and stream < 1:
+            raise ValueError("The stream buffer size of port %s must be positive" % name)
+        self.stream = stream
 
     def reset(self):
         self._ready = False
@@ -493,7 +565,8 @@ class Ports(dict):
                 action=None,
                 constant=False,
                 default=None,
-                doc=None):
+                doc=None,
+                stream=None):
         """Declare a port."""
         port = Port(
             name,
@@ -502,7 +575,8 @@ class Ports(dict):
             action=action,
             constant=constant,
             default=default,
-            doc=doc)
+            doc=doc,
+            stream=stream)
         setattr(self, name, port)
         return port
 
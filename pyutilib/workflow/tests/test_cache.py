@@ -0,0 +1,269 @@
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+
+import pyutilib.th as unittest
+import pyutilib.workflow
+from pyutilib.workflow import TaskCache, FunctorAPIData, functor_api
+
+calls = []
+
+
+@functor_api
+def cache_scale(data, factor=None):
+    """
+    Required:
+        data: input data
+        factor: scale factor
+    Return:
+        y: the scaled value
+    """
+    calls.append('scale')
+    data.scaled = True
+    return FunctorAPIData(y=data.x * factor)
+
+
+@functor_api
+def cache_offset(data, y=None):
+    """
+    Required:
+        data: input data
+        y: a value
+    Return:
+        z: the shifted value
+    """
+    calls.append('offset')
+    return FunctorAPIData(z=y + data.offset)
+
+
+class TaskAdd(pyutilib.workflow.Task):
+
+    cacheable = True
+
+    def __init__(self, *args, **kwds):
+        pyutilib.workflow.Task.__init__(self, *args, **kwds)
+        self.inputs.declare('x')
+        self.inputs.declare('y')
+        self.outputs.declare('z')
+
+    def execute(self):
+        calls.append(self.name)
+        self.z = self.x + self.y
+
+
+class TaskNeg(pyutilib.workflow.Task):
+
+    cacheable = True
+
+    def __init__(self, *args, **kwds):
+        pyutilib.workflow.Task.__init__(self, *args, **kwds)
+        self.inputs.declare('b')
+        self.outputs.declare('z')
+
+    def execute(self):
+        calls.append(self.name)
+        self.z = -self.b
+
+
+class TaskCount(pyutilib.workflow.Task):
+
+    def __init__(self, *args, **kwds):
+        pyutilib.workflow.Task.__init__(self, *args, **kwds)
+        self.inputs.declare('items')
+        self.outputs.declare('n')
+
+    def execute(self):
+        calls.append(self.name)
+        self.n = len(self.items)
+
+
+class TaskMember(pyutilib.workflow.Task):
+
+    cacheable = True
+
+    def __init__(self, *args, **kwds):
+        pyutilib.workflow.Task.__init__(self, *args, **kwds)
+        self.inputs.declare('x')
+        self.inputs.declare('tags')
+        self.outputs.declare('z')
+
+    def execute(self):
+        self.z = self.x in {'alpha', 'beta', 'gamma', 'delta'}
+
+
+class Tags(object):
+
+    def __init__(self, names):
+        self.names = set(names)
+
+
+def member_key(directory):
+    """Return the cache key of a TaskMember (see test_hash_seed)"""
+    T = TaskMember()
+    T.x = set(['alpha', 'beta', 'gamma', 'delta'])
+    T.tags = Tags(['one', 'two', 'three', 'four'])
+    return TaskCache(directory).key(T)
+
+
+class Test(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        del calls[:]
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_functor(self):
+        cache = TaskCache(self.tmpdir)
+        cache_scale.set_cache(cache)
+        try:
+            options = FunctorAPIData(x=2)
+            retval = cache_scale(options, factor=3)
+            self.assertEqual(retval.y, 6)
+            self.assertTrue(options.scaled)
+            options = FunctorAPIData(x=2)
+            retval = cache_scale(options, factor=3)
+            self.assertEqual(retval.y, 6)
+            # The function was not called, so the data is not modified
+            # in place.  The cached copy of the data is returned.
+            self.assertEqual(calls, ['scale'])
+            self.assertFalse('scaled' in options.__dict__)
+            self.assertTrue(retval.data.scaled)
+            retval = cache_scale(options, factor=4)
+            self.assertEqual(retval.y, 8)
+            self.assertEqual(calls, ['scale', 'scale'])
+            self.assertEqual((cache.hits, cache.misses), (1, 2))
+            self.assertEqual(len(cache), 2)
+        finally:
+            cache_scale.set_cache(None)
+
+    def test_functor_workflow(self):
+        cache_offset.inputs.y = cache_scale.outputs.y
+        cache_offset.inputs.data = cache_scale.outputs.data
+        w = pyutilib.workflow.Workflow()
+        w.add(cache_offset)
+        w.set_cache(TaskCache(self.tmpdir))
+        try:
+            self.assertEqual(w(data=dict(x=2, offset=1), factor=3).z, 7)
+            self.assertEqual(w(data=dict(x=2, offset=1), factor=3).z, 7)
+            self.assertEqual(calls, ['scale', 'offset'])
+            self.assertEqual(w(data=dict(x=2, offset=1), factor=4).z, 9)
+            self.assertEqual(calls, ['scale', 'offset'] * 2)
+        finally:
+            w.set_cache(None)
+
+    def test_incremental(self):
+        # Only the tasks whose inputs change are executed again
+        A = TaskAdd(name='A')
+        B = TaskNeg(name='B')
+        C = TaskAdd(name='C')
+        D = TaskCount(name='D')
+        C.inputs.x = A.outputs.z
+        C.inputs.y = B.outputs.z
+        w = pyutilib.workflow.Workflow()
+        w.add(C)
+        w.add(D)
+        w.set_cache(TaskCache(self.tmpdir))
+        self.assertEqual(w(x=1, y=2, b=1, items=[1])['z'], 2)
+        self.assertEqual(sorted(calls), ['A', 'B', 'C', 'D'])
+        del calls[:]
+        self.assertEqual(w(x=1, y=2, b=1, items=[1])['z'], 2)
+        # TaskCount is not cacheable
+        self.assertEqual(calls, ['D'])
+        del calls[:]
+        self.assertEqual(w(x=1, y=5, b=1, items=[1])['z'], 5)
+        self.assertEqual(sorted(calls), ['A', 'C', 'D'])
+        del calls[:]
+        # A and C have the same code, so the output of C for the
+        # inputs (1, 2) is already known
+        self.assertEqual(w(x=0, y=3, b=1, items=[1])['z'], 2)
+        self.assertEqual(sorted(calls), ['A', 'D'])
+
+    def test_persistent(self):
+        A = TaskAdd(name='A')
+        A.set_cache(TaskCache(self.tmpdir))
+        self.assertEqual(A(x=1, y=2).z, 3)
+        A.set_cache(TaskCache(self.tmpdir))
+        self.assertEqual(A(x=1, y=2).z, 3)
+        self.assertEqual(calls, ['A'])
+
+    def test_lru(self):
+        cache = TaskCache(self.tmpdir)
+        cache.put('a', 'x' * 100)
+        entry_size = cache.size
+        cache.put('b', 'x' * 100)
+        cache.put('c', 'x' * 100)
+        self.assertEqual(cache.get('a'), (True, 'x' * 100))
+        # 'b' is the least recently used entry
+        cache = TaskCache(self.tmpdir, max_size=2 * entry_size)
+        self.assertEqual(len(cache), 2)
+        self.assertFalse('b' in cache)
+        self.assertFalse(os.path.exists(os.path.join(self.tmpdir, 'b.pkl')))
+        cache.put('d', 'x' * 100)
+        self.assertEqual(sorted(cache._entries), ['a', 'd'])
+        self.assertEqual(cache.get('c'), (False, None))
+        cache.clear()
+        self.assertEqual(len(cache), 0)
+        self.assertEqual(os.listdir(self.tmpdir), [])
+
+    def test_key(self):
+        cache = TaskCache(self.tmpdir)
+        A = TaskAdd()
+        B = TaskAdd()
+        A.x, A.y = {'a': 1, 'b': [1, 2]}, 1
+        B.x, B.y = {'b': [1, 2], 'a': 1}, 1
+        self.assertEqual(cache.key(A), cache.key(B))
+        B.y = 1.0
+        self.assertNotEqual(cache.key(A), cache.key(B))
+        B.y = set([1, 2])
+        A.y = set([2, 1])
+        self.assertEqual(cache.key(A), cache.key(B))
+        C = TaskCount()
+        C.items = A.x
+        self.assertNotEqual(cache.key(A), cache.key(C))
+
+    def test_hash_seed(self):
+        # The keys are the same in interpreters with different hash seeds
+        root = os.path.dirname(os.path.dirname(os.path.dirname(
+            os.path.abspath(pyutilib.workflow.__file__))))
+        keys = set()
+        for seed in ('1', '2', '3', '4'):
+            env = dict(os.environ)
+            env['PYTHONHASHSEED'] = seed
+            env['PYTHONPATH'] = os.pathsep.join(
+                [root] + [path for path in [env.get('PYTHONPATH')] if path])
+            output = subprocess.check_output(
+                [sys.executable, '-c',
+                 'import sys; from pyutilib.workflow.tests.test_cache '
+                 'import member_key; '
+                 'sys.stdout.write(str(member_key(sys.argv[1])))',
+                 self.tmpdir], env=env)
+            keys.add(output.decode().strip())
+        self.assertEqual(len(keys), 1)
+        self.assertEqual(keys, set([member_key(self.tmpdir)]))
+
+    def test_uncacheable(self):
+        # Inputs that cannot be pickled are not cached
+        cache = TaskCache(self.tmpdir)
+        D = TaskCount(name='D')
+        D.set_cache(cache)
+        lock = threading.Lock()
+        D(items=[lock])
+        D(items=[lock])
+        self.assertEqual(calls, ['D', 'D'])
+        self.assertEqual(len(cache), 0)
+
+    def test_error(self):
+        try:
+            TaskCache(self.tmpdir, max_size=-1)
+            self.fail("Expected ValueError because the size is negative")
+        except ValueError:
+            pass
+
+
+if __name__ == "__main__":
+    unittest.main()
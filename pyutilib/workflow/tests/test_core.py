@@ -1,5 +1,7 @@
 import os
 import sys
+import threading
+import time
 from os.path import abspath, dirname
 currdir = dirname(abspath(__file__)) + os.sep
 
@@ -546,5 +548,134 @@ Task7 prev: [1] next: [] resources: []""")
             pass
 
 
+class TaskSleep(pyutilib.workflow.Task):
+    # Records the maximum number of tasks that run at the same time
+
+    lock = threading.Lock()
+    active = 0
+    max_active = 0
+
+    def __init__(self, *args, **kwds):
+        pyutilib.workflow.Task.__init__(self, *args, **kwds)
+        self.inputs.declare('x')
+        self.outputs.declare('y')
+
+    def execute(self):
+        with TaskSleep.lock:
+            TaskSleep.active += 1
+            TaskSleep.max_active = max(TaskSleep.max_active,
+                                       TaskSleep.active)
+        time.sleep(0.05)
+        with TaskSleep.lock:
+            TaskSleep.active -= 1
+        self.y = self.x + 1
+
+
+class TaskFail(pyutilib.workflow.Task):
+
+    def __init__(self, *args, **kwds):
+        pyutilib.workflow.Task.__init__(self, *args, **kwds)
+        self.inputs.declare('x')
+        self.outputs.declare('y')
+
+    def execute(self):
+        raise RuntimeError("task failed")
+
+
+@unittest.skipIf(not pyutilib.workflow.workflow.futures_available,
+                 "concurrent.futures is not available")
+class TestConcurrent(unittest.TestCase):
+
+    def setUp(self):
+        TaskSleep.active = 0
+        TaskSleep.max_active = 0
+
+    def wide_workflow(self, n, executor, resource=None):
+        # n independent tasks that are summed by a final task.  (Ports
+        # refer to tasks with weak references.)
+        S = TaskAA1()
+        self.tasks = [TaskSleep() for i in range(n)]
+        for T in self.tasks:
+            if resource is not None:
+                T.add_resource(resource)
+            S.inputs.x = T.outputs.y
+        w = pyutilib.workflow.Workflow(executor=executor, max_workers=n)
+        w.add(S)
+        return w
+
+    def test_results(self):
+        pyutilib.workflow.globals.reset_id_counter()
+        A = TaskA()
+        B = TaskB()
+        C = TaskC()
+        A.inputs.x = B.outputs.b
+        A.inputs.y = C.outputs.o
+        w = pyutilib.workflow.Workflow(executor='thread')
+        w.add(A)
+        self.assertEqual(w(i=3, a=2), {'z': 334})
+        self.assertEqual(w(i=1, a=1), {'z': 112})
+
+    def test_concurrent(self):
+        w = self.wide_workflow(8, 'thread')
+        start = time.time()
+        self.assertEqual(w(x=1), {'z': 16})
+        self.assertTrue(time.time() - start < 8 * 0.05)
+        self.assertTrue(TaskSleep.max_active > 1)
+
+    def test_executor(self):
+        executor = pyutilib.workflow.workflow.futures.ThreadPoolExecutor(4)
+        try:
+            w = self.wide_workflow(8, executor)
+            self.assertEqual(w(x=2), {'z': 24})
+            self.assertEqual(TaskSleep.max_active, 4)
+        finally:
+            executor.shutdown()
+
+    def test_resource(self):
+        resource = pyutilib.workflow.Resource()
+        w = self.wide_workflow(4, 'thread', resource=resource)
+        self.assertEqual(w(x=1), {'z': 8})
+        self.assertEqual(TaskSleep.max_active, 1)
+        self.assertTrue(resource.available())
+
+    def test_busy_resource(self):
+        # Tasks that wait for a resource that is locked outside of the
+        # workflow are not executed
+        w = self.wide_workflow(2, 'thread', resource=DummyResource())
+        try:
+            w(x=1)
+            self.fail("Expected ValueError because the inputs are not defined")
+        except ValueError:
+            pass
+        self.assertEqual(TaskSleep.max_active, 0)
+
+    def test_error(self):
+        S = TaskAA1()
+        T = TaskSleep()
+        F = TaskFail()
+        S.inputs.x = T.outputs.y
+        S.inputs.x = F.outputs.y
+        w = pyutilib.workflow.Workflow(executor='thread')
+        w.add(S)
+        try:
+            w(x=1)
+            self.fail("Expected RuntimeError from the failed task")
+        except RuntimeError as e:
+            self.assertEqual(str(e), "task failed")
+
+    def test_bad_executor(self):
+        w = pyutilib.workflow.Workflow()
+        try:
+            w.set_executor('process')
+            self.fail("Expected ValueError because tasks cannot be pickled")
+        except ValueError:
+            pass
+        try:
+            w.set_executor('foo')
+            self.fail("Expected ValueError because the executor is unknown")
+        except ValueError:
+            pass
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,143 @@
+import json
+import os
+import time
+from os.path import abspath, dirname
+currdir = dirname(abspath(__file__)) + os.sep
+
+import pyutilib.th as unittest
+import pyutilib.workflow
+import pyutilib.workflow.profiler
+from pyutilib.workflow import WorkflowProfiler
+
+
+class TaskA(pyutilib.workflow.Task):
+
+    def __init__(self, *args, **kwds):
+        pyutilib.workflow.Task.__init__(self, *args, **kwds)
+        self.inputs.declare('x')
+        self.inputs.declare('y')
+        self.outputs.declare('z')
+
+    def execute(self):
+        time.sleep(0.01)
+        # Allocate about 800 kB
+        self.data = [0] * 100000
+        self.z = self.x + self.y
+
+
+class TaskFail(TaskA):
+
+    def execute(self):
+        raise RuntimeError("task failed")
+
+
+class Test(unittest.TestCase):
+
+    def workflow(self, profiler):
+        # outer: inner: (A, B) -> C
+        self.tasks = [TaskA(name=name) for name in 'ABC']
+        A, B, C = self.tasks
+        C.inputs.x = A.outputs.z
+        C.inputs.y = B.outputs.z
+        inner = pyutilib.workflow.Workflow(name='inner')
+        inner.add(C)
+        w = pyutilib.workflow.Workflow(name='outer')
+        w.add(inner)
+        w.set_profiler(profiler)
+        return w
+
+    def test_summary(self):
+        profiler = WorkflowProfiler()
+        w = self.workflow(profiler)
+        self.assertEqual(w(x=1, y=2).z, 6)
+        self.assertEqual(w(x=1, y=2).z, 6)
+        summary = profiler.summary()
+        self.assertEqual(sorted(summary), [('outer',), ('outer', 'inner'),
+                                         ('outer', 'inner', 'A'),
+                                         ('outer', 'inner', 'B'),
+                                         ('outer', 'inner', 'C')])
+        for info in summary.values():
+            self.assertEqual(info['calls'], 2)
+            self.assertTrue(info['wall'] >= 0.02)
+            self.assertEqual(info['peak_memory'], None)
+        self.assertTrue(summary[('outer',)]['wall'] >= 0.06)
+        report = profiler.report()
+        self.assertTrue('outer.inner.C' in report)
+        profiler.reset()
+        self.assertEqual(len(profiler.summary()), 0)
+
+    def test_timer(self):
+        profiler = WorkflowProfiler()
+        w = self.workflow(profiler)
+        w(x=1, y=2)
+        timer = profiler.timer()
+        self.assertEqual(timer.get_num_calls('outer'), 1)
+        self.assertEqual(
+            timer.get_num_calls('outer.execute.inner.execute.A'), 1)
+        self.assertTrue(timer.get_total_time(
+            'outer.execute.inner.execute.A.execute') >= 0.01)
+        # The input port transfers
+        self.assertEqual(
+            timer.get_num_calls('outer.execute.inner.execute.C.inputs.x'), 1)
+        self.assertTrue('inner' in str(timer))
+
+    def test_threads(self):
+        profiler = WorkflowProfiler()
+        w = self.workflow(profiler)
+        w.set_executor('thread')
+        w(x=1, y=2)
+        self.assertEqual(len(profiler.summary()), 5)
+
+    def test_chrome_trace(self):
+        profiler = WorkflowProfiler()
+        w = self.workflow(profiler)
+        w(x=1, y=2)
+        trace = profiler.chrome_trace()
+        events = trace['traceEvents']
+        names = [e['name'] for e in events if e['cat'] == 'task']
+        # A and B can be executed in either order
+        self.assertEqual(names[:2] + sorted(names[2:4]) + names[4:],
+                         ['outer', 'inner', 'A', 'B', 'C'])
+        for e in events:
+            self.assertEqual(e['ph'], 'X')
+            self.assertTrue(e['dur'] >= 0)
+            # The timestamps are microseconds since the epoch
+            self.assertTrue(abs(e['ts'] / 1e6 - time.time()) < 60)
+        # The phases of a task are nested in its event
+        A = [e for e in events if e['name'] == 'A'][0]
+        execute = [e for e in events if e['name'] == 'execute'
+                   and A['ts'] <= e['ts'] < A['ts'] + A['dur']]
+        self.assertTrue(len(execute) >= 1)
+        self.assertTrue(execute[0]['ts'] + execute[0]['dur'] <=
+                        A['ts'] + A['dur'] + 1)
+        profiler.write_chrome_trace(currdir + 'trace.out')
+        with open(currdir + 'trace.out') as INPUT:
+            self.assertEqual(len(json.load(INPUT)['traceEvents']),
+                             len(events))
+        os.remove(currdir + 'trace.out')
+
+    @unittest.skipIf(not pyutilib.workflow.profiler.memory_available,
+                     "tracemalloc.reset_peak is not available")
+    def test_memory(self):
+        profiler = WorkflowProfiler(memory=True)
+        w = self.workflow(profiler)
+        w(x=1, y=2)
+        summary = profiler.summary()
+        for info in summary.values():
+            self.assertTrue(info['peak_memory'] >= 700000)
+        self.assertTrue('kB' in profiler.report())
+
+    def test_error(self):
+        profiler = WorkflowProfiler()
+        task = TaskFail(name='F')
+        task.set_profiler(profiler)
+        try:
+            task(x=1, y=2)
+            self.fail("Expected RuntimeError from the task")
+        except RuntimeError:
+            pass
+        self.assertEqual(profiler.summary()[('F',)]['calls'], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,139 @@
+import threading
+
+import pyutilib.th as unittest
+import pyutilib.workflow
+from pyutilib.workflow import Stream
+
+
+class Producer(pyutilib.workflow.Task):
+    # Generates n records, and records the maximum number of records
+    # that were produced but not consumed
+
+    def __init__(self, *args, **kwds):
+        pyutilib.workflow.Task.__init__(self, *args, **kwds)
+        self.inputs.declare('n')
+        self.outputs.declare('records', stream=64)
+        self.produced = 0
+        self.consumed = 0
+        self.max_pending = 0
+        self.thread = None
+
+    def generate(self, n):
+        self.thread = threading.current_thread()
+        for i in range(n):
+            self.produced += 1
+            self.max_pending = max(self.max_pending,
+                                   self.produced - self.consumed)
+            yield i
+
+    def execute(self):
+        self.records = self.generate(self.n)
+
+
+class FailingProducer(Producer):
+
+    def generate(self, n):
+        for i in range(n):
+            yield i
+        raise RuntimeError("producer failed")
+
+
+class Consumer(pyutilib.workflow.Task):
+
+    def __init__(self, producer, *args, **kwds):
+        pyutilib.workflow.Task.__init__(self, *args, **kwds)
+        self.inputs.declare('records')
+        self.outputs.declare('total')
+        self.producer = producer
+        self.thread = None
+
+    def execute(self):
+        self.thread = threading.current_thread()
+        self.total = 0
+        for record in self.records:
+            self.producer.consumed += 1
+            self.total += record
+
+
+class Test(unittest.TestCase):
+
+    def pipeline(self, producer_class=Producer, executor=None):
+        self.producer = producer_class()
+        self.consumer = Consumer(self.producer)
+        self.consumer.inputs.records = self.producer.outputs.records
+        w = pyutilib.workflow.Workflow(executor=executor)
+        w.add(self.consumer)
+        return w
+
+    def test_stream(self):
+        s = Stream(range(1000), buffer_size=16)
+        self.assertEqual(list(s), list(range(1000)))
+        self.assertEqual(list(s), [])
+        s = Stream([], buffer_size=1)
+        self.assertEqual(list(s), [])
+
+    def test_pipeline(self):
+        w = self.pipeline()
+        self.assertEqual(w(n=10000).total, sum(range(10000)))
+        # The producer runs in a separate thread
+        self.assertFalse(self.producer.thread is None)
+        self.assertFalse(self.producer.thread is self.consumer.thread)
+        # The buffer holds at most 64 records, plus the chunk that is
+        # being filled and the chunk that is being consumed
+        self.assertTrue(self.producer.max_pending <= 64 + 2 * 8,
+                        self.producer.max_pending)
+
+    def test_pipeline_threads(self):
+        w = self.pipeline(executor='thread')
+        self.assertEqual(w(n=1000).total, sum(range(1000)))
+
+    def test_output(self):
+        # A stream that is an output of the workflow is returned to the
+        # caller
+        producer = Producer()
+        w = pyutilib.workflow.Workflow()
+        w.add(producer)
+        ans = w(n=100)
+        self.assertTrue(isinstance(ans.records, Stream))
+        self.assertEqual(list(ans.records), list(range(100)))
+
+    def test_error(self):
+        w = self.pipeline(FailingProducer)
+        try:
+            w(n=1000)
+            self.fail("Expected RuntimeError from the producer")
+        except RuntimeError as e:
+            self.assertEqual(str(e), "producer failed")
+        s = Stream(FailingProducer().generate(10))
+        self.assertEqual(next(s), 0)
+        s.close()
+        self.assertEqual(list(s), [])
+
+    def test_fanout(self):
+        producer = Producer()
+        consumer1 = Consumer(producer)
+        consumer2 = Consumer(producer)
+        consumer1.inputs.records = producer.outputs.records
+        try:
+            consumer2.inputs.records = producer.outputs.records
+            self.fail("Expected ValueError because a streaming port can "
+                      "only be connected to one port")
+        except ValueError:
+            pass
+
+    def test_bad_buffer_size(self):
+        task = pyutilib.workflow.Task()
+        try:
+            task.outputs.declare('x', stream=0)
+            self.fail("Expected ValueError because of the buffer size")
+        except ValueError:
+            pass
+        try:
+            Stream([], buffer_size=0)
+            self.fail("Expected ValueError because of the buffer size")
+        except ValueError:
+            pass
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -17,7 +17,7 @@ __all__ = ['Workflow']
 
 import argparse
 from collections import deque
-from six import iterkeys
+from six import iterkeys, itervalues
 
 from pyutilib.workflow.task import Task, EmptyTask, NoTask
 from pyutilib.misc import Options
@@ -26,6 +26,11 @@ try:
     from collections import OrderedDict
 except:
     from ordereddict import OrderedDict
+try:
+    from concurrent import futures
+    futures_available = True
+except ImportError:  #pragma:nocover
+    futures_available = False
 
 
 def _collect_parser_groups(t):
@@ -54,13 +59,51 @@ def _set_arguments(t):
 
 class Workflow(Task):
 
-    def __init__(self, id=None, name=None, parser=None):
+    def __init__(self,
+                 id=None,
+                 name=None,
+                 parser=None,
+                 executor=None,
+                 max_workers=None):
         Task.__init__(self, id=id, name=name, parser=None)
         self._tasks = {}
+        self._task_cache = None
         self._start_task = EmptyTask()
         self._final_task = EmptyTask()
         self.add(self._start_task)
         self.add(self._final_task)
+        self.set_executor(executor, max_workers)
+
+    def set_executor(self, executor=None, max_workers=None):
+        """
+        Specify how the tasks in this workflow are executed:
+
+          None       The tasks are executed one at a time (the default).
+          'thread'   Tasks whose predecessors have finished are executed
+                     concurrently in a pool of max_workers threads.
+          executor   A concurrent.futures.Executor that executes the
+                     tasks in this process (e.g., a ThreadPoolExecutor
+                     that is shared by several workflows).
+
+        Tasks exchange data through their ports, so they cannot be
+        executed in other processes.  A task is executed after all of
+        its predecessors have finished, and tasks that require the same
+        resource are never executed at the same time.
+        """
+        if executor is not None:
+            if not futures_available:  #pragma:nocover
+                raise ValueError("Concurrent workflow execution requires "
+                                 "the concurrent.futures package")
+            if executor == 'process' or \
+               isinstance(executor, futures.ProcessPoolExecutor):
+                raise ValueError("Workflow tasks cannot be executed in a "
+                                 "process pool")
+            if executor != 'thread' and \
+               not isinstance(executor, futures.Executor):
+                raise ValueError("Unknown workflow executor: %s" %
+                                 str(executor))
+        self._executor = executor
+        self._max_workers = max_workers
 
     def add(self, task, loadall=True):
         if self.debug:
@@ -70,6 +113,11 @@ class Workflow(Task):
         if task.id in self._tasks:
             return
         self._tasks[task.id] = task
+        if self._task_cache is not None and \
+           (task.cacheable or isinstance(task, Workflow)):
+            task.set_cache(self._task_cache)
+        if self._profiler is not None:
+            task.set_profiler(self._profiler, self._profiler_path)
         if not loadall:
             return
         for name in task.inputs:
@@ -156,8 +204,40 @@ class Workflow(Task):
     def reset(self):
         return self._dfs_([self._start_task.id], lambda t: t.reset())
 
+    def set_cache(self, cache):
+        """
+        Set the TaskCache of the cacheable tasks in this workflow (e.g.,
+        FunctorTask objects), including the tasks in nested workflows
+        and tasks that are added later.  When the workflow is executed
+        again, only the tasks whose inputs changed are executed.  (The
+        outputs of the workflow itself are not cached.)
+        """
+        self._task_cache = cache
+        for task in self._tasks.values():
+            if task.cacheable or isinstance(task, Workflow):
+                task.set_cache(cache)
+
+    def set_profiler(self, profiler, path=()):
+        """
+        Set the WorkflowProfiler that records the calls of this workflow
+        and of its tasks, including the tasks in nested workflows and
+        tasks that are added later.
+        """
+        Task.set_profiler(self, profiler, path)
+        for task in self._tasks.values():
+            task.set_profiler(profiler, self._profiler_path)
+
     def execute(self):
         #return self._dfs_([self._start_task.id], lambda t: t.__call__())
+        if self._executor is not None:
+            if self._executor == 'thread':
+                executor = futures.ThreadPoolExecutor(
+                    max_workers=self._max_workers)
+                try:
+                    return self._execute_concurrent(executor)
+                finally:
+                    executor.shutdown()
+            return self._execute_concurrent(self._executor)
         if self.debug:  #pragma:nocover
             print(self.name, '---------------')
             print(self.name, '---------------')
@@ -233,6 +313,80 @@ class Workflow(Task):
         if self.debug:  #pragma:nocover
             print(self.name, '---------------')
 
+    def _execute_concurrent(self, executor):
+        #
+        # Count the predecessors of the tasks that can be reached from
+        # the start task.  A task is scheduled when its count drops to
+        # zero, so task readiness is not polled.
+        #
+        successors = {}
+        queue = deque([self._start_task])
+        while len(queue) > 0:
+            task = queue.popleft()
+            if task.id in successors:
+                continue
+            successors[task.id] = list(task.next_tasks())
+            queue.extend(successors[task.id])
+        pending = dict((id, 0) for id in successors)
+        for tasks in itervalues(successors):
+            for t in tasks:
+                pending[t.id] += 1
+        #
+        ready = deque([self._start_task])
+        # Tasks that are waiting for a resource
+        blocked = []
+        # The ids of the resources used by the running tasks
+        held = set()
+        running = {}
+        error = None
+        while True:
+            while len(ready) > 0 and error is None:
+                task = ready.popleft()
+                resources = list(itervalues(task._resources))
+                if any(id(res) in held or not res.available()
+                       for res in resources):
+                    blocked.append(task)
+                    continue
+                if self.debug:  #pragma:nocover
+                    print(self.name, "Executing Task " + task.name,
+                          task.next_task_ids())
+                if isinstance(task, EmptyTask):
+                    task()
+                    self._schedule_next(task, successors, pending, ready)
+                    continue
+                for res in resources:
+                    held.add(id(res))
+                running[executor.submit(task)] = task
+            if len(running) == 0:
+                break
+            done, not_done = futures.wait(
+                list(running), return_when=futures.FIRST_COMPLETED)
+            for future in done:
+                task = running.pop(future)
+                for res in itervalues(task._resources):
+                    held.discard(id(res))
+                if future.exception() is not None:
+                    if error is None:
+                        error = future.exception()
+                elif error is None:
+                    self._schedule_next(task, successors, pending, ready)
+            #
+            # Retry the blocked tasks, since resources may have been
+            # released.  (Tasks that wait for a resource that is not
+            # released by this workflow are never executed, as with
+            # serial execution.)
+            #
+            ready.extend(blocked)
+            del blocked[:]
+        if error is not None:
+            raise error
+
+    def _schedule_next(self, task, successors, pending, ready):
+        for t in successors[task.id]:
+            pending[t.id] -= 1
+            if pending[t.id] == 0 and t.inputs_ready():
+                ready.append(t)
+
     def __str__(self):
         return "\n".join(["Workflow %s:" % self.name] + self._dfs_(
             [self._start_task.id], lambda t: t._name()))